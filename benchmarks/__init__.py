@@ -0,0 +1 @@
+"""Benchmarks of coloc_sat, run as modules from the root of the repository (`python -m benchmarks.bench_...`)."""
@@ -0,0 +1,70 @@
+"""
+Benchmark of the collection-level join (`coloc_sat.collection_join.join_collections`).
+
+It joins synthetic collections of SAR-like scenes (reference) and orbit segments (matched) spread over a year, and
+reports the join time and the number of pairs for growing collection sizes. On the smallest size, pairs are checked
+against a brute force time and footprint test of every pair.
+
+Usage: python -m benchmarks.bench_collection_join
+"""
+import time
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from coloc_sat.collection_join import join_collections
+from coloc_sat.intersection_tools import get_polygons_area_in_km_squared
+
+DELTA_TIME = 60
+MINIMAL_AREA = 1600
+
+
+def synthetic_collection(n, duration_minutes, size, rng):
+    start = np.datetime64("2023-01-01", "ns") + rng.integers(0, 365 * 86400, n).astype("timedelta64[s]")
+    lon = rng.uniform(-175, 175 - size, n)
+    lat = rng.uniform(-75, 75 - size, n)
+    return pd.DataFrame(
+        {
+            "path": [f"granule_{k}" for k in range(n)],
+            "start_date": start,
+            "stop_date": start + np.timedelta64(duration_minutes, "m"),
+            "footprint": shapely.box(lon, lat, lon + size, lat + size),
+        }
+    )
+
+
+def brute_force(ref, match):
+    tolerance = 2 * np.timedelta64(DELTA_TIME, "m")
+    in_time = (ref["start_date"].values[:, None] <= match["stop_date"].values[None, :] + tolerance) & (
+        match["start_date"].values[None, :] <= ref["stop_date"].values[:, None] + tolerance
+    )
+    i, j = np.nonzero(in_time)
+    intersections = shapely.intersection(ref["footprint"].values[i], match["footprint"].values[j])
+    keep = get_polygons_area_in_km_squared(intersections) >= MINIMAL_AREA
+    return set(zip(i[keep].tolist(), j[keep].tolist()))
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'reference':>10} {'matched':>10} {'join (s)':>9} {'pairs':>8}")
+    for n in [5000, 100000, 1000000]:
+        # 3 minutes SAR scenes, 100 minutes orbit segments
+        ref = synthetic_collection(n, 3, 2, rng)
+        match = synthetic_collection(n // 10, 100, 20, rng)
+        t0 = time.perf_counter()
+        pairs = join_collections(ref, match, DELTA_TIME, MINIMAL_AREA)
+        elapsed = time.perf_counter() - t0
+        if n == 5000:
+            ref_positions = {path: k for k, path in enumerate(ref["path"])}
+            match_positions = {path: k for k, path in enumerate(match["path"])}
+            found = {
+                (ref_positions[a], match_positions[b])
+                for a, b in zip(pairs["ref_path"], pairs["match_path"])
+            }
+            assert found == brute_force(ref, match)
+        print(f"{len(ref):10d} {len(match):10d} {elapsed:9.2f} {len(pairs):8d}")
+
+
+if __name__ == "__main__":
+    main()
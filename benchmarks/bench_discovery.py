@@ -0,0 +1,109 @@
+"""
+Benchmark of the discovery of products from the path templates of the configuration
+(`coloc_sat.discovery.find_template_paths`, used by `coloc_sat.tools.get_all_comparison_files`).
+
+On a synthetic archive (S1 L1 tree with wildcard components, HY2 orbit files researched at the minute accuracy), it
+compares the former research (one `glob.glob` per date scheme, kept below as a reference) with the compiled templates
+and the directory cache: first call (cold cache) and repeated calls, like one research per parquet row. It verifies
+that both find the same products and reports the stat / listdir calls of the cache. The range research
+(`coloc_sat.discovery.find_template_paths_between`, no enumeration of the date schemes) is timed with a warm cache
+too, including the enumeration of the schemes for the compiled templates.
+
+Usage: python -m benchmarks.bench_discovery
+"""
+import glob
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from coloc_sat.discovery import (
+    DirectoryCache,
+    find_template_paths,
+    find_template_paths_between,
+)
+from coloc_sat.tools import date_schemes, insert_date_and_day_of_year
+
+ACCURACY_PATTERNS = {
+    "day": "%Y%m%d",
+    "hour": "%Y%m%d%H",
+    "minute": "%Y%m%d%H%M",
+    "second": "%Y%m%d%H%M%S",
+}
+
+
+def build_archive(root, n_days):
+    day0 = datetime(2023, 1, 1)
+    for k in range(n_days):
+        day = day0 + timedelta(days=k)
+        doy = day.strftime("%j")
+        for sat in ["sentinel-1a", "sentinel-1b"]:
+            for mode in ["IW", "EW"]:
+                for product in ["GRDH", "GRDM"]:
+                    for _ in range(5):
+                        t = day + timedelta(seconds=random.randint(0, 86399))
+                        os.makedirs(
+                            f"{root}/{sat}/L1/{mode}/{product}/{day:%Y}/{doy}/S1A_{mode}_{t:%Y%m%dT%H%M%S}.SAFE"
+                        )
+        os.makedirs(f"{root}/hy2/{day:%Y}/{doy}")
+        for n in range(14):
+            t = day + timedelta(minutes=n * 101 + random.randint(0, 5))
+            open(f"{root}/hy2/{day:%Y}/{doy}/hscat_{t:%Y%m%d_%H%M%S}.nc", "w").close()
+
+
+def glob_research(template, schemes, accuracy):
+    files = []
+    for scheme in schemes:
+        date = datetime.strptime(scheme, ACCURACY_PATTERNS[accuracy])
+        files += glob.glob(insert_date_and_day_of_year(template, date, schemes[scheme]["dayOfYear"]))
+    return files
+
+
+def main():
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as root:
+        build_archive(root, 20)
+        start = datetime(2023, 1, 3, 6, 0)
+        print(
+            f"{'template':>8} {'accuracy':>8} {'glob (s)':>9} {'cold (s)':>9} {'warm (s)':>9} {'range (s)':>9} "
+            f"{'files':>6} {'cache':>40}"
+        )
+        for name, template, accuracy, duration in [
+            ("S1", f"{root}/sentinel-1*/L1/*/*/%Y/%(dayOfYear)/S1*%Y%m%d*SAFE", "day", timedelta(days=3.5)),
+            ("HY2", f"{root}/hy2/%Y/%(dayOfYear)/*%Y%m%d_%H%M*.nc", "minute", timedelta(days=3.5)),
+            (
+                "S1",
+                f"{root}/sentinel-1*/L1/*/*/%Y/%(dayOfYear)/S1*%Y%m%dT%H%M%S.SAFE",
+                "second",
+                timedelta(hours=6),
+            ),
+        ]:
+            stop = start + duration
+            schemes = date_schemes(start, stop, accuracy=accuracy)
+            t0 = time.perf_counter()
+            expected = glob_research(template, schemes, accuracy)
+            t_glob = time.perf_counter() - t0
+            cache = DirectoryCache()
+            t0 = time.perf_counter()
+            found = find_template_paths(template, schemes, cache=cache)
+            t_cold = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            for _ in range(10):
+                find_template_paths(template, date_schemes(start, stop, accuracy=accuracy), cache=cache)
+            t_warm = (time.perf_counter() - t0) / 10
+            t0 = time.perf_counter()
+            for _ in range(10):
+                in_range = find_template_paths_between(template, start, stop, accuracy, cache=cache)
+            t_range = (time.perf_counter() - t0) / 10
+            assert set(expected) == set(found) == set(in_range)
+            assert len(found) == len(set(found)) and len(in_range) == len(set(in_range))
+            info = cache.info()
+            counts = f"stats={info['stats']} listdirs={info['listdirs']} hits={info['hits']}"
+            print(
+                f"{name:>8} {accuracy:>8} {t_glob:9.3f} {t_cold:9.4f} {t_warm:9.4f} {t_range:9.4f} {len(found):6d} "
+                f"{counts:>40}"
+            )
+
+if __name__ == "__main__":
+    main()
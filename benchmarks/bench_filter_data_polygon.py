@@ -0,0 +1,114 @@
+"""
+Benchmark of the reduction of a swath to a common zone (`coloc_sat.tools.filter_data_polygon`).
+
+It compares the bounding box prefilter with shapely vectorized predicates to the former kernel (point in polygon
+test of every pixel, kept below as a reference) on synthetic full-orbit swaths, and verifies that both keep the
+same pixels.
+
+Usage: python -m benchmarks.bench_filter_data_polygon
+"""
+import time
+
+import numpy as np
+from numba import njit, prange
+from numba.core import types
+from numba.typed import Dict
+from shapely.geometry import Polygon
+
+from coloc_sat.tools import filter_data_polygon, point_in_polygon
+
+
+@njit(parallel=True)
+def full_scan_filter_data_polygon(lon, lat, data_vars, polygon):
+    mask = np.zeros(lon.shape, dtype=np.bool_)
+    for i in prange(lon.shape[0]):
+        for j in range(lon.shape[1]):
+            mask[i, j] = point_in_polygon(lon[i, j], lat[i, j], polygon)
+
+    for var in data_vars:
+        data_vars[var] = np.where(mask, data_vars[var], np.nan)
+
+    filtered_indices = np.argwhere(mask)
+    if filtered_indices.size == 0:
+        return data_vars, None, None
+
+    min_row = filtered_indices[0, 0]
+    min_col = filtered_indices[0, 1]
+    max_row = filtered_indices[0, 0]
+    max_col = filtered_indices[0, 1]
+
+    for idx in filtered_indices:
+        if idx[0] < min_row:
+            min_row = idx[0]
+        if idx[1] < min_col:
+            min_col = idx[1]
+        if idx[0] > max_row:
+            max_row = idx[0]
+        if idx[1] > max_col:
+            max_col = idx[1]
+
+    lon_2d_reduced = lon[min_row : max_row + 1, min_col : max_col + 1]
+    lat_2d_reduced = lat[min_row : max_row + 1, min_col : max_col + 1]
+
+    data_vars_reduced = {}
+    for var in data_vars:
+        data_vars_reduced[var] = data_vars[var][
+            min_row : max_row + 1, min_col : max_col + 1
+        ]
+
+    return data_vars_reduced, lon_2d_reduced, lat_2d_reduced
+
+
+def typed_dict(arrays):
+    d = Dict.empty(key_type=types.unicode_type, value_type=types.float64[:, :])
+    for name, values in arrays.items():
+        d[name] = values
+    return d
+
+
+def synthetic_orbit(n_rows, n_cols, rng):
+    """Full orbit swath: the ground track goes around the Earth, crossing the antimeridian."""
+    rows, cols = np.meshgrid(
+        np.linspace(0, 2 * np.pi, n_rows), np.arange(n_cols), indexing="ij"
+    )
+    lat = 80 * np.sin(rows) + (cols - n_cols / 2) * 0.2 * np.cos(rows)
+    lon = np.degrees(rows) - 180 + (cols - n_cols / 2) * 0.2
+    lon = (lon + 180) % 360 - 180
+    data = {
+        "wind_speed": rng.uniform(0, 25, lon.shape),
+        "wind_direction": rng.uniform(0, 360, lon.shape),
+        "time": rng.uniform(0, 1e18, lon.shape),
+    }
+    return lon, lat, data
+
+
+def main():
+    rng = np.random.default_rng(0)
+    # common zone of about 500 km x 500 km on the orbit
+    polygon = Polygon([(-139, 54), (-135, 59), (-131, 56), (-135, 51), (-139, 54)])
+    coords = np.array(polygon.exterior.coords)
+    # JIT compilation
+    lon, lat, data = synthetic_orbit(10, 4, rng)
+    full_scan_filter_data_polygon(lon, lat, typed_dict(data), coords)
+
+    print(f"{'pixels':>10} {'prefilter (s)':>14} {'full scan (s)':>14} {'window':>12}")
+    for n_rows, n_cols in [(1624, 76), (3248, 76), (3248, 152), (12992, 304)]:
+        lon, lat, data = synthetic_orbit(n_rows, n_cols, rng)
+        t0 = time.perf_counter()
+        reduced, lon_reduced, _ = filter_data_polygon(lon, lat, data, polygon)
+        t_prefilter = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        full, lon_full, _ = full_scan_filter_data_polygon(
+            lon, lat, typed_dict(data), coords
+        )
+        t_full = time.perf_counter() - t0
+        np.testing.assert_array_equal(lon_reduced, lon_full)
+        for name in data:
+            np.testing.assert_array_equal(reduced[name], full[name])
+        print(
+            f"{lon.size:10d} {t_prefilter:14.4f} {t_full:14.4f} {str(lon_reduced.shape):>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
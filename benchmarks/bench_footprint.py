@@ -0,0 +1,98 @@
+"""
+Benchmark of the footprint extraction from longitude / latitude variables
+(`coloc_sat.intersection_tools.get_footprint_from_ll_ds`).
+
+The former implementation (kept below as a reference) built the cartesian product of all longitudes and latitudes
+as a list of tuples before taking a `MultiPoint` convex hull: N tuples for a 1D regular grid of N pixels, but N²
+tuples for a 2D swath of N pixels. On regular grids both implementations give the same footprint, which is verified
+here.
+
+Usage: python -m benchmarks.bench_footprint
+"""
+import math
+import time
+from itertools import product
+from types import SimpleNamespace
+
+import numpy as np
+import xarray as xr
+from shapely.geometry import MultiPoint
+
+from coloc_sat.intersection_tools import get_footprint_from_ll_ds
+
+ACQUISITION = SimpleNamespace(longitude_name="lon", latitude_name="lat")
+
+
+def cartesian_product_footprint(acquisition, ds):
+    flatten_lon = ds[acquisition.longitude_name].data.flatten()
+    flatten_lat = ds[acquisition.latitude_name].data.flatten()
+    mpt_coords = [
+        (lon, lat)
+        for lon, lat in product(flatten_lon, flatten_lat)
+        if not (math.isnan(lon) or math.isnan(lat))
+    ]
+    return MultiPoint(mpt_coords).convex_hull
+
+
+def timed(func, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - t0, result
+
+
+def regular_grid(n_lon):
+    lon = np.linspace(-180, 179.75, n_lon)
+    lat = np.linspace(-89.875, 89.875, n_lon // 2)
+    return xr.Dataset(coords={"lon": lon, "lat": lat})
+
+
+def curved_swath(n_rows):
+    rows, cols = np.meshgrid(
+        np.linspace(0, 1, n_rows),
+        np.linspace(-0.5, 0.5, max(n_rows // 10, 2)),
+        indexing="ij",
+    )
+    angle = rows * np.pi / 2
+    lon = (20 + 10 * cols) * np.cos(angle)
+    lat = (20 + 10 * cols) * np.sin(angle)
+    lon[0, 0] = np.nan
+    return xr.Dataset(coords={"lon": (("y", "x"), lon), "lat": (("y", "x"), lat)})
+
+
+def main():
+    print("Regular grid (1D longitude / latitude)")
+    print(f"{'pixels':>10} {'former (s)':>11} {'new (s)':>9}")
+    for n in [100, 400, 1440]:
+        ds = regular_grid(n)
+        t_new, new = timed(get_footprint_from_ll_ds, ACQUISITION, ds)
+        t_former, former = timed(cartesian_product_footprint, ACQUISITION, ds)
+        assert former.equals(new)
+        print(f"{ds.lon.size * ds.lat.size:10d} {t_former:11.3f} {t_new:9.4f}")
+
+    print("Curved swath (2D longitude / latitude)")
+    print(
+        f"{'pixels':>10} {'former (s)':>11} {'convex (s)':>11} {'boundary (s)':>13} "
+        f"{'concave (s)':>12} {'concave/convex area':>20}"
+    )
+    for n in [50, 100, 200, 800]:
+        ds = curved_swath(n)
+        t_convex, convex = timed(get_footprint_from_ll_ds, ACQUISITION, ds)
+        t_boundary, _ = timed(
+            get_footprint_from_ll_ds, ACQUISITION, ds, method="boundary"
+        )
+        t_concave, concave = timed(
+            get_footprint_from_ll_ds, ACQUISITION, ds, method="concave"
+        )
+        if n <= 100:
+            t_former, _ = timed(cartesian_product_footprint, ACQUISITION, ds)
+            former = f"{t_former:11.3f}"
+        else:
+            former = f"{'skipped':>11}"
+        print(
+            f"{ds.lon.size:10d} {former} {t_convex:11.4f} {t_boundary:13.4f} "
+            f"{t_concave:12.4f} {concave.area / convex.area:20.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark of the search of the comparison products whose footprint intersects the one of the reference products
+(`coloc_sat.intersection_tools.join_footprints`).
+
+It compares the spatial join (STRtree of the candidate footprints queried with prepared reference footprints) to the
+former pairwise test (`intersects` then `intersection` and area for every pair, kept below as a reference) for one
+reference footprint and for a batch of reference footprints against a day of synthetic footprints, and verifies
+that both keep the same pairs.
+
+Usage: python -m benchmarks.bench_footprint_join
+"""
+import time
+
+import numpy as np
+from shapely import affinity
+from shapely.geometry import box
+
+from coloc_sat.intersection_tools import (
+    get_polygon_area_in_km_squared,
+    join_footprints,
+)
+
+MINIMAL_AREA = 1600
+
+
+def pairwise(footprints1, footprints2, minimal_area):
+    pairs = []
+    for i, fp1 in enumerate(footprints1):
+        for j, fp2 in enumerate(footprints2):
+            if fp1.intersects(fp2):
+                if get_polygon_area_in_km_squared(fp1.intersection(fp2)) >= minimal_area:
+                    pairs.append((i, j))
+    return pairs
+
+
+def footprints(n, size, rng):
+    """Rotated boxes of `size` degrees, spread over the globe."""
+    centers = rng.uniform([-175, -75], [175, 75], (n, 2))
+    return [
+        affinity.rotate(box(x - size / 2, y - size / 2, x + size / 2, y + size / 2), rng.uniform(0, 90))
+        for x, y in centers
+    ]
+
+
+def main():
+    rng = np.random.default_rng(0)
+    # a day of L2 SAR scenes / HY2 orbit segments
+    candidates = footprints(20000, 3, rng)
+    print(f"{'references':>10} {'candidates':>10} {'pairwise (s)':>13} {'join (s)':>9} {'pairs':>6}")
+    for n_references in [1, 20, 100]:
+        references = footprints(n_references, 3, rng)
+        t0 = time.perf_counter()
+        expected = pairwise(references, candidates, MINIMAL_AREA)
+        t_pairwise = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        index1, index2, _, _ = join_footprints(references, candidates, MINIMAL_AREA)
+        t_join = time.perf_counter() - t0
+        assert sorted(expected) == sorted(zip(index1.tolist(), index2.tolist()))
+        print(
+            f"{n_references:10d} {len(candidates):10d} {t_pairwise:13.3f} {t_join:9.4f} {len(expected):6d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark of the output encoding policies of the co-location products (`coloc_sat.encoding`).
+
+A synthetic swath co-location product (float64 wind speeds, directions, other variables and datetimes, like the ones
+built by `coloc_sat.intersection.ProductIntersection.coloc_resample_swath`) is written with each policy. Bytes
+written, write time and maximum absolute error on the wind speed are reported.
+
+Usage: python -m benchmarks.bench_output_encoding [size]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import xarray as xr
+
+from coloc_sat.encoding import get_encoding_options, write_netcdf
+
+CASES = [
+    ("none", None, None),
+    ("lossless", "zlib", None),
+    ("lossless", "zstd", None),
+    ("float32", "zlib", None),
+    ("float32", "zstd", None),
+    ("packed", "zlib", None),
+    ("packed", "zstd", None),
+    ("packed", "zlib", "h5netcdf"),
+]
+
+
+def coloc_product(size):
+    rng = np.random.default_rng(0)
+    shape = (size, size)
+    y, x = np.meshgrid(np.linspace(0, 1, size), np.linspace(0, 1, size), indexing="ij")
+    # smooth fields with noise, NaN outside of the common footprint
+    outside = (x + y) > 1.6
+    data_vars = {}
+    for nb in [1, 2]:
+        wind_speed = 8 + 4 * np.sin(6 * x) * np.cos(4 * y) + rng.normal(0, 0.5, shape)
+        wind_direction = (180 + 90 * np.sin(3 * y) + rng.normal(0, 5, shape)) % 360
+        times = np.datetime64("2023-01-03T11:00:00", "ns") + (y * 6e11).astype(
+            "timedelta64[ns]"
+        )
+        times[outside] = np.datetime64("NaT")
+        for array in [wind_speed, wind_direction]:
+            array[outside] = np.nan
+        data_vars[f"wind_speed_{nb}"] = (("y", "x"), wind_speed)
+        data_vars[f"wind_direction_{nb}"] = (("y", "x"), wind_direction)
+        data_vars[f"time_{nb}"] = (("y", "x"), times)
+        data_vars[f"nrcs_{nb}"] = (
+            ("y", "x"),
+            np.where(outside, np.nan, rng.normal(-20, 2, shape)),
+        )
+    return xr.Dataset(
+        data_vars,
+        coords={
+            "lon": (("y", "x"), -40 + 5 * x),
+            "lat": (("y", "x"), 40 + 5 * y),
+        },
+    )
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    ds = coloc_product(size)
+    print(f"Co-location product of {size}x{size} pixels, {ds.nbytes / 1e6:.1f} MB in memory")
+    print(
+        f"{'policy':>9} {'compression':>12} {'engine':>9} {'bytes':>12} {'ratio':>6} "
+        f"{'write (s)':>10} {'ws error':>9}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        reference = None
+        for k, (policy, compression, engine) in enumerate(CASES):
+            options = get_encoding_options(
+                # the reference keeps the xarray defaults (no chunking)
+                {"policy": policy, "chunks": None if policy == "none" else {"y": 256, "x": 256}},
+                compression=compression,
+                engine=engine,
+            )
+            path = os.path.join(tmp, f"coloc_{k}.nc")
+            try:
+                t0 = time.perf_counter()
+                write_netcdf(ds, path, options)
+                elapsed = time.perf_counter() - t0
+            except Exception as e:
+                print(f"{policy:>9} {str(compression):>12} {str(engine):>9} failed: {e}")
+                continue
+            nbytes = os.path.getsize(path)
+            reference = reference or nbytes
+            with xr.open_dataset(path) as written:
+                error = float(np.nanmax(np.abs(written.wind_speed_1.values - ds.wind_speed_1.values)))
+            print(
+                f"{policy:>9} {str(compression):>12} {str(options['engine']):>9} {nbytes:12d} "
+                f"{reference / nbytes:6.1f} {elapsed:10.3f} {error:9.4f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
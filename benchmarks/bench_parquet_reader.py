@@ -0,0 +1,123 @@
+"""
+Benchmark of the reading of large co-location parquet files by `coloc_sat.parquet_coloc.coloc_from_parquet`.
+
+On a synthetic parquet file (S1 x HY2 like rows, with an unused column), it compares the former reading (whole file
+loaded with `geopandas.read_parquet`, rows walked with `iterrows`, kept below as a reference) with the streaming
+reader (`coloc_sat.parquet_reader.iter_parquet_batches`, compact records): time to get the rows, size of a pickled
+row (what is sent to a dask worker), and peak of Python memory (tracemalloc, arrow buffers excluded, measured in a
+second pass) while walking the rows. The rows of `iterrows` are decoded (shapely geometries, timestamps) while the
+compact records are decoded by the workers (`decode_parquet_record`), so the time of the streaming reader is split
+into the reading of the batches, the building of the records, and the decoding of every record. It also times a
+pushed down filter on one day.
+
+Usage: python -m benchmarks.bench_parquet_reader [n_rows]
+"""
+import os
+import pickle
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from coloc_sat.parquet_reader import batch_records, decode_parquet_record, iter_parquet_batches
+
+
+def build_parquet(path, n_rows):
+    rng = np.random.default_rng(0)
+    t0 = np.datetime64("2023-01-01", "ns")
+    x, y = rng.uniform(-170, 170, n_rows), rng.uniform(-60, 60, n_rows)
+    ref_start = t0 + rng.integers(0, 365 * 86400, n_rows).astype("timedelta64[s]")
+    match_start = ref_start + rng.integers(-1800, 1800, n_rows).astype("timedelta64[s]")
+    gdf = gpd.GeoDataFrame(
+        {
+            "ref_geometry": shapely.box(x, y, x + 2, y + 2),
+            "ref_start": ref_start,
+            "ref_end": ref_start + np.timedelta64(25, "s"),
+            "ref_dataset_id": "sentinel-1a",
+            "ref_granule": [f"S1A_IW_{k // 3:08d}.SAFE" for k in range(n_rows)],
+            "match_geometry": shapely.box(x + 1, y, x + 6, y + 5),
+            "match_start": match_start,
+            "match_end": match_start + np.timedelta64(3, "m"),
+            "match_dataset_id": "hy-2b",
+            "match_granule": [f"HY2B_{k // 10:08d}.nc" for k in range(n_rows)],
+            "match_slices": [np.arange(8)] * n_rows,
+        },
+        geometry="ref_geometry",
+        crs="EPSG:4326",
+    )
+    gdf["match_geometry"] = gpd.GeoSeries(gdf["match_geometry"], crs="EPSG:4326")
+    gdf.to_parquet(path, row_group_size=65536)
+
+
+def read_with_iterrows(path):
+    prq = gpd.read_parquet(path)
+    n_rows = 0
+    for _, row in prq.iterrows():
+        n_rows += 1
+        last = row
+    return n_rows, last
+
+
+def read_with_batches(path, **filters):
+    n_rows = 0
+    last = None
+    for batch in iter_parquet_batches(path, **filters):
+        for record in batch_records(batch):
+            n_rows += 1
+            last = record
+    return n_rows, last
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "pairs.parquet")
+        build_parquet(path, n_rows)
+        print(f"{n_rows} rows, {os.path.getsize(path) / 1e6:.1f} MB")
+        print(f"{'reader':>12} {'time (s)':>9} {'rows':>8} {'row (B)':>8} {'peak (MB)':>10}")
+        for name, reader in [
+            ("iterrows", read_with_iterrows),
+            ("batches", read_with_batches),
+        ]:
+            t0 = time.perf_counter()
+            count, last = reader(path)
+            elapsed = time.perf_counter() - t0
+            tracemalloc.start()
+            reader(path)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(
+                f"{name:>12} {elapsed:9.2f} {count:8d} {len(pickle.dumps(last)):8d} {peak / 1e6:10.1f}"
+            )
+        t0 = time.perf_counter()
+        batches = list(iter_parquet_batches(path))
+        t1 = time.perf_counter()
+        records = [record for batch in batches for record in batch_records(batch)]
+        t2 = time.perf_counter()
+        for record in records:
+            decode_parquet_record(record)
+        t3 = time.perf_counter()
+        for batch in batches:
+            batch.to_dict("records")
+        t4 = time.perf_counter()
+        print(
+            f"batches split: reading {t1 - t0:.2f} s, records {t2 - t1:.2f} s (to_dict: {t4 - t3:.2f} s), "
+            f"decoding {t3 - t2:.2f} s"
+        )
+        t0 = time.perf_counter()
+        count, last = read_with_batches(
+            path, start_date="2023-06-01", stop_date="2023-06-02"
+        )
+        print(f"{'one day':>12} {time.perf_counter() - t0:9.2f} {count:8d}")
+        decoded = decode_parquet_record(last)
+        assert isinstance(decoded["ref_geometry"], shapely.Polygon)
+        assert pd.Timestamp("2023-05-31") <= decoded["ref_start"] <= pd.Timestamp("2023-06-02")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark of the footprint area computation (`coloc_sat.intersection_tools.get_polygon_area_in_km_squared` and
+`get_polygons_area_in_km_squared`).
+
+It compares the geodesic areas (WGS84 ellipsoid) with the former computation (projection of the exterior rings to
+EPSG:3857 with a transformer built at each call, kept below as a reference) on synthetic SAR-like footprints at
+several latitudes, then reports the time needed to measure a batch of footprints, without and with the cache.
+
+Usage: python -m benchmarks.bench_polygon_area
+"""
+import time
+
+import numpy as np
+import pyproj
+from shapely import affinity
+from shapely.geometry import MultiPolygon, Polygon
+
+from coloc_sat import intersection_tools
+from coloc_sat.intersection_tools import (
+    get_polygon_area_in_km_squared,
+    get_polygons_area_in_km_squared,
+)
+
+
+def mercator_area_in_km_squared(polygon):
+    proj = pyproj.Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
+    if isinstance(polygon, Polygon):
+        return Polygon(proj.itransform(polygon.exterior.coords)).area / 1e6
+    return sum(Polygon(proj.itransform(p.exterior.coords)).area for p in polygon.geoms) / 1e6
+
+
+def sar_footprint(lon, lat, rng):
+    """Footprint of about 250 km x 170 km (EW scene), with points along its edges like a L2 footprint."""
+    half_height = 250 / 111.0 / 2
+    half_width = 170 / (111.0 * np.cos(np.radians(lat))) / 2
+    edge = np.linspace(-1, 1, 20)
+    ring = np.concatenate(
+        [
+            np.column_stack([edge * half_width, np.full(edge.size, -half_height)]),
+            np.column_stack([np.full(edge.size, half_width), edge * half_height]),
+            np.column_stack([-edge * half_width, np.full(edge.size, half_height)]),
+            np.column_stack([np.full(edge.size, -half_width), -edge * half_height]),
+        ]
+    )
+    polygon = Polygon(ring + [lon, lat])
+    return affinity.rotate(polygon, rng.uniform(-15, 15))
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'latitude':>9} {'geodesic (km2)':>15} {'EPSG:3857 (km2)':>16} {'ratio':>7}")
+    for lat in [0, 30, 50, 60, 70, 75, 80]:
+        polygon = sar_footprint(-30, lat, rng)
+        geodesic = get_polygon_area_in_km_squared(polygon)
+        mercator = mercator_area_in_km_squared(polygon)
+        print(f"{lat:9d} {geodesic:15.0f} {mercator:16.0f} {mercator / geodesic:7.2f}")
+    split = MultiPolygon([sar_footprint(178, 60, rng), sar_footprint(-178, 60, rng)])
+    print(f"{'split':>9} {get_polygon_area_in_km_squared(split):15.0f} {mercator_area_in_km_squared(split):16.0f}")
+
+    footprints = [
+        sar_footprint(rng.uniform(-180, 180), rng.uniform(-80, 80), rng)
+        for _ in range(5000)
+    ]
+    print(f"\n{'footprints':>10} {'EPSG:3857 (s)':>14} {'geodesic (s)':>13} {'cached (s)':>11}")
+    t0 = time.perf_counter()
+    [mercator_area_in_km_squared(polygon) for polygon in footprints]
+    t_mercator = time.perf_counter() - t0
+    intersection_tools._area_cache.clear()
+    t0 = time.perf_counter()
+    first = get_polygons_area_in_km_squared(footprints)
+    t_geodesic = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    second = get_polygons_area_in_km_squared(footprints)
+    t_cached = time.perf_counter() - t0
+    np.testing.assert_array_equal(first, second)
+    print(f"{len(footprints):10d} {t_mercator:14.3f} {t_geodesic:13.3f} {t_cached:11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark of the time subsetting of a global daily grid (`coloc_sat.intersection_tools.subset_where`, used by
+`extract_times_dataset` and `remove_nat`).
+
+On a synthetic global SMAP-like daily grid (0.25 degree, 2 nodes), it compares `xarray.Dataset.where(cond,
+drop=True)` with `subset_where` for the time window of a co-location (about 1 hour, so a band of longitudes), on a
+dataset in memory and on a lazily opened netcdf file. It verifies that both keep the same values and reports
+their time and peak memory (tracemalloc).
+
+Usage: python -m benchmarks.bench_subset_where
+"""
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import xarray as xr
+
+from coloc_sat.intersection_tools import subset_where
+
+
+def synthetic_smap_day(rng):
+    """Global daily grid: the acquisition time of each node follows the longitude (sun-synchronous orbit)."""
+    lat = np.arange(-89.875, 90, 0.25)
+    lon = np.arange(0.125, 360, 0.25)
+    day = np.datetime64("2023-01-01T00:00:00", "ns")
+    minutes = (lon / 360 * 24 * 60)[np.newaxis, :, np.newaxis] + np.array([0, 720])
+    minutes = np.broadcast_to(minutes, (lat.size, lon.size, 2)).copy()
+    # no data out of the swaths
+    minutes[rng.random(minutes.shape) < 0.3] = np.nan
+    time_values = day + (minutes * 60e9).astype("timedelta64[ns]")
+    time_values[np.isnan(minutes)] = np.datetime64("NaT")
+    dims = ("lat", "lon", "node")
+    data_vars = {
+        "time": (dims, time_values),
+        "wind_speed": (dims, np.where(np.isnan(minutes), np.nan, rng.uniform(0, 25, minutes.shape))),
+        "wind_direction": (dims, np.where(np.isnan(minutes), np.nan, rng.uniform(0, 360, minutes.shape))),
+        "quality_flag": (dims, rng.integers(0, 8, minutes.shape).astype("int16")),
+        "crs": ((), 0),
+    }
+    return xr.Dataset(data_vars, coords={"lat": lat, "lon": lon, "node": [0, 1]})
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = func(*args).load()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+
+def with_where(ds, start, stop):
+    return ds.where((ds.time >= start) & (ds.time <= stop), drop=True)
+
+
+def with_subset_where(ds, start, stop):
+    return subset_where(ds, (ds.time >= start) & (ds.time <= stop))
+
+
+def compare(label, ds, start, stop):
+    ref, t_where, m_where = measure(with_where, ds, start, stop)
+    new, t_subset, m_subset = measure(with_subset_where, ds, start, stop)
+    for name in ["time", "wind_speed", "wind_direction", "quality_flag"]:
+        xr.testing.assert_equal(ref[name], new[name])
+    print(
+        f"{label:>10} {t_where:10.3f} {t_subset:12.3f} {m_where:12.1f} {m_subset:14.1f} {str(dict(new.sizes)):>36}"
+    )
+
+
+def main():
+    rng = np.random.default_rng(0)
+    ds = synthetic_smap_day(rng)
+    # 1 hour around 06:00 (morning node)
+    start = np.datetime64("2023-01-01T05:30:00", "ns")
+    stop = np.datetime64("2023-01-01T06:30:00", "ns")
+    print(
+        f"{'dataset':>10} {'where (s)':>10} {'subset (s)':>12} {'where (MB)':>12} {'subset (MB)':>14} {'sizes':>36}"
+    )
+    compare("memory", ds, start, stop)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "smap_day.nc")
+        ds.to_netcdf(path)
+        with xr.open_dataset(path) as lazy:
+            compare("lazy", lazy, start, stop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark of the swath pixel association (`coloc_sat.tools.compute_colocated_data`).
+
+It compares the indexed neighbour search with the former full scan (kept below as a reference) on synthetic
+swaths of increasing size, verifies that both produce the same co-located data, and shows that the indexed
+search scales nearly linearly with the number of pixels.
+
+Usage: python -m benchmarks.bench_swath_association
+"""
+import time
+
+import numpy as np
+from numba import njit, prange
+from numba.core import types
+from numba.typed import Dict
+
+from coloc_sat.tools import compute_colocated_data, haversine
+
+RADIUS_KM = 25 * np.sqrt(2) / 2
+
+
+@njit(parallel=True)
+def full_scan_colocated_data(
+    lon_1,
+    lat_1,
+    lon_2,
+    lat_2,
+    data_vars_1,
+    data_vars_2,
+    min_px,
+    colocated_data_1,
+    colocated_data_2,
+    main_var_name_1,
+    radius_km,
+):
+    for i in prange(lon_1.shape[0]):
+        for j in prange(lon_1.shape[1]):
+            filtered_indices = []
+            for m in prange(lon_2.shape[0]):
+                for n in prange(lon_2.shape[1]):
+                    dist = haversine(lat_1[i, j], lon_1[i, j], lat_2[m, n], lon_2[m, n])
+                    if dist <= radius_km:
+                        filtered_indices.append((m, n))
+
+            if len(filtered_indices) < min_px:
+                continue
+
+            ref_nan = False
+            for coloc_1_var in data_vars_1:
+                if coloc_1_var == main_var_name_1:
+                    ref_nan = np.isnan(data_vars_1[coloc_1_var][i, j])
+                colocated_data_1[coloc_1_var][i, j] = data_vars_1[coloc_1_var][i, j]
+
+            for coloc_2_var in data_vars_2:
+                if not ref_nan:
+                    filtered_data = np.array(
+                        [data_vars_2[coloc_2_var][m, n] for m, n in filtered_indices]
+                    )
+                    colocated_data_2[coloc_2_var][i, j] = np.nanmean(filtered_data)
+
+    return colocated_data_1, colocated_data_2
+
+
+def typed_dict(arrays):
+    d = Dict.empty(key_type=types.unicode_type, value_type=types.float64[:, :])
+    for name, values in arrays.items():
+        d[name] = values
+    return d
+
+
+def synthetic_swath(shape, resolution_deg, rng):
+    """Slightly rotated and noisy swath centred on (-40, 45) with a few NaN pixels."""
+    rows, cols = np.meshgrid(np.arange(shape[0]), np.arange(shape[1]), indexing="ij")
+    lon = -40 + (cols - shape[1] / 2) * resolution_deg + 0.1 * rows * resolution_deg
+    lat = 45 + (rows - shape[0] / 2) * resolution_deg
+    lon = lon + rng.normal(0, resolution_deg / 10, shape)
+    lon[rng.random(shape) < 0.01] = np.nan
+    data = {
+        "wind_speed": rng.uniform(0, 25, shape),
+        "wind_direction": rng.uniform(0, 360, shape),
+    }
+    data["wind_speed"][rng.random(shape) < 0.05] = np.nan
+    return lon, lat, data
+
+
+def run(kernel, target, source):
+    lon_1, lat_1, data_1 = target
+    lon_2, lat_2, data_2 = source
+    coloc_1 = typed_dict({n: np.full(lon_1.shape, np.nan) for n in data_1})
+    coloc_2 = typed_dict({n: np.full(lon_1.shape, np.nan) for n in data_2})
+    t0 = time.perf_counter()
+    out = kernel(
+        lon_1,
+        lat_1,
+        lon_2,
+        lat_2,
+        typed_dict(data_1),
+        typed_dict(data_2),
+        1,
+        coloc_1,
+        coloc_2,
+        "wind_speed",
+        RADIUS_KM,
+    )
+    return time.perf_counter() - t0, out
+
+
+def main():
+    rng = np.random.default_rng(0)
+    # JIT compilation
+    warmup = synthetic_swath((4, 4), 0.25, rng), synthetic_swath((8, 8), 0.01, rng)
+    run(compute_colocated_data, *warmup)
+    run(full_scan_colocated_data, *warmup)
+
+    print(f"{'target px':>10} {'source px':>10} {'indexed (s)':>12} {'full scan (s)':>14}")
+    for side in [10, 20, 40, 80, 160]:
+        target = synthetic_swath((side, side), 0.25, rng)
+        # the source swath has a 10 times finer resolution and covers the same area
+        source = synthetic_swath((10 * side, 10 * side), 0.025, rng)
+        t_indexed, (ref_1, ref_2) = run(compute_colocated_data, target, source)
+        if side <= 40:
+            t_full, (full_1, full_2) = run(full_scan_colocated_data, target, source)
+            for name in full_2:
+                np.testing.assert_array_equal(ref_2[name], full_2[name])
+            for name in full_1:
+                np.testing.assert_array_equal(ref_1[name], full_1[name])
+            full = f"{t_full:14.3f}"
+        else:
+            full = f"{'skipped':>14}"
+        print(f"{side * side:10d} {100 * side * side:10d} {t_indexed:12.3f} {full}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+import csv
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from .tools import (
+    set_config,
+    load_config,
+    call_meta_class,
+    extract_start_stop_dates_from_filename,
+    get_all_comparison_files,
+)
+from .campaign_store import CampaignStore
+from .generate_coloc import GenerateColoc, get_minimal_area_in_km_squared
+from .intersection_tools import join_footprints
+from .roi import get_group_region_of_interest
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FIELDS = ["product1_id", "status", "colocated_files", "error"]
+
+
+def read_product_ids(products):
+    """
+    Get product paths from a list of paths or from a listing file (txt file with one path per line).
+
+    Parameters
+    ----------
+    products: str | list[str]
+        Listing file or product paths
+
+    Returns
+    -------
+    list[str]
+        Product paths, without duplicates, in the given order
+    """
+    if isinstance(products, str):
+        with open(products, "r") as listing:
+            products = [line.strip() for line in listing if line.strip()]
+    return list(dict.fromkeys(products))
+
+
+def get_product_time_range(product_id, product_generation=False, use_meta_cache=True):
+    """
+    Get start and stop dates of a product, from its filename if possible, else by opening it (the opened product is
+    kept in the meta cache, so it is not opened again by `GenerateColoc`).
+
+    Returns
+    -------
+    numpy.datetime64, numpy.datetime64
+        Start and stop dates
+    """
+    try:
+        dates = extract_start_stop_dates_from_filename(product_id)
+    except ValueError:
+        dates = None
+    if dates is None:
+        meta = call_meta_class(
+            product_id, product_generation=product_generation, use_cache=use_meta_cache
+        )
+        dates = meta.start_date, meta.stop_date
+    return dates
+
+
+def get_product_footprint(product_id, product_generation=False, use_meta_cache=True):
+    """
+    Get the footprint of a product by opening it (the opened product is kept in the meta cache, so it is not opened
+    again by `GenerateColoc`).
+
+    Returns
+    -------
+    shapely.geometry.base.BaseGeometry | None
+        Footprint, None if it is unknown
+    """
+    meta = call_meta_class(
+        product_id, product_generation=product_generation, use_cache=use_meta_cache
+    )
+    try:
+        return meta.footprint or None
+    except (ValueError, AttributeError):
+        # some meta classes raise when their footprint is unknown, global grids have none
+        return None
+
+
+def get_products_footprints(product_ids, product_generation=False, use_meta_cache=True):
+    """
+    Get the footprints of products (see `get_product_footprint`). Products that can't be opened are skipped: their
+    failure is reported by their co-location.
+
+    Returns
+    -------
+    dict[str, shapely.geometry.base.BaseGeometry | None]
+        Footprint by product path (None if it is unknown)
+    """
+    footprints = {}
+    for product_id in product_ids:
+        try:
+            footprints[product_id] = get_product_footprint(
+                product_id, product_generation, use_meta_cache
+            )
+        except Exception as e:
+            logger.debug(f"Footprint of {product_id} not read: {e!r}")
+    return footprints
+
+
+def get_candidates_by_footprint(
+    product_ids,
+    comparison_files,
+    minimal_area,
+    product_generation=False,
+    use_meta_cache=True,
+    footprints=None,
+):
+    """
+    Get the comparison products of each product of a group with a single spatial join between the footprints of
+    the products and the footprints of the comparison products registered in the product catalog (see
+    `coloc_sat.intersection_tools.join_footprints`).
+
+    Parameters
+    ----------
+    product_ids: list[str]
+        Product paths
+    comparison_files: list[str]
+        Comparison products of the group
+    minimal_area: float
+        Minimal intersection area in square kilometers
+    product_generation: bool
+        True if co-location products will be created (used to open the products)
+    use_meta_cache: bool
+        True to keep the opened products in the meta cache
+    footprints: dict | None
+        Footprints of the products (see `get_products_footprints`), read if None
+
+    Returns
+    -------
+    dict[str, list[str]] | None
+        Comparison products by product path: products whose footprint intersects the one of the product on at least
+        `minimal_area`, and products without known footprint. None if no catalog is set.
+    """
+    catalog_path = load_config().get("catalog", None)
+    if catalog_path is None:
+        return None
+    from .catalog import ProductCatalog
+
+    with ProductCatalog(catalog_path) as catalog:
+        comparison_footprints = catalog.footprints(comparison_files)
+    if footprints is None:
+        footprints = get_products_footprints(product_ids, product_generation, use_meta_cache)
+    footprints = [footprints.get(product_id, None) for product_id in product_ids]
+    # stored footprints use [-180, 180] longitudes, another convention can't be compared with them
+    footprints = [
+        footprint
+        if (footprint is not None)
+        and (-180 <= footprint.bounds[0])
+        and (footprint.bounds[2] <= 180)
+        else None
+        for footprint in footprints
+    ]
+    index1, index2, _, _ = join_footprints(
+        footprints, comparison_footprints, minimal_area
+    )
+    unknown = [
+        position
+        for position, footprint in enumerate(comparison_footprints)
+        if footprint is None
+    ]
+    candidates = {}
+    for position, (product_id, footprint) in enumerate(zip(product_ids, footprints)):
+        if footprint is None:
+            candidates[product_id] = list(comparison_files)
+        else:
+            hits = set(index2[index1 == position]) | set(unknown)
+            candidates[product_id] = [
+                file for i, file in enumerate(comparison_files) if i in hits
+            ]
+    return candidates
+
+
+def group_products_by_time(
+    product_ids, delta_time=60, product_generation=False, use_meta_cache=True
+):
+    """
+    Group products whose time windows (start and stop dates extended by `delta_time`) overlap, so that comparison
+    products are searched once per group.
+
+    Parameters
+    ----------
+    product_ids: list[str]
+        Product paths
+    delta_time: int
+        Maximum time (in minutes) that can separate two product acquisitions
+    product_generation: bool
+        True if co-location products will be created (used if a product must be opened to get its dates)
+    use_meta_cache: bool
+        True to keep the products opened to get their dates in the meta cache
+
+    Returns
+    -------
+    list[dict]
+        Groups, sorted by start date, with keys `product_ids`, `start_date` and `stop_date` (time window of the group)
+    """
+    delta = np.timedelta64(delta_time, "m")
+    windows = []
+    for product_id in product_ids:
+        start, stop = get_product_time_range(
+            product_id, product_generation, use_meta_cache
+        )
+        windows.append((start - delta, stop + delta, product_id))
+    windows.sort(key=lambda w: w[0])
+    groups = []
+    for start, stop, product_id in windows:
+        if groups and start <= groups[-1]["stop_date"]:
+            groups[-1]["product_ids"].append(product_id)
+            groups[-1]["stop_date"] = max(groups[-1]["stop_date"], stop)
+        else:
+            groups.append(
+                {"product_ids": [product_id], "start_date": start, "stop_date": stop}
+            )
+    return groups
+
+
+def get_group_roi(group, footprints):
+    """
+    Get the region of interest of a time group (see `group_products_by_time`): bounding box of the footprints of its
+    products and time window of the group (see `coloc_sat.roi.get_group_region_of_interest`).
+
+    Parameters
+    ----------
+    group: dict
+        Time group
+    footprints: dict
+        Footprints of the products of the group that could be opened (see `get_products_footprints`)
+
+    Returns
+    -------
+    dict | None
+        Region of interest, None if a footprint is unknown
+    """
+    return get_group_region_of_interest(
+        list(footprints.values()), group["start_date"], group["stop_date"]
+    )
+
+
+def write_summary(summary_path, rows):
+    """
+    Write the summary of a batch as a csv file (columns: product1_id, status, colocated_files, error).
+
+    Parameters
+    ----------
+    summary_path: str
+        Path of the summary file
+    rows: list[dict]
+        Summary of each product
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(summary_path)), exist_ok=True)
+    with open(summary_path, "w", newline="") as summary_file:
+        writer = csv.DictWriter(summary_file, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def coloc_batch(
+    product1_ids,
+    ds_name,
+    destination_folder="/tmp",
+    delta_time=60,
+    summary_path=None,
+    **kwargs,
+):
+    """
+    Generate co-locations between many products and a mission in a single process. Products are grouped by
+    overlapping time windows; the products of `ds_name` are searched once per group, and the opened comparison
+    products are shared between the runs through the meta cache (see `coloc_sat.meta_cache`). A failure on a product
+    doesn't stop the batch. The global daily grids are read in the region of interest of the whole group (see
+    `coloc_sat.roi.get_group_region_of_interest`), so that they are opened once per group too. The campaign store (if
+    any) is consolidated at the end of the batch (see `coloc_sat.campaign_store.CampaignStore.consolidate`).
+
+    Parameters
+    ----------
+    product1_ids: str | list[str]
+        Product paths or listing file of product paths (see `read_product_ids`)
+    ds_name: str
+        Name of the dataset to be compared
+    destination_folder: str
+        Folder path where listing and / or co-location products will be created
+    delta_time: int
+        Maximum time (in minutes) that can separate two product acquisitions
+    summary_path: str | None
+        Path of the summary file. Default is `coloc_batch_summary.csv` in `destination_folder`.
+    kwargs: dict
+        Other arguments of `coloc_sat.GenerateColoc` (`level`, `input_ds`, `listing`, `product_generation`, ...)
+
+    Returns
+    -------
+    list[dict]
+        Summary of each product: path, exit status (0: co-locations found, 20: no co-location found, 1: error),
+        co-located files and error message
+    """
+    if kwargs.get("colocation_filename", None) is not None:
+        raise ValueError(
+            "colocation_filename can't be used in batch mode: each co-location product needs its own name"
+        )
+    if kwargs.get("config", None) is not None:
+        set_config(kwargs["config"])
+    product_ids = read_product_ids(product1_ids)
+    product_generation = kwargs.get("product_generation", True)
+    use_meta_cache = kwargs.get("use_meta_cache", True)
+    rows = []
+    groups = group_products_by_time(
+        product_ids, delta_time, product_generation, use_meta_cache
+    )
+    logger.info(f"{len(product_ids)} products divided in {len(groups)} time groups")
+    for group in groups:
+        start_date = pd.to_datetime(group["start_date"])
+        if ds_name != "ERA5":
+            # day level research of the comparison products begins at midnight, so that every day is searched
+            start_date = start_date.floor("D")
+        comparison_files = get_all_comparison_files(
+            start_date,
+            pd.to_datetime(group["stop_date"]),
+            ds_name=ds_name,
+            input_ds=kwargs.get("input_ds", None),
+            level=kwargs.get("level", None),
+        )
+        # the products of the group are opened once for their footprints (spatial join with the catalog, region of
+        # interest), whatever the meta cache setting
+        footprints = {}
+        if kwargs.get("read_roi", True) or (load_config().get("catalog", None) is not None):
+            footprints = get_products_footprints(
+                group["product_ids"], product_generation, use_meta_cache
+            )
+        candidates = get_candidates_by_footprint(
+            group["product_ids"],
+            comparison_files,
+            get_minimal_area_in_km_squared(kwargs.get("minimal_area", 1600)),
+            product_generation,
+            use_meta_cache,
+            footprints=footprints,
+        )
+        group_kwargs = kwargs
+        if kwargs.get("read_roi", True):
+            group_kwargs = dict(kwargs, roi=get_group_roi(group, footprints))
+        for product_id in group["product_ids"]:
+            row = {"product1_id": product_id, "colocated_files": "", "error": ""}
+            try:
+                generator = GenerateColoc(
+                    product_id,
+                    destination_folder=destination_folder,
+                    delta_time=delta_time,
+                    ds_name=ds_name,
+                    comparison_files=(
+                        candidates[product_id]
+                        if candidates is not None
+                        else comparison_files
+                    ),
+                    **group_kwargs,
+                )
+                row["status"] = generator.save_results()
+                row["colocated_files"] = " ".join(generator.colocated_files or [])
+            except Exception as e:
+                logger.exception(f"Co-location failed for {product_id}")
+                row["status"] = 1
+                row["error"] = repr(e)
+            rows.append(row)
+    if kwargs.get("campaign_store", None) is not None:
+        # groups written by this batch are opened from the consolidated metadata of a zarr store
+        with CampaignStore(kwargs["campaign_store"]) as store:
+            store.consolidate()
+    if summary_path is None:
+        summary_path = os.path.join(destination_folder, "coloc_batch_summary.csv")
+    write_summary(summary_path, rows)
+    logger.info(f"Batch summary written in {summary_path}")
+    return rows
@@ -0,0 +1,360 @@
+import contextlib
+import logging
+import os
+import shutil
+import sqlite3
+import subprocess
+import time
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from .encoding import build_encoding, truncate_times
+from .catalog import to_ns
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ["netcdf", "zarr"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pairs (
+    pair_group TEXT PRIMARY KEY,
+    product1 TEXT NOT NULL,
+    product2 TEXT NOT NULL,
+    name1 TEXT,
+    name2 TEXT,
+    start_date INTEGER NOT NULL,
+    stop_date INTEGER NOT NULL,
+    area_intersection REAL,
+    time_difference TEXT,
+    counted_points INTEGER,
+    bias REAL,
+    standard_deviation REAL,
+    scatter_index REAL,
+    written_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pairs_time ON pairs (start_date, stop_date);
+CREATE TABLE IF NOT EXISTS store_info (
+    key TEXT PRIMARY KEY,
+    value REAL
+);
+"""
+
+
+def _float_attr(attrs, name):
+    try:
+        return float(attrs[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def pair_group_name(product1, product2):
+    """
+    Name of the group of a co-located pair in a campaign store (same as the co-location filename without
+    extension).
+
+    Returns
+    -------
+    str
+        Group name
+    """
+    name1 = os.path.basename(product1.rstrip("/")).split(".")[0]
+    name2 = os.path.basename(product2.rstrip("/")).split(".")[0]
+    return f"sat_coloc_{name1}__{name2}"
+
+
+class CampaignStore:
+    """
+    Single store for the co-location products of a campaign: each co-located pair is a group of a NetCDF4 file or
+    of a Zarr store, instead of one netcdf file per pair. A SQLite index (`<path>.index.sqlite`) registers each
+    pair with its products, dates, intersection area and wind speed statistics, so that the pairs of a time range
+    are found without reading the store.
+
+    Concurrent writers are safe: with the netcdf backend, appends are serialized with a lock file
+    (`<path>.lock`, POSIX systems); with the zarr backend, workers write disjoint groups in parallel and the
+    metadata are consolidated by `CampaignStore.consolidate`.
+
+    A replaced group of a NetCDF4 file leaves its space unused in the file (HDF5 doesn't reclaim it): the file can be
+    repacked by `CampaignStore.consolidate`.
+
+    Parameters
+    ----------
+    path: str
+        Path of the store (a `.zarr` path selects the zarr backend)
+    backend: str | None
+        'netcdf' or 'zarr'. Default is given by the extension of `path`.
+    encoding_options: dict | None
+        Resolved encoding options of the co-location products (see `coloc_sat.encoding.get_encoding_options`)
+    """
+
+    def __init__(self, path, backend=None, encoding_options=None):
+        if backend is None:
+            backend = "zarr" if path.rstrip("/").endswith(".zarr") else "netcdf"
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown campaign store backend {backend}. Choose from {BACKENDS}")
+        self.path = path
+        self.backend = backend
+        self.encoding_options = encoding_options
+        self.index_path = f"{path.rstrip('/')}.index.sqlite"
+        directory = os.path.dirname(os.path.abspath(self.index_path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(self.index_path, timeout=60)
+        self._connection.executescript(_SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __contains__(self, group):
+        cursor = self._connection.execute(
+            "SELECT 1 FROM pairs WHERE pair_group = ?", (group,)
+        )
+        return cursor.fetchone() is not None
+
+    def _encoding(self, ds):
+        if self.encoding_options is None:
+            return {}
+        options = dict(self.encoding_options)
+        if self.backend == "zarr":
+            # zarr stores are compressed by their default codec, and chunks are given with another key
+            options["compression"] = "none"
+            options["chunks"] = None
+            encoding = build_encoding(ds, options)
+            chunks = self.encoding_options["chunks"] or {}
+            if chunks:
+                for name, variable in ds.variables.items():
+                    if variable.ndim > 0:
+                        encoding.setdefault(name, {})["chunks"] = tuple(
+                            min(chunks.get(dim, size), size)
+                            for dim, size in zip(variable.dims, variable.shape)
+                        )
+            return encoding
+        if options["engine"] is None:
+            options["engine"] = "h5netcdf"
+        return build_encoding(ds, options)
+
+    @contextlib.contextmanager
+    def _lock(self):
+        """
+        Exclusive lock of the netcdf file between the processes (lock file `<path>.lock`, POSIX systems).
+        """
+        with open(f"{self.path}.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _write_netcdf_group(self, ds, group, encoding):
+        engine = (self.encoding_options or {}).get("engine") or "h5netcdf"
+        with self._lock():
+            if os.path.exists(self.path):
+                import h5py
+
+                # a group written by a failed or overwritten run is replaced (its space isn't reclaimed, see
+                # `CampaignStore.consolidate`)
+                with h5py.File(self.path, "a") as store:
+                    if group in store:
+                        del store[group]
+            mode = "a" if os.path.exists(self.path) else "w"
+            ds.to_netcdf(
+                self.path, mode=mode, group=group, engine=engine, encoding=encoding
+            )
+
+    def append(self, ds, product1, product2, start_date, stop_date, group=None):
+        """
+        Write the co-location product of a pair as a group of the store, and register it in the index. An existing
+        group with the same name is replaced.
+
+        Parameters
+        ----------
+        ds: xarray.Dataset
+            Co-location product (`coloc_sat.ProductIntersection.coloc_product_datasets`)
+        product1: str
+            Path of the first product
+        product2: str
+            Path of the second product
+        start_date: numpy.datetime64
+            Start date of the pair (earliest start of the 2 products)
+        stop_date: numpy.datetime64
+            Stop date of the pair (latest stop of the 2 products)
+        group: str | None
+            Group name. Default is given by `pair_group_name`.
+
+        Returns
+        -------
+        str
+            Group name
+        """
+        if group is None:
+            group = pair_group_name(product1, product2)
+        encoding = self._encoding(ds)
+        ds = truncate_times(ds, encoding)
+        if self.backend == "zarr":
+            ds.to_zarr(
+                self.path, group=group, mode="w", encoding=encoding, consolidated=False
+            )
+        else:
+            self._write_netcdf_group(ds, group, encoding)
+        attrs = ds.attrs
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO pairs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    group,
+                    product1,
+                    product2,
+                    os.path.basename(product1.rstrip("/")),
+                    os.path.basename(product2.rstrip("/")),
+                    to_ns(start_date),
+                    to_ns(stop_date),
+                    _float_attr(attrs, "area_intersection"),
+                    str(attrs.get("time_difference", "")),
+                    int(attrs["counted_points"]) if "counted_points" in attrs else None,
+                    _float_attr(attrs, "Bias"),
+                    _float_attr(attrs, "Standard deviation"),
+                    _float_attr(attrs, "scatter_index"),
+                    time.time(),
+                ),
+            )
+        logger.info(f"Co-location product added in {self.path} (group {group})")
+        return group
+
+    def consolidate(self, repack=False):
+        """
+        Consolidate the metadata of a zarr store, once all the workers have written their groups: the groups written
+        before are then opened from the consolidated metadata (see `CampaignStore.open_pairs`), the ones written
+        after from their own metadata.
+
+        With the netcdf backend, the file is repacked with `h5repack` if `repack` is True, so that the space of the
+        replaced groups is reclaimed. Appends wait for the end of the repack.
+
+        Parameters
+        ----------
+        repack: bool
+            Repack the NetCDF4 file (requires the `h5repack` tool of HDF5)
+        """
+        if not os.path.exists(self.path):
+            return
+        started = time.time()
+        if self.backend == "zarr":
+            import zarr
+
+            zarr.consolidate_metadata(self.path)
+            with self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO store_info VALUES ('consolidated_at', ?)", (started,)
+                )
+            logger.info(f"Metadata of {self.path} consolidated")
+        elif repack:
+            if shutil.which("h5repack") is None:
+                raise RuntimeError(f"h5repack is needed to repack {self.path}")
+            with self._lock():
+                repacked = f"{self.path}.repack"
+                subprocess.run(["h5repack", self.path, repacked], check=True)
+                os.replace(repacked, self.path)
+            logger.info(f"{self.path} repacked")
+
+    def _consolidated_at(self):
+        row = self._connection.execute(
+            "SELECT value FROM store_info WHERE key = 'consolidated_at'"
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def query(self, start_date=None, stop_date=None):
+        """
+        Get the index of the pairs whose time range overlaps [`start_date`, `stop_date`].
+
+        Returns
+        -------
+        pandas.DataFrame
+            Index of the pairs (one row per group), sorted by start date
+        """
+        conditions = []
+        params = []
+        if stop_date is not None:
+            conditions.append("start_date <= ?")
+            params.append(to_ns(stop_date))
+        if start_date is not None:
+            conditions.append("stop_date >= ?")
+            params.append(to_ns(start_date))
+        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+        index = pd.read_sql_query(
+            f"SELECT * FROM pairs {where} ORDER BY start_date, pair_group",
+            self._connection,
+            params=params,
+        )
+        for column in ["start_date", "stop_date"]:
+            index[column] = pd.to_datetime(index[column].astype(np.int64), unit="ns")
+        return index
+
+    def open_pairs(self, start_date=None, stop_date=None):
+        """
+        Open (lazily) the co-location products of the pairs whose time range overlaps [`start_date`, `stop_date`],
+        as the children of a single tree.
+
+        Returns
+        -------
+        xarray.DataTree
+            Tree whose children are the co-location products, by group name, sorted by start date
+        """
+        index = self.query(start_date, stop_date)
+        if self.backend == "zarr":
+            consolidated_at = self._consolidated_at()
+            # groups written after the consolidation aren't in the consolidated metadata, or are outdated there
+            products = {
+                group: xr.open_dataset(
+                    self.path,
+                    group=group,
+                    engine="zarr",
+                    consolidated=(consolidated_at is not None) and (written_at < consolidated_at),
+                )
+                for group, written_at in zip(index["pair_group"], index["written_at"])
+            }
+        else:
+            # the file is opened once and shared by the groups (xarray file manager)
+            products = {
+                group: xr.open_dataset(self.path, group=group, engine="h5netcdf")
+                for group in index["pair_group"]
+            }
+        return xr.DataTree.from_dict(products)
+
+    def open_matchups(self, start_date=None, stop_date=None):
+        """
+        Open (lazily) the matchups of the pairs whose time range overlaps [`start_date`, `stop_date`] (products
+        written with the `matchups` output mode, see `coloc_sat.GenerateColoc`), as a single table.
+
+        Returns
+        -------
+        xarray.Dataset
+            Matchups of all the pairs along the `obs` dimension, with the group of each matchup in `pair_group`
+            (attributes of the pairs are in the index, see `CampaignStore.query`)
+        """
+        tables = []
+        for group, node in self.open_pairs(start_date, stop_date).children.items():
+            table = node.to_dataset()
+            if set(table.dims) != {"obs"}:
+                raise ValueError(
+                    f"Group {group} of {self.path} isn't a matchup table (dimensions {dict(table.sizes)})"
+                )
+            tables.append(
+                table.assign(pair_group=("obs", np.full(table.sizes["obs"], group, dtype=object)))
+            )
+        if not tables:
+            return xr.Dataset()
+        return xr.concat(
+            tables, dim="obs", data_vars="all", coords="minimal", join="outer", combine_attrs="drop"
+        )
@@ -0,0 +1,436 @@
+import logging
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from .discovery import DirectoryCache, find_template_paths
+from .tools import (
+    get_acquisition_root_paths,
+    date_schemes,
+    extract_start_stop_dates_from_sar,
+    extract_start_stop_dates_from_hy,
+    open_l2,
+    get_l2_footprint,
+)
+
+logger = logging.getLogger(__name__)
+
+SAR_DATASETS = ["S1", "RS2", "RCM"]
+# Datasets for which a catalog can be built (ERA5 files are found from their date only)
+CATALOG_DATASETS = SAR_DATASETS + ["HY2", "SMOS", "SMAP", "WS"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    path TEXT PRIMARY KEY,
+    ds_name TEXT NOT NULL,
+    level INTEGER,
+    start_date INTEGER NOT NULL,
+    stop_date INTEGER NOT NULL,
+    min_lon REAL,
+    min_lat REAL,
+    max_lon REAL,
+    max_lat REAL,
+    footprint BLOB,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS products_ds_time ON products (ds_name, start_date, stop_date);
+"""
+
+
+def to_ns(date):
+    """
+    Convert a date to an integer number of nanoseconds since epoch, the time unit used in the catalog.
+
+    Parameters
+    ----------
+    date: numpy.datetime64 | datetime.datetime | pandas.Timestamp | str
+
+    Returns
+    -------
+    int
+        Nanoseconds since 1970-01-01
+    """
+    return int(pd.Timestamp(date).value)
+
+
+class ProductCatalog:
+    """
+    On-disk (SQLite) catalog of products: path, dataset name, level, start/stop dates, footprint (WKB) with its
+    bounding box, and modification time of the file when it was indexed. It answers time range (and bounding box)
+    queries without scanning the file system nor opening products.
+
+    Parameters
+    ----------
+    path: str
+        Path of the SQLite database. It is created if it doesn't exist.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = sqlite3.connect(path, timeout=60)
+        self._connection.executescript(_SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def upsert(self, records):
+        """
+        Add or replace products in the catalog.
+
+        Parameters
+        ----------
+        records: Iterable[dict]
+            Products with keys `path`, `ds_name`, `level`, `start_date`, `stop_date`, `footprint` (shapely geometry
+            or None) and `mtime`.
+        """
+        rows = []
+        for rec in records:
+            fp = rec.get("footprint")
+            if fp is not None and not fp.is_empty:
+                bounds = fp.bounds
+                wkb = shapely.to_wkb(fp)
+            else:
+                bounds = (None, None, None, None)
+                wkb = None
+            rows.append(
+                (
+                    rec["path"],
+                    rec["ds_name"],
+                    rec.get("level"),
+                    to_ns(rec["start_date"]),
+                    to_ns(rec["stop_date"]),
+                    *bounds,
+                    wkb,
+                    rec["mtime"],
+                )
+            )
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def remove(self, paths):
+        """
+        Remove products from the catalog.
+
+        Parameters
+        ----------
+        paths: Iterable[str]
+            Paths of the products to remove
+        """
+        with self._connection:
+            self._connection.executemany(
+                "DELETE FROM products WHERE path = ?", [(p,) for p in paths]
+            )
+
+    def clear(self, ds_name=None):
+        """
+        Remove all the products of a dataset (or all the products if `ds_name` is None).
+        """
+        with self._connection:
+            if ds_name is None:
+                self._connection.execute("DELETE FROM products")
+            else:
+                self._connection.execute(
+                    "DELETE FROM products WHERE ds_name = ?", (ds_name,)
+                )
+
+    def known_mtimes(self, ds_name, start_date=None, stop_date=None):
+        """
+        Get the modification times registered for the products of a dataset.
+
+        Returns
+        -------
+        dict[str, float]
+            Modification time by product path
+        """
+        query, params = self._where(ds_name, start_date, stop_date)
+        cursor = self._connection.execute(f"SELECT path, mtime FROM products {query}", params)
+        return dict(cursor.fetchall())
+
+    @staticmethod
+    def _where(ds_name, start_date=None, stop_date=None, level=None, bbox=None):
+        conditions = ["ds_name = ?"]
+        params = [ds_name]
+        # interval overlap between the products and [start_date, stop_date]
+        if stop_date is not None:
+            conditions.append("start_date <= ?")
+            params.append(to_ns(stop_date))
+        if start_date is not None:
+            conditions.append("stop_date >= ?")
+            params.append(to_ns(start_date))
+        if level is not None:
+            conditions.append("level = ?")
+            params.append(level)
+        # stored footprints use [-180, 180] longitudes, another convention can't be compared with them
+        if (bbox is not None) and (-180 <= bbox[0]) and (bbox[2] <= 180):
+            # products without footprint (global daily grids, ...) are always kept
+            conditions.append(
+                "(footprint IS NULL OR "
+                "(min_lon <= ? AND max_lon >= ? AND min_lat <= ? AND max_lat >= ?))"
+            )
+            min_lon, min_lat, max_lon, max_lat = bbox
+            params += [max_lon, min_lon, max_lat, min_lat]
+        return "WHERE " + " AND ".join(conditions), params
+
+    def query(self, ds_name, start_date=None, stop_date=None, level=None, bbox=None):
+        """
+        Get the products of a dataset whose time range overlaps [`start_date`, `stop_date`] and, if `bbox` is given,
+        whose footprint bounding box overlaps `bbox`.
+
+        Parameters
+        ----------
+        ds_name: str
+            Dataset name (ex: 'S1', 'HY2', 'SMOS')
+        start_date: numpy.datetime64 | datetime.datetime | None
+            Start date of the research
+        stop_date: numpy.datetime64 | datetime.datetime | None
+            Stop date of the research
+        level: int | None
+            Product level (SAR datasets only)
+        bbox: tuple[float] | None
+            (min_lon, min_lat, max_lon, max_lat). Ignored if its longitudes are not within [-180, 180].
+
+        Returns
+        -------
+        list[str]
+            Product paths, sorted by start date
+        """
+        return [rec["path"] for rec in self.query_records(ds_name, start_date, stop_date, level, bbox)]
+
+    def query_records(self, ds_name, start_date=None, stop_date=None, level=None, bbox=None):
+        """
+        Same as `ProductCatalog.query` but get whole records. Dates are numpy.datetime64 and footprints are shapely
+        geometries (or None).
+
+        Returns
+        -------
+        list[dict]
+            Products, sorted by start date
+        """
+        query, params = self._where(ds_name, start_date, stop_date, level, bbox)
+        cursor = self._connection.execute(
+            "SELECT path, ds_name, level, start_date, stop_date, footprint, mtime FROM products "
+            + f"{query} ORDER BY start_date, path",
+            params,
+        )
+        return [
+            {
+                "path": path,
+                "ds_name": name,
+                "level": lvl,
+                "start_date": np.datetime64(start, "ns"),
+                "stop_date": np.datetime64(stop, "ns"),
+                "footprint": shapely.from_wkb(wkb) if wkb is not None else None,
+                "mtime": mtime,
+            }
+            for path, name, lvl, start, stop, wkb, mtime in cursor.fetchall()
+        ]
+
+    def query_table(self, ds_name, start_date=None, stop_date=None, level=None):
+        """
+        Same as `ProductCatalog.query` but get the products as columns, for collection-level processing (see
+        `coloc_sat.collection_join`).
+
+        Returns
+        -------
+        pandas.DataFrame
+            Columns `path`, `level`, `start_date`, `stop_date` (datetime64[ns]) and `footprint` (shapely geometries
+            or None), sorted by start date
+        """
+        query, params = self._where(ds_name, start_date, stop_date, level)
+        cursor = self._connection.execute(
+            f"SELECT path, level, start_date, stop_date, footprint FROM products {query} "
+            + "ORDER BY start_date, path",
+            params,
+        )
+        rows = cursor.fetchall()
+        paths, levels, starts, stops, wkbs = (
+            map(list, zip(*rows)) if rows else ([], [], [], [], [])
+        )
+        return pd.DataFrame(
+            {
+                "path": paths,
+                "level": pd.array(levels, dtype="Int64"),
+                "start_date": np.array(starts, dtype="int64").view("datetime64[ns]"),
+                "stop_date": np.array(stops, dtype="int64").view("datetime64[ns]"),
+                "footprint": shapely.from_wkb(np.array(wkbs, dtype=object)),
+            }
+        )
+
+    def footprints(self, paths):
+        """
+        Get the footprints of products.
+
+        Parameters
+        ----------
+        paths: Iterable[str]
+            Product paths
+
+        Returns
+        -------
+        list[shapely.geometry.base.BaseGeometry | None]
+            Footprint of each product, None if it is unknown or if the product isn't in the catalog
+        """
+        paths = list(paths)
+        found = {}
+        # SQLite limits the number of parameters of a query
+        for start in range(0, len(paths), 500):
+            chunk = paths[start : start + 500]
+            cursor = self._connection.execute(
+                "SELECT path, footprint FROM products WHERE footprint IS NOT NULL AND path IN "
+                + f"({', '.join('?' * len(chunk))})",
+                chunk,
+            )
+            found.update(cursor.fetchall())
+        return [
+            shapely.from_wkb(found[path]) if path in found else None for path in paths
+        ]
+
+
+def iter_product_paths(ds_name, start_date, stop_date, level=None):
+    """
+    Crawl the file system with the path templates of the configuration (`paths`) for each day between
+    `start_date` and `stop_date`.
+
+    Yields
+    ------
+    str, int | None, datetime.datetime
+        Product path, product level (SAR datasets only) and day of the directory where it has been found
+    """
+    root_paths = get_acquisition_root_paths(ds_name)
+    if ds_name in SAR_DATASETS:
+        map_levels = {"L1": 1, "L2": 2}
+        levels = [f"L{level}"] if level is not None else list(root_paths.keys())
+        templates = [(map_levels[lvl], t) for lvl in levels for t in root_paths[lvl]]
+    else:
+        templates = [(None, t) for t in root_paths]
+    # the research starts at midnight so that every day of the range is crawled
+    start_day = pd.Timestamp(start_date).floor("D").to_pydatetime()
+    stop_day = pd.Timestamp(stop_date).to_pydatetime()
+    schemes = date_schemes(start_day, stop_day, accuracy="day")
+    # listings are checked again at each use, so that the crawl sees every new product
+    cache = DirectoryCache(ttl=0)
+    for lvl, template in templates:
+        for scheme in schemes:
+            day = datetime.strptime(scheme, "%Y%m%d")
+            # sub-daily parts of the templates are matched with wildcards (day schemes)
+            for path in find_template_paths(template, [scheme], cache=cache):
+                yield path, lvl, day
+
+
+def extract_catalog_record(path, ds_name, level=None, day=None):
+    """
+    Get the catalog record of a product. Dates are taken from the filename when it is possible (SAR), else from
+    the file (HY2), else from the day of the directory (daily products). Footprints are only stored for SAR level 2
+    products (read from their attributes).
+
+    Parameters
+    ----------
+    path: str
+        Product path
+    ds_name: str
+        Dataset name
+    level: int | None
+        Product level (SAR datasets only)
+    day: datetime.datetime | None
+        Day of the directory where the product has been found
+
+    Returns
+    -------
+    dict
+        Catalog record (see `ProductCatalog.upsert`)
+    """
+    footprint = None
+    if ds_name in SAR_DATASETS:
+        start, stop = extract_start_stop_dates_from_sar(path)
+        if level == 2:
+            footprint = get_l2_footprint(open_l2(path))
+    elif ds_name == "HY2":
+        start, stop = extract_start_stop_dates_from_hy(path)
+    else:
+        if day is None:
+            raise ValueError(f"The day of the daily product {path} must be given")
+        start = np.datetime64(day, "ns")
+        stop = np.datetime64(day + timedelta(days=1), "ns") - np.timedelta64(1, "ns")
+    return {
+        "path": path,
+        "ds_name": ds_name,
+        "level": level,
+        "start_date": start,
+        "stop_date": stop,
+        "footprint": footprint,
+        "mtime": os.path.getmtime(path),
+    }
+
+
+def update_catalog(catalog, ds_name, start_date, stop_date, level=None, rebuild=False):
+    """
+    Crawl the products of a dataset between 2 dates and update the catalog. Only new or modified products (based
+    on their modification time) are read, and indexed products of this time range that no longer exist are removed.
+
+    Parameters
+    ----------
+    catalog: ProductCatalog
+        Catalog to update
+    ds_name: str
+        Dataset name
+    start_date: datetime.datetime
+        Start of the crawled time range
+    stop_date: datetime.datetime
+        Stop of the crawled time range
+    level: int | None
+        Product level (SAR datasets only). All levels if None.
+    rebuild: bool
+        If True, all the products of the dataset are removed from the catalog before crawling
+
+    Returns
+    -------
+    dict[str, int]
+        Number of added / updated, unchanged, removed and failed products
+    """
+    if ds_name not in CATALOG_DATASETS:
+        raise ValueError(
+            f"Catalog can't be built for {ds_name}. Choose from {CATALOG_DATASETS}"
+        )
+    if rebuild:
+        catalog.clear(ds_name)
+    # the crawl covers whole days, so does the comparison with the indexed products
+    day_start = pd.Timestamp(start_date).floor("D")
+    day_stop = pd.Timestamp(stop_date).floor("D") + pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
+    known = catalog.known_mtimes(ds_name, day_start, day_stop)
+    counts = {"updated": 0, "unchanged": 0, "removed": 0, "failed": 0}
+    seen = set()
+    records = []
+    for path, lvl, day in iter_product_paths(ds_name, start_date, stop_date, level):
+        seen.add(path)
+        try:
+            if known.get(path) == os.path.getmtime(path):
+                counts["unchanged"] += 1
+                continue
+            records.append(extract_catalog_record(path, ds_name, lvl, day))
+        except Exception as e:
+            logger.warning(f"Can't index {path}: {e}")
+            counts["failed"] += 1
+            continue
+        if len(records) >= 500:
+            catalog.upsert(records)
+            counts["updated"] += len(records)
+            records = []
+    catalog.upsert(records)
+    counts["updated"] += len(records)
+    vanished = [p for p in known if p not in seen and not os.path.exists(p)]
+    catalog.remove(vanished)
+    counts["removed"] = len(vanished)
+    return counts
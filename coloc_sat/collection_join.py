@@ -0,0 +1,280 @@
+import logging
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from .generate_coloc import get_minimal_area_in_km_squared
+from .intersection_tools import get_polygons_area_in_km_squared
+from .tools import load_config
+
+logger = logging.getLogger(__name__)
+
+# Number of reference products joined at once (bounds the size of the time windows and of the spatial indexes)
+JOIN_CHUNK_SIZE = 10000
+
+# Columns of the products tables copied in the pairs, with their name in the pairs (`ref_` / `match_` prefixes)
+_PAIR_COLUMNS = {
+    "footprint": "geometry",
+    "start_date": "start",
+    "stop_date": "end",
+    "ds_name": "dataset_id",
+    "level": "level",
+    "granule": "granule",
+    "path": "path",
+}
+
+
+def load_collection(ds_name, start_date, stop_date, level=None, catalog_path=None):
+    """
+    Get the products of a dataset whose time range overlaps [`start_date`, `stop_date`] from the product catalog
+    (see `coloc_sat.catalog`).
+
+    Parameters
+    ----------
+    ds_name: str
+        Dataset name (ex: 'S1', 'HY2', 'SMOS')
+    start_date: numpy.datetime64 | datetime.datetime | str
+        Start of the time range
+    stop_date: numpy.datetime64 | datetime.datetime | str
+        Stop of the time range
+    level: int | None
+        Product level (SAR datasets only)
+    catalog_path: str | None
+        Path of the catalog. Default is the `catalog` key of the configuration.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Columns `path`, `granule` (product name), `ds_name`, `level`, `start_date`, `stop_date` and `footprint`
+    """
+    catalog_path = catalog_path or load_config().get("catalog", None)
+    if catalog_path is None:
+        raise ValueError(
+            "A product catalog is needed to join collections (`catalog` key of the configuration)"
+        )
+    from .catalog import ProductCatalog
+
+    with ProductCatalog(catalog_path) as catalog:
+        table = catalog.query_table(ds_name, start_date, stop_date, level)
+    table["granule"] = [os.path.basename(path.rstrip("/")) for path in table["path"]]
+    table["ds_name"] = ds_name
+    return table
+
+
+def _time_pairs(ref_start, ref_stop, match_start, match_stop, ref_positions, match_positions, tolerance):
+    """
+    Every pair of `ref_positions` x `match_positions` whose time ranges are separated by less than `tolerance`.
+    """
+    in_time = (
+        ref_start[ref_positions][:, np.newaxis]
+        <= match_stop[match_positions][np.newaxis, :] + tolerance
+    ) & (
+        match_start[match_positions][np.newaxis, :]
+        <= ref_stop[ref_positions][:, np.newaxis] + tolerance
+    )
+    i, j = np.nonzero(in_time)
+    return ref_positions[i], match_positions[j]
+
+
+def join_collections(ref, match, delta_time, minimal_area=None, chunk_size=JOIN_CHUNK_SIZE):
+    """
+    Find all the pairs of products of 2 collections that can be co-located: their time ranges, extended by
+    `delta_time`, overlap (same criteria as `coloc_sat.ProductIntersection.has_intersection`) and their footprints
+    intersect on at least `minimal_area`.
+
+    Reference products are swept by chunks of `chunk_size` in start date order. For each chunk, the time window of
+    the matched products is found by a binary search on their sorted start dates, then the footprints of the
+    chunk are tested against a `shapely.STRtree` of the footprints of the window. Products without footprint
+    (global daily grids, and swaths: the catalog only stores the footprints of SAR level 2 products) are paired with
+    every product of their time window, and the intersection of such pairs is unknown.
+
+    Parameters
+    ----------
+    ref: pandas.DataFrame
+        Reference products (see `load_collection`)
+    match: pandas.DataFrame
+        Matched products (see `load_collection`)
+    delta_time: int
+        Maximum time (in minutes) that can separate two product acquisitions
+    minimal_area: float | None
+        Minimal intersection area in square kilometers. Not applied to products without footprint.
+    chunk_size: int
+        Number of reference products joined at once
+
+    Returns
+    -------
+    geopandas.GeoDataFrame
+        One row by pair, with the columns of both products (`ref_` and `match_` prefixes: `geometry`, `start`,
+        `end`, `dataset_id`, `level`, `granule`, `path`), `match_intersection` (intersection of the footprints, None
+        if a footprint is unknown) and `intersection_area` (square kilometers, NaN if a footprint is unknown), sorted
+        by reference and matched start dates.
+    """
+    # both time ranges are extended by delta_time
+    tolerance = 2 * np.timedelta64(delta_time, "m")
+    ref = ref.sort_values("start_date", kind="stable").reset_index(drop=True)
+    match = match.sort_values("start_date", kind="stable").reset_index(drop=True)
+    ref_start = ref["start_date"].to_numpy("datetime64[ns]")
+    ref_stop = ref["stop_date"].to_numpy("datetime64[ns]")
+    match_start = match["start_date"].to_numpy("datetime64[ns]")
+    match_stop = match["stop_date"].to_numpy("datetime64[ns]")
+    ref_footprints = ref["footprint"].to_numpy(dtype=object)
+    match_footprints = match["footprint"].to_numpy(dtype=object)
+    ref_known = ref_footprints != None  # noqa: E711 (element-wise comparison)
+    match_known = match_footprints != None  # noqa: E711 (element-wise comparison)
+    max_duration = (
+        (match_stop - match_start).max() if len(match) else np.timedelta64(0, "ns")
+    )
+    shapely.prepare(ref_footprints[ref_known])
+
+    ref_index, match_index = [], []
+    for chunk_start in range(0, len(ref), chunk_size):
+        chunk = np.arange(chunk_start, min(chunk_start + chunk_size, len(ref)))
+        # matched products starting before the end of the chunk, and stopping after its beginning
+        lo = np.searchsorted(
+            match_start, ref_start[chunk[0]] - tolerance - max_duration, side="left"
+        )
+        hi = np.searchsorted(match_start, ref_stop[chunk].max() + tolerance, side="right")
+        window = np.arange(lo, hi)
+        window = window[match_stop[window] + tolerance >= ref_start[chunk[0]]]
+        chunk_known = chunk[ref_known[chunk]]
+        window_known = window[match_known[window]]
+        if chunk_known.size and window_known.size:
+            tree = shapely.STRtree(match_footprints[window_known])
+            positions1, positions2 = tree.query(
+                ref_footprints[chunk_known], predicate="intersects"
+            )
+            i, j = chunk_known[positions1], window_known[positions2]
+            in_time = (ref_start[i] <= match_stop[j] + tolerance) & (
+                match_start[j] <= ref_stop[i] + tolerance
+            )
+            ref_index.append(i[in_time])
+            match_index.append(j[in_time])
+        # products without footprint are only paired by time
+        for ref_positions, match_positions in [
+            (chunk[~ref_known[chunk]], window),
+            (chunk_known, window[~match_known[window]]),
+        ]:
+            if ref_positions.size and match_positions.size:
+                i, j = _time_pairs(
+                    ref_start,
+                    ref_stop,
+                    match_start,
+                    match_stop,
+                    ref_positions,
+                    match_positions,
+                    tolerance,
+                )
+                ref_index.append(i)
+                match_index.append(j)
+    i = np.concatenate(ref_index) if ref_index else np.array([], dtype=np.int64)
+    j = np.concatenate(match_index) if match_index else np.array([], dtype=np.int64)
+
+    # intersection of the footprints, unknown (None, NaN area) when a footprint is missing
+    both_known = ref_known[i] & match_known[j]
+    intersections = np.full(len(i), None, dtype=object)
+    intersections[both_known] = shapely.intersection(
+        ref_footprints[i[both_known]], match_footprints[j[both_known]]
+    )
+    areas = get_polygons_area_in_km_squared(intersections)
+    keep = ~both_known | (areas >= (minimal_area if minimal_area is not None else 0))
+    i, j, intersections, areas = i[keep], j[keep], intersections[keep], areas[keep]
+    logger.info(
+        f"{len(i)} pairs found between {len(ref)} reference and {len(match)} matched products"
+    )
+    time_only = np.count_nonzero(~both_known[keep])
+    if time_only:
+        logger.warning(
+            f"{time_only} of {len(i)} pairs are only joined by time: the footprint of a product is unknown (the "
+            f"catalog only stores the footprints of SAR level 2 products), their intersection isn't computed"
+        )
+
+    columns = {}
+    for prefix, table, index in [("ref", ref, i), ("match", match, j)]:
+        for column, name in _PAIR_COLUMNS.items():
+            if column not in table.columns:
+                continue
+            values = table[column].to_numpy()[index]
+            if column == "footprint":
+                values = gpd.GeoSeries(values, crs="EPSG:4326")
+            columns[f"{prefix}_{name}"] = values
+    columns["match_intersection"] = gpd.GeoSeries(intersections, crs="EPSG:4326")
+    columns["intersection_area"] = areas
+    pairs = gpd.GeoDataFrame(columns, geometry="ref_geometry", crs="EPSG:4326")
+    return pairs.sort_values(["ref_start", "match_start"], kind="stable").reset_index(
+        drop=True
+    )
+
+
+def coloc_collections(
+    ds_name_1,
+    ds_name_2,
+    start_date,
+    stop_date,
+    output=None,
+    delta_time=60,
+    minimal_area="1600km2",
+    level_1=None,
+    level_2=None,
+    catalog_path=None,
+    chunk_size=JOIN_CHUNK_SIZE,
+):
+    """
+    Compute the pairs of products of 2 datasets that can be co-located in a time range, from the product catalog,
+    and write them as a parquet file usable by `coloc_sat.parquet_coloc.coloc_from_parquet` (`ds_name_1` is the
+    reference dataset, `dataset_name_1` of its configuration).
+
+    Parameters
+    ----------
+    ds_name_1: str
+        Reference dataset name
+    ds_name_2: str
+        Matched dataset name
+    start_date: numpy.datetime64 | datetime.datetime | str
+        Start of the time range of the reference products
+    stop_date: numpy.datetime64 | datetime.datetime | str
+        Stop of the time range of the reference products
+    output: str | None
+        Path of the parquet file. Not written if None.
+    delta_time: int
+        Maximum time (in minutes) that can separate two product acquisitions
+    minimal_area: int | str
+        Minimal intersection area (see `coloc_sat.GenerateColoc`)
+    level_1: int | None
+        Product level of the reference dataset (SAR datasets only)
+    level_2: int | None
+        Product level of the matched dataset (SAR datasets only)
+    catalog_path: str | None
+        Path of the catalog. Default is the `catalog` key of the configuration.
+    chunk_size: int
+        Number of reference products joined at once
+
+    Returns
+    -------
+    geopandas.GeoDataFrame
+        Pairs (see `join_collections`)
+    """
+    ref = load_collection(ds_name_1, start_date, stop_date, level_1, catalog_path)
+    # matched products can be acquired up to 2 delta_time before or after the reference products
+    margin = pd.Timedelta(minutes=2 * delta_time)
+    match = load_collection(
+        ds_name_2,
+        pd.Timestamp(start_date) - margin,
+        pd.Timestamp(stop_date) + margin,
+        level_2,
+        catalog_path,
+    )
+    pairs = join_collections(
+        ref,
+        match,
+        delta_time,
+        get_minimal_area_in_km_squared(minimal_area),
+        chunk_size=chunk_size,
+    )
+    if output is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        pairs.to_parquet(output)
+        logger.info(f"{len(pairs)} pairs written in {output}")
+    return pairs
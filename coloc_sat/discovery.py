@@ -0,0 +1,573 @@
+import functools
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Default time (in seconds) during which a directory listing is used without checking the directory again
+DEFAULT_TTL = 300
+
+# Sub-daily codes of the path templates, from the coarsest to the finest, with their duration in seconds
+_SUBDAY_CODES = ["%H", "%M", "%S"]
+_CODE_SECONDS = {"%H": 3600, "%M": 60, "%S": 1}
+# Number of values of the sub-daily codes
+_CODE_VALUES = {"%H": 24, "%M": 60, "%S": 60}
+# Format of the sub-daily part of the date schemes, by number of codes
+_SUBDAY_FORMATS = ["", "%H", "%H%M", "%H%M%S"]
+# Duration (in seconds) of the research accuracies
+ACCURACY_SECONDS = {"day": 86400, "hour": 3600, "minute": 60, "second": 1}
+# Marker of a sub-daily code matched as a group, in a component where the day is already inserted
+_GROUP_MARKER = "\x01"
+_MAGIC = re.compile(r"[*?\[%]")
+
+
+class DirectoryCache:
+    """
+    Thread-safe cache of directory listings. A listing is used without any system call during `ttl` seconds; then
+    the directory is stat-ed and listed again only if its modification time has changed. Missing directories are
+    cached too.
+
+    Parameters
+    ----------
+    ttl: float
+        Time to live of the listings in seconds
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stats = 0
+        self.listdirs = 0
+
+    def entries(self, directory):
+        """
+        Get the content of a directory.
+
+        Parameters
+        ----------
+        directory: str
+            Directory path
+
+        Returns
+        -------
+        dict[str, bool] | None
+            True for each sub-directory name, False for each other name. None if the directory doesn't exist.
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(directory)
+            if (cached is not None) and (now < cached[0]):
+                self.hits += 1
+                return cached[2]
+            self.stats += 1
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            mtime = None
+        if (cached is not None) and (cached[1] == mtime):
+            names = cached[2]
+            with self._lock:
+                self.hits += 1
+        elif mtime is None:
+            names = None
+        else:
+            try:
+                with os.scandir(directory) as scan:
+                    names = {entry.name: entry.is_dir() for entry in scan}
+            except OSError:
+                names = None
+            with self._lock:
+                self.listdirs += 1
+        with self._lock:
+            self._entries[directory] = (now + self.ttl, mtime, names)
+        return names
+
+    def clear(self):
+        """
+        Remove all the cached listings and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.stats = 0
+            self.listdirs = 0
+
+    def info(self):
+        """
+        Get cache statistics
+
+        Returns
+        -------
+        dict
+            Number of hits, stat and listdir calls, cached directories and time to live
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "stats": self.stats,
+                "listdirs": self.listdirs,
+                "entries": len(self._entries),
+                "ttl": self.ttl,
+            }
+
+
+_directory_cache = DirectoryCache()
+
+
+def get_directory_cache():
+    """
+    Get the process-wide cache used by `find_template_paths`
+
+    Returns
+    -------
+    DirectoryCache
+        Directory cache
+    """
+    return _directory_cache
+
+
+def _glob_to_regex(pattern):
+    """
+    Translate a glob path component (`*`, `?`, `[...]`) to a regular expression. Group markers of sub-daily codes
+    become 2 digits named groups (a back reference when the code is repeated).
+    """
+    regex = []
+    groups = set()
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            regex.append(".*")
+        elif c == "?":
+            regex.append(".")
+        elif c == _GROUP_MARKER:
+            i += 1
+            code = pattern[i]
+            regex.append(f"(?P={code})" if code in groups else f"(?P<{code}>\\d{{2}})")
+            groups.add(code)
+        elif c == "[":
+            j = i + 1
+            if (j < n) and (pattern[j] == "!"):
+                j += 1
+            if (j < n) and (pattern[j] == "]"):
+                j += 1
+            j = pattern.find("]", j)
+            if j == -1:
+                regex.append(re.escape(c))
+            else:
+                chars = pattern[i + 1 : j].replace("\\", "\\\\")
+                if chars.startswith("!"):
+                    chars = "^" + chars[1:]
+                elif chars.startswith("^"):
+                    chars = "\\" + chars
+                regex.append(f"[{chars}]")
+                i = j
+        else:
+            regex.append(re.escape(c))
+        i += 1
+    return "".join(regex)
+
+
+def _group_runs(pattern):
+    """
+    Runs of a glob path component without wildcard that contain group markers of sub-daily codes.
+    """
+    runs, run = [], ""
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c in "*?[":
+            j = i
+            if c == "[":
+                # same bracket parsing as `_glob_to_regex`
+                j += 1
+                if (j < n) and (pattern[j] == "!"):
+                    j += 1
+                if (j < n) and (pattern[j] == "]"):
+                    j += 1
+                j = pattern.find("]", j)
+            if j == -1:
+                # unclosed bracket: literal character
+                run += c
+            else:
+                runs.append(run)
+                run = ""
+                i = j
+        elif c == _GROUP_MARKER:
+            run += pattern[i : i + 2]
+            i += 1
+        else:
+            run += c
+        i += 1
+    runs.append(run)
+    return [run for run in runs if _GROUP_MARKER in run]
+
+
+class _ComponentMatcher:
+    """
+    Matcher of a path component with wildcards or sub-daily codes. A name can match with several values of the codes
+    (ex: start and stop times of `s1a-iw-owi-cc-20220531t235908-20220531t235933-*.nc` for `s1*-owi-*-%Y%m%dt%H%M%S*.nc`):
+    all of them are returned, as the glob of any of them finds the name.
+    """
+
+    def __init__(self, component):
+        self.component = component
+        self.regex = re.compile(_glob_to_regex(component), re.DOTALL)
+        self.hidden_ok = component.startswith(".")
+        self._probes = [re.compile(_glob_to_regex(run)) for run in _group_runs(component)]
+
+    def match(self, name):
+        """
+        Values of the sub-daily codes for which the name matches the component.
+
+        Returns
+        -------
+        list[dict[str, str]]
+            Values by code letter, empty if the name doesn't match
+        """
+        match = self.regex.fullmatch(name)
+        if match is None:
+            return []
+        matched = match.groupdict()
+        if not matched:
+            return [matched]
+        # every placement of each run of codes in the name
+        assignments = [{}]
+        for probe in self._probes:
+            placements = set()
+            position = probe.search(name)
+            while position is not None:
+                placements.add(tuple(position.groupdict().items()))
+                position = probe.search(name, position.start() + 1)
+            assignments = [
+                {**assignment, **dict(placement)}
+                for assignment in assignments
+                for placement in placements
+                if all(assignment.get(code, value) == value for code, value in placement)
+            ]
+        found = [matched]
+        for assignment in assignments:
+            if (assignment != matched) and (assignment not in found) and self._matches_with(name, assignment):
+                found.append(assignment)
+        return found
+
+    def _matches_with(self, name, groups):
+        component = self.component
+        for code, value in groups.items():
+            component = component.replace(_GROUP_MARKER + code, value)
+        return re.fullmatch(_glob_to_regex(component), name, re.DOTALL) is not None
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile_component(component):
+    """
+    Matcher of a path component where the day is inserted: the name itself if it has no wildcard, else a
+    `_ComponentMatcher`.
+    """
+    if not re.search(r"[*?\[" + _GROUP_MARKER + "]", component):
+        return component
+    return _ComponentMatcher(component)
+
+
+class PathTemplate:
+    """
+    Path template of the configuration (`paths`), like
+    `/data/sentinel-1*/L1/*/*/%Y/%(dayOfYear)/S1*%Y%m%d*SAFE`, compiled once. The static prefix of the template
+    (leading components without wildcard nor date) is never listed; other components are matched against the
+    listings of a `DirectoryCache`, with the glob semantics (hidden names are only matched by components starting
+    with a dot).
+
+    Parameters
+    ----------
+    template: str
+        Path template
+    """
+
+    def __init__(self, template):
+        self.template = template
+        parts = template.split("/")
+        k = 0
+        while (k < len(parts) - 1) and not _MAGIC.search(parts[k]):
+            k += 1
+        self.prefix = "/".join(parts[:k])
+        if (self.prefix == "") and template.startswith("/"):
+            self.prefix = "/"
+        self.components = parts[k:]
+        self.subday_codes = [
+            code for code in _SUBDAY_CODES if any(code in c for c in self.components)
+        ]
+
+    def _day_matchers(self, day, grouped_codes):
+        matchers = []
+        for component in self.components:
+            for code in _SUBDAY_CODES:
+                # codes finer than the research accuracy match any value
+                replacement = _GROUP_MARKER + code[1] if code in grouped_codes else "*"
+                component = component.replace(code, replacement)
+            component = component.replace("%(dayOfYear)", day.strftime("%j"))
+            if "%" in component:
+                component = day.strftime(component)
+            matchers.append(_compile_component(component))
+        return matchers
+
+    def _grouped_codes(self, n_codes):
+        """
+        Sub-daily codes of the template matched as groups for a research with `n_codes` codes (0 for a day
+        accuracy, 1 for an hour accuracy, ...). Finer codes match any value.
+        """
+        return [c for c in _SUBDAY_CODES[:n_codes] if c in self.subday_codes]
+
+    def _candidates(self, day, grouped_codes, cache):
+        """
+        Paths matching the template for a day, in a single walk of the directories, with the values of their
+        sub-daily codes (several ones if the codes are matched at several places of the path).
+        """
+        if cache is None:
+            cache = get_directory_cache()
+        matchers = self._day_matchers(day, grouped_codes)
+        found = {}
+        self._walk(self.prefix, 0, {}, matchers, cache, found)
+        return found
+
+    def find(self, day, subdays=("",), cache=None):
+        """
+        Find the paths matching the template for a day, in a single walk of the directories.
+
+        Parameters
+        ----------
+        day: datetime.datetime
+            Day inserted in the template
+        subdays: Iterable[str]
+            Researched times of the day, as concatenated hours, minutes and seconds ('' for the whole day, '12' for
+            12h, '1230' for 12h30, ...). All the values must have the same accuracy.
+        cache: DirectoryCache | None
+            Directory cache. Default is the process-wide one.
+
+        Returns
+        -------
+        list[str]
+            Sorted paths
+        """
+        subdays = set(subdays)
+        n_codes = len(next(iter(subdays))) // 2 if subdays else 0
+        grouped_codes = self._grouped_codes(n_codes)
+        # researched times projected on the codes of the template
+        wanted = {
+            tuple(s[2 * _SUBDAY_CODES.index(c) : 2 * _SUBDAY_CODES.index(c) + 2] for c in grouped_codes)
+            for s in subdays
+        }
+        found = self._candidates(day, grouped_codes, cache)
+        return sorted(
+            path
+            for path, assignments in found.items()
+            if any(tuple(groups[c[1]] for c in grouped_codes) in wanted for groups in assignments)
+        )
+
+    def find_between(self, day, first, last, n_codes, cache=None):
+        """
+        Find the paths matching the template for a day whose sub-daily codes are in a time range, in a single walk
+        of the directories. The times of the paths are compared to the range in a vectorized pass.
+
+        Parameters
+        ----------
+        day: datetime.datetime
+            Day inserted in the template
+        first: int
+            First researched second of the day
+        last: int
+            Last researched second of the day
+        n_codes: int
+            Number of sub-daily codes of the research accuracy (0 for a day accuracy, 1 for an hour accuracy, ...)
+        cache: DirectoryCache | None
+            Directory cache. Default is the process-wide one.
+
+        Returns
+        -------
+        list[str]
+            Sorted paths
+        """
+        grouped_codes = self._grouped_codes(n_codes)
+        found = self._candidates(day, grouped_codes, cache)
+        if not grouped_codes:
+            return sorted(found)
+        # one time by placement of the codes in a path (ex: start and stop times in the name)
+        paths = np.array(
+            [path for path, assignments in found.items() for _ in assignments], dtype=object
+        )
+        values = np.array(
+            [
+                [int(groups[c[1]]) for c in grouped_codes]
+                for assignments in found.values()
+                for groups in assignments
+            ],
+            dtype=np.int64,
+        ).reshape(len(paths), len(grouped_codes))
+        seconds = values @ np.array([_CODE_SECONDS[c] for c in grouped_codes], dtype=np.int64)
+        if grouped_codes == _SUBDAY_CODES[: len(grouped_codes)]:
+            # a path is kept if one of its (truncated) times contains a researched time
+            unit = _CODE_SECONDS[grouped_codes[-1]]
+            kept = (seconds >= first - first % unit) & (seconds <= last)
+        else:
+            # codes of the template aren't the coarsest ones (ex: minutes without hours): a path is kept if one of its
+            # times is a researched time projected on the codes of the template
+            step = _CODE_SECONDS[_SUBDAY_CODES[n_codes - 1]]
+            researched = np.arange(first - first % step, last + 1, step, dtype=np.int64)
+            projected = sum(
+                (researched // _CODE_SECONDS[c]) % _CODE_VALUES[c] * _CODE_SECONDS[c] for c in grouped_codes
+            )
+            kept = np.isin(seconds, projected)
+        return sorted(set(paths[kept]))
+
+    def _walk(self, directory, level, captured, matchers, cache, found):
+        names = cache.entries(directory or os.curdir)
+        if names is None:
+            return
+        matcher = matchers[level]
+        last = level == len(matchers) - 1
+        if isinstance(matcher, str):
+            candidates = [(matcher, captured)] if matcher in names else []
+        else:
+            candidates = []
+            for name in names:
+                if name.startswith(".") and not matcher.hidden_ok:
+                    continue
+                for groups in matcher.match(name):
+                    if any(captured.get(code, value) != value for code, value in groups.items()):
+                        continue
+                    candidates.append((name, {**captured, **groups}))
+        for name, groups in candidates:
+            path = os.path.join(directory, name) if directory else name
+            if last:
+                found.setdefault(path, []).append(groups)
+            elif names[name]:
+                self._walk(path, level + 1, groups, matchers, cache, found)
+
+
+@functools.lru_cache(maxsize=None)
+def compile_template(template):
+    """
+    Get the compiled path template (see `PathTemplate`), compiled once per process.
+
+    Returns
+    -------
+    PathTemplate
+        Compiled template
+    """
+    return PathTemplate(template)
+
+
+def find_template_paths(template, schemes, cache=None):
+    """
+    Find the paths matching a path template for dates given as schemes of `coloc_sat.tools.date_schemes`
+    (`%Y%m%d`, `%Y%m%d%H`, `%Y%m%d%H%M` or `%Y%m%d%H%M%S` strings). The directories of each day are walked once,
+    whatever the number of schemes of the day.
+
+    Parameters
+    ----------
+    template: str
+        Path template of the configuration
+    schemes: Iterable[str]
+        Researched dates
+    cache: DirectoryCache | None
+        Directory cache. Default is the process-wide one.
+
+    Returns
+    -------
+    list[str]
+        Paths, sorted by day then by path
+    """
+    compiled = compile_template(template)
+    days = {}
+    for scheme in schemes:
+        days.setdefault(scheme[:8], set()).add(scheme[8:])
+    paths = []
+    for day, subdays in days.items():
+        paths += compiled.find(datetime.strptime(day, "%Y%m%d"), subdays, cache)
+    return paths
+
+
+def date_ranges(start_date, stop_date, accuracy="day"):
+    """
+    Range-compressed equivalent of `coloc_sat.tools.date_schemes`: instead of one scheme by accuracy increment
+    between `start_date` and `stop_date`, the researched times of each day are given as a range of seconds.
+
+    Parameters
+    ----------
+    start_date: numpy.datetime64 | datetime.datetime | pandas.Timestamp
+        Start date of the research
+    stop_date: numpy.datetime64 | datetime.datetime | pandas.Timestamp
+        Stop date of the research
+    accuracy: str
+        'day', 'hour', 'minute' or 'second'
+
+    Returns
+    -------
+    list[(datetime.datetime, int, int)]
+        For each day: the day, its first and last researched seconds (truncated to the accuracy)
+    """
+    if accuracy not in ACCURACY_SECONDS:
+        raise ValueError(
+            "Invalid accuracy value. Choose from 'day', 'hour', 'minute', 'second'"
+        )
+    step = pd.Timedelta(seconds=ACCURACY_SECONDS[accuracy])
+    start, stop = pd.Timestamp(start_date), pd.Timestamp(stop_date)
+    if stop < start:
+        return []
+    # the schemes are start_date + k * step (k >= 0) while lower or equal to stop_date, truncated to the accuracy
+    last = start + ((stop - start) // step) * step
+    first_day, last_day = start.floor("D"), last.floor("D")
+    first_second = (start - first_day).total_seconds()
+    last_second = (last - last_day).total_seconds()
+    unit = ACCURACY_SECONDS[accuracy]
+    ranges = []
+    day = first_day
+    while day <= last_day:
+        first = int(first_second // unit * unit) if day == first_day else 0
+        last = int(last_second // unit * unit) if day == last_day else 86400 - unit
+        ranges.append((day.to_pydatetime(), first, last))
+        day += timedelta(days=1)
+    return ranges
+
+
+def find_template_paths_between(template, start_date, stop_date, accuracy="day", cache=None):
+    """
+    Find the paths matching a path template between 2 dates, with the same result as `find_template_paths` for
+    the schemes of `coloc_sat.tools.date_schemes(start_date, stop_date, accuracy)`, without enumerating them: the
+    directories of each day are walked once and the times of the paths are compared to the researched range of the
+    day.
+
+    Parameters
+    ----------
+    template: str
+        Path template of the configuration
+    start_date: numpy.datetime64 | datetime.datetime | pandas.Timestamp
+        Start date of the research
+    stop_date: numpy.datetime64 | datetime.datetime | pandas.Timestamp
+        Stop date of the research
+    accuracy: str
+        'day', 'hour', 'minute' or 'second'
+    cache: DirectoryCache | None
+        Directory cache. Default is the process-wide one.
+
+    Returns
+    -------
+    list[str]
+        Paths, sorted by day then by path
+    """
+    compiled = compile_template(template)
+    n_codes = _SUBDAY_FORMATS.index(
+        {"day": "", "hour": "%H", "minute": "%H%M", "second": "%H%M%S"}[accuracy]
+    )
+    paths = []
+    for day, first, last in date_ranges(start_date, stop_date, accuracy):
+        paths += compiled.find_between(day, first, last, n_codes, cache)
+    return paths
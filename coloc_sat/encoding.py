@@ -0,0 +1,286 @@
+import copy
+import fnmatch
+import io
+import json
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ["netcdf4", "h5netcdf"]
+COMPRESSIONS = ["none", "zlib", "zstd"]
+
+# Variable families, matched (in this order) on the names of the variables of a co-location product.
+# Time variables are the datetime variables, whatever their name.
+FAMILY_PATTERNS = {
+    "wind_direction": ["*direction*"],
+    "wind_speed": ["*wind_speed*", "*wspd*"],
+}
+
+# int16 packing: wind speeds in [0, 327] m/s and directions in [-147, 507] degrees with 0.01 resolution
+_PACKED_FAMILIES = {
+    "wind_speed": {
+        "dtype": "int16",
+        "scale_factor": 0.01,
+        "add_offset": 0.0,
+        "_FillValue": -32768,
+    },
+    "wind_direction": {
+        "dtype": "int16",
+        "scale_factor": 0.01,
+        "add_offset": 180.0,
+        "_FillValue": -32768,
+    },
+    "time": {"dtype": "int64", "units": "seconds since 1970-01-01 00:00:00"},
+    "float": {"dtype": "float32"},
+}
+
+# Predefined policies. `none` keeps the xarray default encoding (float64, no compression, no chunking).
+ENCODING_POLICIES = {
+    "none": {"compression": "none", "families": {}},
+    "lossless": {"compression": "zlib", "families": {}},
+    "float32": {"compression": "zlib", "families": {"float": {"dtype": "float32"}}},
+    "packed": {"compression": "zlib", "families": _PACKED_FAMILIES},
+}
+
+DEFAULT_OPTIONS = {
+    "policy": "none",
+    "compression": None,
+    "complevel": 4,
+    "shuffle": True,
+    "engine": None,
+    "chunks": None,
+    "families": None,
+}
+
+
+def get_encoding_options(config_options=None, **overrides):
+    """
+    Merge the output encoding options of the configuration (`output_encoding` key) with the given overrides (CLI
+    flags), and resolve the policy.
+
+    Parameters
+    ----------
+    config_options: dict | None
+        `output_encoding` section of the configuration. Keys are `policy` (see `ENCODING_POLICIES`), `compression`
+        (see `COMPRESSIONS`), `complevel`, `shuffle`, `engine` (see `ENGINES`), `chunks` (chunk size by dimension
+        name) and `families` (encoding by variable family, updating the ones of the policy).
+    overrides: dict
+        Options that replace the ones of the configuration. None values are ignored.
+
+    Returns
+    -------
+    dict
+        Resolved options: `compression`, `complevel`, `shuffle`, `engine`, `chunks` and `families`
+    """
+    options = dict(DEFAULT_OPTIONS)
+    options.update(config_options or {})
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    policy = options["policy"]
+    if policy not in ENCODING_POLICIES:
+        raise ValueError(
+            f"Unknown output encoding policy {policy}. Choose from {list(ENCODING_POLICIES)}"
+        )
+    families = copy.deepcopy(ENCODING_POLICIES[policy]["families"])
+    for family, family_encoding in (options["families"] or {}).items():
+        families.setdefault(family, {}).update(family_encoding)
+    options["families"] = families
+    if options["compression"] is None:
+        options["compression"] = ENCODING_POLICIES[policy]["compression"]
+    if options["compression"] not in COMPRESSIONS:
+        raise ValueError(
+            f"Unknown compression {options['compression']}. Choose from {COMPRESSIONS}"
+        )
+    if (options["engine"] is not None) and (options["engine"] not in ENGINES):
+        raise ValueError(f"Unknown engine {options['engine']}. Choose from {ENGINES}")
+    if (options["compression"] == "zstd") and (options["engine"] != "h5netcdf"):
+        # zstd is only available through the netcdf4 engine (h5netcdf would need hdf5plugin)
+        options["engine"] = "netcdf4"
+    return options
+
+
+def get_variable_family(name, variable):
+    """
+    Get the family of a variable of a co-location product.
+
+    Returns
+    -------
+    str | None
+        `time`, `wind_direction`, `wind_speed`, `float` (other floating variables) or None
+    """
+    if np.issubdtype(variable.dtype, np.datetime64):
+        return "time"
+    if not np.issubdtype(variable.dtype, np.floating):
+        return None
+    for family, patterns in FAMILY_PATTERNS.items():
+        if any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            return family
+    return "float"
+
+
+def _compression_encoding(options):
+    compression = options["compression"]
+    if compression == "none":
+        return {}
+    if options["engine"] == "h5netcdf":
+        if compression == "zstd":
+            raise ValueError("zstd compression requires the netcdf4 engine")
+        return {
+            "compression": "gzip",
+            "compression_opts": options["complevel"],
+            "shuffle": options["shuffle"],
+        }
+    encoding = {"complevel": options["complevel"], "shuffle": options["shuffle"]}
+    if compression == "zlib":
+        encoding["zlib"] = True
+    else:
+        encoding["compression"] = compression
+    return encoding
+
+
+def build_encoding(ds, options):
+    """
+    Build the `encoding` argument of `xarray.Dataset.to_netcdf` for a co-location product.
+
+    Parameters
+    ----------
+    ds: xarray.Dataset
+        Co-location product
+    options: dict
+        Resolved encoding options (see `get_encoding_options`)
+
+    Returns
+    -------
+    dict
+        Encoding by variable name. Empty for the `none` policy without compression nor chunks, so that xarray
+        defaults are kept.
+    """
+    compression = _compression_encoding(options)
+    chunks = options["chunks"] or {}
+    if (not options["families"]) and (not compression) and (not chunks):
+        return {}
+    encoding = {}
+    for name, variable in ds.variables.items():
+        family = get_variable_family(name, variable)
+        var_encoding = {}
+        if family in options["families"]:
+            var_encoding = dict(options["families"][family])
+        elif family not in [None, "time"]:
+            # wind speeds and directions are floating variables too
+            var_encoding = dict(options["families"].get("float", {}))
+        if var_encoding.get("dtype", "").startswith("float") and (
+            "_FillValue" not in var_encoding
+        ):
+            var_encoding["_FillValue"] = np.nan
+        if variable.ndim > 0:
+            var_encoding.update(compression)
+            if chunks:
+                var_encoding["chunksizes"] = tuple(
+                    min(chunks.get(dim, size), size)
+                    for dim, size in zip(variable.dims, variable.shape)
+                )
+        encoding[name] = var_encoding
+    return encoding
+
+
+def truncate_times(ds, encoding):
+    """
+    Truncate the times encoded as integers to the unit of their encoding, as xarray can't serialize them faithfully
+    otherwise.
+
+    Parameters
+    ----------
+    ds: xarray.Dataset
+        Co-location product
+    encoding: dict
+        Encoding by variable name (see `build_encoding`)
+
+    Returns
+    -------
+    xarray.Dataset
+        Co-location product with truncated times
+    """
+    time_units = {"days": "D", "hours": "h", "minutes": "m", "seconds": "s", "milliseconds": "ms"}
+    for name, var_encoding in encoding.items():
+        unit = str(var_encoding.get("units", "")).split(" since")[0]
+        if (get_variable_family(name, ds[name]) == "time") and (unit in time_units):
+            truncated = ds[name].values.astype(f"datetime64[{time_units[unit]}]")
+            variable = ds[name].copy(data=truncated.astype("datetime64[ns]"))
+            if name in ds.coords:
+                ds = ds.assign_coords({name: variable})
+            else:
+                ds = ds.assign({name: variable})
+    return ds
+
+
+def write_netcdf(ds, path, options):
+    """
+    Write a co-location product with the output encoding options.
+
+    Parameters
+    ----------
+    ds: xarray.Dataset
+        Co-location product
+    path: str
+        Path of the netcdf file
+    options: dict
+        Resolved encoding options (see `get_encoding_options`)
+    """
+    encoding = build_encoding(ds, options)
+    ds = truncate_times(ds, encoding)
+    ds.to_netcdf(path, engine=options["engine"], encoding=encoding)
+
+
+def write_geoparquet(ds, path):
+    """
+    Write a matchup product (1D `obs` dimension, with `lon` and `lat`) as a GeoParquet file of points. The
+    attributes of the product are kept as JSON in the `coloc_sat` key of the file metadata.
+
+    Parameters
+    ----------
+    ds: xarray.Dataset
+        Matchup product (see `coloc_sat.ProductIntersection.coloc_matchups`)
+    path: str
+        Path of the parquet file
+    """
+    import geopandas as gpd
+    import pyarrow.parquet as pq
+
+    df = ds.reset_coords().to_dataframe().reset_index(drop=True)
+    gdf = gpd.GeoDataFrame(
+        df, geometry=gpd.points_from_xy(df["lon"], df["lat"]), crs="EPSG:4326"
+    )
+    # geopandas writes the `geo` metadata, the attributes are added to it
+    buffer = io.BytesIO()
+    gdf.to_parquet(buffer, index=False)
+    buffer.seek(0)
+    table = pq.read_table(buffer)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b"coloc_sat"] = json.dumps(ds.attrs, default=str).encode()
+    pq.write_table(table.replace_schema_metadata(metadata), path)
+
+
+def parse_chunks(chunks):
+    """
+    Parse chunk sizes given as `dim=size` strings (CLI format).
+
+    Parameters
+    ----------
+    chunks: list[str] | None
+        Chunk sizes (ex: ['y=256', 'x=256'])
+
+    Returns
+    -------
+    dict[str, int] | None
+        Chunk size by dimension name
+    """
+    if not chunks:
+        return None
+    parsed = {}
+    for chunk in chunks:
+        dim, sep, size = chunk.partition("=")
+        if (not sep) or (not size.isdigit()):
+            raise ValueError(f"Chunk size must be given as dim=size, not {chunk}")
+        parsed[dim] = int(size)
+    return parsed
@@ -0,0 +1,483 @@
+import concurrent.futures
+import logging
+import os
+import weakref
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+EXECUTORS = ["serial", "processes", "dask-local", "dask-jobqueue"]
+
+# Cluster classes of dask-jobqueue, by job scheduler
+JOBQUEUE_CLUSTERS = {
+    "pbs": "PBSCluster",
+    "slurm": "SLURMCluster",
+    "sge": "SGECluster",
+    "lsf": "LSFCluster",
+    "oar": "OARCluster",
+    "htcondor": "HTCondorCluster",
+    "moab": "MoabCluster",
+}
+
+def _init_worker(config_path, memory_limit=None):
+    """
+    Set the configuration of a worker process to the one of the parent process, and cap the memory budget of its meta
+    cache to its memory limit (bytes, see `coloc_sat.meta_cache.limit_meta_cache`).
+    """
+    if config_path is not None:
+        from .tools import set_config
+
+        set_config(config_path)
+    if memory_limit is not None:
+        from .meta_cache import limit_meta_cache
+
+        limit_meta_cache(memory_limit)
+
+
+def _limit_worker_meta_cache(dask_worker):
+    """
+    Cap the memory budget of the meta cache of a dask worker to its memory limit, so that cached products don't make
+    the nanny kill it.
+    """
+    from .meta_cache import limit_meta_cache
+
+    limit_meta_cache(dask_worker.memory_manager.memory_limit)
+
+
+def _current_config_path():
+    from .tools import get_config_path
+
+    try:
+        return get_config_path()
+    except ValueError:
+        return None
+
+
+def batch_tasks(items, sizes=None, max_size=None, costs=None, max_cost=None):
+    """
+    Pack consecutive items (ex: groups of parquet rows) in tasks of at most `max_size` size (ex: number of rows) and
+    at most `max_cost` estimated cost, so that the scheduling overhead is paid once per task instead of once per
+    item. An item exceeding a limit on its own is a task on its own.
+
+    Parameters
+    ----------
+    items: list
+        Items
+    sizes: list[int] | None
+        Size of each item. Default is 1 (`max_size` is a number of items).
+    max_size: int | None
+        Maximum size of a task. Not limited if None.
+    costs: list[float] | None
+        Estimated cost of each item. Required with `max_cost`.
+    max_cost: float | None
+        Maximum cost of a task. Not limited if None.
+
+    Returns
+    -------
+    list[list]
+        Items of each task
+    """
+    if (max_cost is not None) and (costs is None):
+        raise ValueError("costs are required to batch tasks by cost")
+    if sizes is None:
+        sizes = [1] * len(items)
+    if costs is None:
+        costs = [0.0] * len(items)
+    tasks = []
+    task, task_size, task_cost = [], 0, 0.0
+    for item, size, cost in zip(items, sizes, costs):
+        too_big = (max_size is not None) and (task_size + size > max_size)
+        too_costly = (max_cost is not None) and (task_cost + cost > max_cost)
+        if task and (too_big or too_costly):
+            tasks.append(task)
+            task, task_size, task_cost = [], 0, 0.0
+        task.append(item)
+        task_size += size
+        task_cost += cost
+    if task:
+        tasks.append(task)
+    return tasks
+
+
+class Executor:
+    """
+    Base class of the execution backends: tasks are submitted with a bounded number of tasks in flight (a task is
+    submitted when another one completes), their results are streamed back as they complete, and failed tasks
+    (exception raised by the task, lost worker, ...) are submitted again up to `retries` times.
+
+    Parameters
+    ----------
+    retries: int
+        Number of times a failed task is submitted again before its error is raised
+    max_in_flight: int | None
+        Maximum number of submitted tasks not yet collected. Default is twice the number of workers.
+    """
+
+    name = None
+
+    def __init__(self, retries=0, max_in_flight=None):
+        self.retries = retries
+        self._max_in_flight = max_in_flight
+
+    @property
+    def workers(self):
+        """
+        Number of tasks run at the same time
+        """
+        return 1
+
+    @property
+    def max_in_flight(self):
+        return self._max_in_flight or 2 * max(self.workers, 1)
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Submit a task.
+
+        Returns
+        -------
+        concurrent.futures.Future | distributed.Future
+            Future of the result
+        """
+        raise NotImplementedError
+
+    def wait(self, futures):
+        """
+        Wait for the completion of at least one future.
+
+        Returns
+        -------
+        set
+            Completed futures
+        """
+        done, _ = concurrent.futures.wait(
+            futures, return_when=concurrent.futures.FIRST_COMPLETED
+        )
+        return done
+
+    def reset(self, failed):
+        """
+        Restore the backend after failed tasks (ex: broken process pool), before they are submitted again.
+
+        Parameters
+        ----------
+        failed: list
+            Futures of the failed tasks
+        """
+
+    def imap(self, func, tasks, **kwargs):
+        """
+        Run `func(*args, **kwargs)` for the arguments of each task, and yield the results as they complete. Tasks
+        are read from `tasks` only when there is room for them (see `max_in_flight`), so that a generator of tasks
+        is consumed progressively.
+
+        Parameters
+        ----------
+        func: Callable
+            Function of the tasks (must be picklable for the parallel backends)
+        tasks: Iterable[tuple]
+            Positional arguments of each task
+        kwargs: dict
+            Keyword arguments shared by all the tasks
+
+        Yields
+        ------
+        int, object
+            Position of the task in `tasks` and its result
+        """
+        tasks = enumerate(tasks)
+        pending = {}
+
+        def fill():
+            while len(pending) < self.max_in_flight:
+                item = next(tasks, None)
+                if item is None:
+                    return
+                k, args = item
+                pending[self.submit(func, *args, **kwargs)] = (k, args, 0)
+
+        fill()
+        while pending:
+            failed = []
+            for future in self.wait(list(pending)):
+                k, args, attempts = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if attempts >= self.retries:
+                        raise
+                    logger.warning(
+                        f"Task {k} failed ({e!r}), attempt {attempts + 2} of {self.retries + 1}"
+                    )
+                    failed.append((future, k, args, attempts + 1))
+                    continue
+                yield k, result
+            if failed:
+                self.reset([future for future, *_ in failed])
+                for _, k, args, attempts in failed:
+                    pending[self.submit(func, *args, **kwargs)] = (k, args, attempts)
+            fill()
+
+    def run(self, func, tasks, **kwargs):
+        """
+        Run `func(*args, **kwargs)` for the arguments of each task (see `imap`).
+
+        Returns
+        -------
+        list
+            Result of each task, in the order of `tasks`
+        """
+        results = {}
+        for k, result in self.imap(func, tasks, **kwargs):
+            results[k] = result
+        return [results[k] for k in range(len(results))]
+
+    def close(self):
+        """
+        Release the workers.
+        """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SerialExecutor(Executor):
+    """
+    Run the tasks one after the other in the current process.
+    """
+
+    name = "serial"
+
+    @property
+    def max_in_flight(self):
+        # a task is run at its submission: results are streamed back one by one
+        return 1
+
+    def submit(self, func, *args, **kwargs):
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class ProcessPoolExecutor(Executor):
+    """
+    Run the tasks in a pool of local processes (`concurrent.futures`), without the scheduling overhead of dask.
+    Worker processes use the configuration of the current process.
+
+    Parameters
+    ----------
+    max_workers: int | None
+        Number of processes. Default is the number of CPUs.
+    retries: int
+        Number of times a failed task is submitted again
+    max_in_flight: int | None
+        Maximum number of submitted tasks not yet collected
+    memory: int | None
+        Memory of a process in GB, used to cap the memory budget of its meta cache (see `coloc_sat.meta_cache`)
+    """
+
+    name = "processes"
+
+    def __init__(self, max_workers=None, retries=0, max_in_flight=None, memory=None):
+        super().__init__(retries, max_in_flight)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.memory = memory
+        # pool of each submitted task
+        self._pools = weakref.WeakKeyDictionary()
+        self._pool = self._new_pool()
+
+    @property
+    def workers(self):
+        return self.max_workers
+
+    def _new_pool(self):
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(
+                _current_config_path(),
+                None if self.memory is None else self.memory * 1024**3,
+            ),
+        )
+
+    def submit(self, func, *args, **kwargs):
+        try:
+            future = self._pool.submit(func, *args, **kwargs)
+        except BrokenProcessPool as e:
+            # the pool broke before its failed tasks have been collected: the task fails like them
+            future = concurrent.futures.Future()
+            future.set_exception(e)
+        self._pools[future] = self._pool
+        return future
+
+    def reset(self, failed):
+        # a worker that died breaks the whole pool, which is replaced once (tasks of a former pool are ignored)
+        if any(
+            (self._pools.get(future) is self._pool)
+            and isinstance(future.exception(), BrokenProcessPool)
+            for future in failed
+        ):
+            logger.warning("A worker process died, the process pool is restarted")
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = self._new_pool()
+
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+class DaskExecutor(Executor):
+    """
+    Run the tasks on a dask cluster.
+
+    Parameters
+    ----------
+    cluster: distributed.deploy.Cluster
+        Dask cluster (closed with the executor)
+    retries: int
+        Number of times a failed task is submitted again
+    max_in_flight: int | None
+        Maximum number of submitted tasks not yet collected
+    expected_workers: int | None
+        Number of workers expected when they aren't started yet (jobs of a job queue)
+    """
+
+    def __init__(self, cluster, retries=0, max_in_flight=None, expected_workers=None):
+        from dask.distributed import Client
+
+        super().__init__(retries, max_in_flight)
+        self.cluster = cluster
+        self.client = Client(cluster)
+        # run on the current and future workers
+        self.client.register_worker_callbacks(setup=_limit_worker_meta_cache)
+        self.expected_workers = expected_workers
+        logger.info(f"Dashboard link: {self.client.dashboard_link}")
+
+    @property
+    def workers(self):
+        return max(
+            sum(self.client.nthreads().values()), self.expected_workers or 1
+        )
+
+    def submit(self, func, *args, **kwargs):
+        return self.client.submit(func, *args, pure=False, **kwargs)
+
+    def wait(self, futures):
+        from dask.distributed import wait
+
+        done, _ = wait(futures, return_when="FIRST_COMPLETED")
+        return done
+
+    def close(self):
+        self.client.close()
+        self.cluster.close()
+
+
+def get_jobqueue_options(max_workers=None, memory=None):
+    """
+    Get the cluster options of the `dask-jobqueue` executor from the `dask_jobqueue` section of the configuration
+    (the shipped configuration has the one of the datarmor PBS cluster).
+
+    Parameters
+    ----------
+    max_workers: int | None
+        Number of jobs, if not given by the configuration (`jobs` key)
+    memory: int | None
+        Memory of a job in GB, if not given by the configuration (`memory` key). Default is 2.
+
+    Returns
+    -------
+    str, int, dict
+        Job scheduler, number of jobs and arguments of the dask-jobqueue cluster
+    """
+    from .tools import load_config
+
+    options = load_config().get("dask_jobqueue", None)
+    if options is None:
+        raise ValueError(
+            "The dask-jobqueue executor needs a `dask_jobqueue` section in the configuration (see the one of "
+            "coloc_sat/config.yml)"
+        )
+    options = dict(options)
+    scheduler = options.pop("scheduler", "pbs").lower()
+    if scheduler not in JOBQUEUE_CLUSTERS:
+        raise ValueError(
+            f"Unknown job scheduler {scheduler}, must be in {list(JOBQUEUE_CLUSTERS)}"
+        )
+    jobs = options.pop("jobs", None) or max_workers or 1
+    if "memory" not in options:
+        options["memory"] = f"{memory if memory is not None else 2}GB"
+    if "local_directory" in options:
+        options["local_directory"] = os.path.expandvars(options["local_directory"])
+    if (scheduler == "pbs") and ("resource_spec" not in options):
+        options["resource_spec"] = (
+            f"select=1:ncpus={options.get('cores', 1)}:mem={options['memory']}"
+        )
+    return scheduler, jobs, options
+
+
+def get_executor(
+    executor="serial", max_workers=None, memory=None, retries=0, max_in_flight=None
+):
+    """
+    Create an execution backend.
+
+    Parameters
+    ----------
+    executor: str
+        'serial' (current process), 'processes' (local process pool), 'dask-local' (dask LocalCluster) or
+        'dask-jobqueue' (dask-jobqueue cluster of the `dask_jobqueue` section of the configuration, see
+        `get_jobqueue_options`)
+    max_workers: int | None
+        Number of worker processes, or of jobs for 'dask-jobqueue'
+    memory: int | None
+        Memory of a worker in GB ('dask-local' and 'dask-jobqueue'). The memory budget of the meta cache of the workers
+        is capped to a part of it (see `coloc_sat.meta_cache.limit_meta_cache`).
+    retries: int
+        Number of times a failed task is submitted again
+    max_in_flight: int | None
+        Maximum number of submitted tasks not yet collected. Default is twice the number of workers.
+
+    Returns
+    -------
+    Executor
+        Execution backend, to be closed after use
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"executor must be in {EXECUTORS}, not {executor}")
+    if executor == "serial":
+        return SerialExecutor(retries=retries)
+    if executor == "processes":
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            retries=retries,
+            max_in_flight=max_in_flight,
+            memory=memory,
+        )
+    if executor == "dask-local":
+        from dask.distributed import LocalCluster
+
+        cluster = LocalCluster(
+            n_workers=max_workers,
+            threads_per_worker=1,
+            processes=True,
+            memory_limit=f"{memory}GB" if memory is not None else "auto",
+        )
+        return DaskExecutor(cluster, retries=retries, max_in_flight=max_in_flight)
+    import dask_jobqueue
+
+    scheduler, jobs, options = get_jobqueue_options(max_workers, memory)
+    cluster = getattr(dask_jobqueue, JOBQUEUE_CLUSTERS[scheduler])(**options)
+    cluster.scale(jobs=jobs)
+    logger.info(f"{jobs} {scheduler} jobs requested")
+    return DaskExecutor(
+        cluster,
+        retries=retries,
+        max_in_flight=max_in_flight,
+        expected_workers=jobs * options.get("processes", 1),
+    )
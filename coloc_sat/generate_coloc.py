@@ -1,18 +1,123 @@
 import os.path
 import logging
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from .tools import (
     call_meta_class,
     get_all_comparison_files,
     extract_name_from_meta_class,
+    extract_start_stop_dates_from_filename,
+    reformat_meta,
     set_config,
+    load_config,
 )
+from .campaign_store import CampaignStore
+from .encoding import get_encoding_options, write_netcdf, write_geoparquet
 from .intersection import ProductIntersection
+from .intersection_tools import join_footprints
+from .listing import get_listing_store
+from .meta_cache import get_meta_cache
+from .roi import get_region_of_interest
 from .sar_meta import GetSarMeta
 import numpy as np
 import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+OUTPUT_MODES = ["grid", "matchups"]
+MATCHUP_FORMATS = ["netcdf", "parquet"]
+
+
+def get_minimal_area_in_km_squared(minimal_area):
+    """
+    Convert a minimal intersection area to square kilometers.
+
+    Parameters
+    ----------
+    minimal_area: int | str
+        Area in square kilometers, or string ending by km2 or m2 (ex: '1600km2')
+
+    Returns
+    -------
+    int | float
+        Minimal area in square kilometers
+    """
+    if isinstance(minimal_area, int):
+        return minimal_area
+    elif isinstance(minimal_area, str):
+        if minimal_area.endswith("km2"):
+            return int(minimal_area.replace("km2", ""))
+        elif minimal_area.endswith("m2"):
+            return int(minimal_area.replace("m2", "")) / 1e6
+        else:
+            raise ValueError(
+                "minimal_area expressed as a string in argument must end by km2 or m2"
+            )
+    else:
+        raise TypeError(
+            "minimal_area expressed as an argument must be a string or an integer. Please refer to "
+            + "the documentation"
+        )
+
+
+def evaluate_intersection(
+    product1,
+    file,
+    footprint,
+    product_generation,
+    intersection_kwargs,
+    config=None,
+    use_meta_cache=True,
+    roi=None,
+):
+    """
+    Open a comparison product and verify its intersection with `product1`. Used by `GenerateColoc` to evaluate
+    candidates serially or in an executor.
+
+    Parameters
+    ----------
+    product1: coloc_sat.GetSarMeta | coloc_sat.GetSmosMeta | coloc_sat.GetSmapMeta | coloc_sat.GetHy2Meta |
+    coloc_sat.GetEra5Meta | coloc_sat.GetWindsatMeta
+        Meta object of the reference product
+    file: str
+        Path of the comparison product
+    footprint: shapely.geometry.Polygon | None
+        Footprint of the comparison product, if known
+    product_generation: bool
+        True if a co-location product must be created
+    intersection_kwargs: dict
+        Keyword arguments of `coloc_sat.ProductIntersection`
+    config: str | None
+        Configuration file to set (needed in worker processes that don't share the configuration)
+    use_meta_cache: bool
+        True to get the comparison product from the meta cache (see `coloc_sat.meta_cache`)
+    roi: dict | None
+        Region of interest of the co-location (see `coloc_sat.roi`)
+
+    Returns
+    -------
+    (coloc_sat.ProductIntersection, bool) | None
+        Intersection and True if the products are co-located. None if the comparison product doesn't exist.
+    """
+    if config is not None:
+        set_config(config)
+    try:
+        opened_file = call_meta_class(
+            file,
+            product_generation=product_generation,
+            footprint=footprint,
+            use_cache=use_meta_cache,
+            roi=roi,
+        )
+        intersecter = ProductIntersection(
+            product1,
+            opened_file,
+            product_generation=product_generation,
+            **intersection_kwargs,
+        )
+    except FileNotFoundError:
+        return None
+    return intersecter, intersecter.has_intersection
+
 
 class GenerateColoc:
     """
@@ -68,6 +173,54 @@ class GenerateColoc:
     config : str | None, optional
         Path to configuration file to use. If not provided, the one located in ~/coloc_sat/localconfig.yaml will
         be used if it exists, else the config.yml of this package is used.
+    resampler_cache_dir : str | None, optional
+        Folder where swath resampling operators are stored, so that the same pair of geometries can be resampled
+        again without a new pixel association. Default value is None (no storage).
+    executor : str, optional
+        How comparison products are opened and their intersections verified: 'serial', 'threads' or 'processes'.
+        Threads suit I/O-bound evaluations; with processes, products are sent to the workers and back.
+        Default value is 'serial'.
+    max_workers : int | None, optional
+        Maximum number of workers of the executor. Default value is None (chosen by `concurrent.futures`).
+    use_meta_cache : bool, optional
+        True to keep opened products in the process-wide meta cache (see `coloc_sat.meta_cache`), so that the next
+        `GenerateColoc` using the same products doesn't open them again. Default value is True.
+    comparison_files : list[str] | None, optional
+        Products of `ds_name` already found for a time range that contains the one of `product1` (see
+        `coloc_sat.batch_coloc`). If given, the products of `ds_name` aren't searched again. Default value is None.
+    comparison_footprints : list[shapely.geometry.base.BaseGeometry | None] | None, optional
+        Footprints of `comparison_files` (from the product catalog for example), in the same order. Products whose
+        footprint doesn't intersect the one of `product1` on `minimal_area` are discarded without being opened.
+        Default value is None.
+    encoding_policy : str | None, optional
+        Encoding of the co-location products: 'none' (xarray defaults), 'lossless' (compression only), 'float32'
+        or 'packed' (int16 wind speeds and directions). Default value is None (`output_encoding` section of the
+        configuration, else 'none'). See `coloc_sat.encoding`.
+    compression : str | None, optional
+        Compression of the co-location products: 'none', 'zlib' or 'zstd'. Default value is None (given by the policy).
+    complevel : int | None, optional
+        Compression level. Default value is None (configuration, else 4).
+    netcdf_engine : str | None, optional
+        Engine used to write the co-location products: 'netcdf4' or 'h5netcdf'. Default value is None (xarray choice).
+    chunks : dict[str, int] | None, optional
+        Chunk size of the co-location products by dimension name. Default value is None (configuration, else
+        no chunking).
+    campaign_store : str | None, optional
+        Path of a campaign store (NetCDF4 file, or Zarr store if it ends with `.zarr`) where co-location products are
+        added as groups, instead of one netcdf file per pair (see `coloc_sat.campaign_store`). Default value is None.
+    read_roi : bool, optional
+        True to only read, in global daily grids (SMOS, SMAP, WindSat), the grid cells of the region of interest of
+        the co-location: bounding box of the footprint of `product1` and its time range extended by `delta_time` (see
+        `coloc_sat.roi`). Default value is True.
+    roi : dict | None, optional
+        Region of interest used instead of the one of `product1` (see `coloc_sat.roi.get_group_region_of_interest`),
+        so that the comparison products of several reference products are read and cached once. Default value is None.
+    output_mode : str, optional
+        'grid' to write the co-location products as 2D grids of the common zone, or 'matchups' to write only the
+        co-located pixels as a 1D table (see `coloc_sat.ProductIntersection.coloc_matchups`). Default value is 'grid'.
+    matchup_format : str, optional
+        Format of the matchup files: 'netcdf' (`obs` dimension) or 'parquet' (GeoParquet, requires the `parquet`
+        extra). Not used by campaign stores. Default value is 'netcdf'.
     """
 
     def __init__(
@@ -83,6 +236,15 @@ class GenerateColoc:
         config_path = kwargs.get("config", None)
         if config_path is not None:
             set_config(config_path)
+        self._config_path = config_path
+        self.executor = kwargs.get("executor", None) or "serial"
+        if self.executor not in ["serial", "threads", "processes"]:
+            raise ValueError(
+                "executor must be 'serial', 'threads' or 'processes', not "
+                + f"{self.executor}"
+            )
+        self.max_workers = kwargs.get("max_workers", None)
+        self.use_meta_cache = kwargs.get("use_meta_cache", True)
         # Define descriptive attributes
         self.level = kwargs.get("level", None)
         self.ds_name = kwargs.get("ds_name", None)
@@ -96,8 +258,24 @@ class GenerateColoc:
             self.product1_id,
             product_generation=self._product_generation,
             footprint=footprint1,
+            use_cache=self.use_meta_cache,
         )
         self.product2_id = kwargs.get("product2_id", None)
+        self.delta_time = delta_time
+        self.delta_time_np = np.timedelta64(delta_time, "m")
+        self.roi = None
+        if kwargs.get("read_roi", True) and (kwargs.get("roi", None) is not None):
+            # region shared by several reference products (see `coloc_sat.batch_coloc`)
+            self.roi = kwargs["roi"]
+        elif kwargs.get("read_roi", True):
+            try:
+                product1_footprint = self.product1.footprint
+            except ValueError:
+                # some meta classes raise when their footprint is unknown
+                product1_footprint = None
+            self.roi = get_region_of_interest(
+                product1_footprint, self.product1_start_date, self.product1_stop_date
+            )
 
         self.footprint1 = footprint1
         self.footprints_other = []
@@ -121,19 +299,42 @@ class GenerateColoc:
                 self.product2_id,
                 product_generation=self._product_generation,
                 footprint=kwargs.get("footprint2", None),
+                use_cache=self.use_meta_cache,
+                roi=self.roi,
             )
         else:
             self.product2 = None
-        self.delta_time = delta_time
         self._minimal_area = minimal_area
         self.resampling_method = kwargs.get("resampling_method", None)
-        self.delta_time_np = np.timedelta64(delta_time, "m")
+        self.resampler_cache_dir = kwargs.get("resampler_cache_dir", None)
         self.destination_folder = destination_folder
         self._listing_filename = kwargs.get("listing_filename", None)
         self._colocation_filename = kwargs.get("colocation_filename", None)
+        self._comparison_files = kwargs.get("comparison_files", None)
+        self._comparison_footprints = kwargs.get("comparison_footprints", None)
+        self.campaign_store = kwargs.get("campaign_store", None)
+        self.output_mode = kwargs.get("output_mode", None) or "grid"
+        if self.output_mode not in OUTPUT_MODES:
+            raise ValueError(
+                f"output_mode must be in {OUTPUT_MODES}, not {self.output_mode}"
+            )
+        self.matchup_format = kwargs.get("matchup_format", None) or "netcdf"
+        if self.matchup_format not in MATCHUP_FORMATS:
+            raise ValueError(
+                f"matchup_format must be in {MATCHUP_FORMATS}, not {self.matchup_format}"
+            )
+        self.encoding_options = get_encoding_options(
+            load_config().get("output_encoding", None),
+            policy=kwargs.get("encoding_policy", None),
+            compression=kwargs.get("compression", None),
+            complevel=kwargs.get("complevel", None),
+            engine=kwargs.get("netcdf_engine", None),
+            chunks=kwargs.get("chunks", None),
+        )
         # define other attributes
         self.comparison_files = self.get_comparison_files
         self.intersections = None
+        self._intersection_results = {}
         self.colocated_files = None
         self.fill_intersections()
         self.fill_colocated_files()
@@ -148,22 +349,7 @@ class GenerateColoc:
         int
             Minimal area intersection in square kilometers
         """
-        if isinstance(self._minimal_area, int):
-            return self._minimal_area
-        elif isinstance(self._minimal_area, str):
-            if self._minimal_area.endswith("km2"):
-                return int(self._minimal_area.replace("km2", ""))
-            elif self._minimal_area.endswith("m2"):
-                return int(self._minimal_area.replace("m2", "")) * 1e6
-            else:
-                raise ValueError(
-                    "minimal_area expressed as a string in argument must end by km2 or m2"
-                )
-        else:
-            raise TypeError(
-                "minimal_area expressed as an argument must be a string or an integer. Please refer to "
-                + "the documentation"
-            )
+        return get_minimal_area_in_km_squared(self._minimal_area)
 
     @property
     def compare2products(self):
@@ -264,6 +450,9 @@ class GenerateColoc:
         else:
             name1 = intersection.meta1.product_name.split(".")[0]
             name2 = intersection.meta2.product_name.split(".")[0]
+            if self.output_mode == "matchups":
+                extension = "parquet" if self.matchup_format == "parquet" else "nc"
+                return f"sat_coloc_{name1}__{name2}_matchups.{extension}"
             return f"sat_coloc_{name1}__{name2}.nc"
 
     @property
@@ -302,46 +491,153 @@ class GenerateColoc:
         """
         if self.compare2products:
             return [self.product2_id]
+        elif self._comparison_files is not None:
+            return [f for f in self._comparison_files if f != self.product1_id]
         else:
+            try:
+                footprint = self.product1.footprint
+            except ValueError:
+                footprint = None
             all_comparison_files = get_all_comparison_files(
                 pd.to_datetime(self.product1_start_date),
                 pd.to_datetime(self.product1_stop_date),
                 ds_name=self.ds_name,
                 input_ds=self.input_ds,
                 level=self.level,
+                footprint=footprint,
+                minimal_area=self.minimal_area,
             )
             if self.product1_id in all_comparison_files:
                 all_comparison_files.remove(self.product1_id)
             return all_comparison_files
 
+    def is_in_time_range(self, file):
+        """
+        Know, without opening it, if a comparison product can respect the time criteria of the co-location. Dates
+        are taken from the filename; products whose filename doesn't give them are always kept.
+
+        Parameters
+        ----------
+        file: str
+            Path of the comparison product
+
+        Returns
+        -------
+        bool
+            False if the product can't be co-located with `self.product1` because of its dates
+        """
+        try:
+            dates = extract_start_stop_dates_from_filename(file)
+        except ValueError:
+            dates = None
+        if dates is None:
+            return True
+        start, stop = dates
+        # same criteria as in `ProductIntersection.has_intersection`
+        return not (
+            (self.product1_stop_date < start - self.delta_time_np)
+            or (stop + self.delta_time_np < self.product1_start_date)
+        )
+
+    def filter_candidates_by_footprint(self, candidates):
+        """
+        Discard the candidates whose footprint doesn't intersect the one of `self.product1` on at least
+        `self.minimal_area`, with a single spatial join (see `coloc_sat.intersection_tools.join_footprints`).
+        Footprints are the ones given for the comparison products (`footprint2`, `comparison_footprints`);
+        candidates without known footprint are kept.
+
+        Parameters
+        ----------
+        candidates: list[(str, shapely.geometry.base.BaseGeometry | None)]
+            Comparison products and the footprints given to their meta class
+
+        Returns
+        -------
+        list[(str, shapely.geometry.base.BaseGeometry | None)]
+            Kept candidates
+        """
+        try:
+            footprint1 = self.product1.footprint
+        except ValueError:
+            footprint1 = None
+        known_footprints = {}
+        if self._comparison_footprints is not None:
+            known_footprints = dict(zip(self._comparison_files, self._comparison_footprints))
+        footprints = [
+            footprint if footprint is not None else known_footprints.get(file, None)
+            for file, footprint in candidates
+        ]
+        if (not footprint1) or all(footprint is None for footprint in footprints):
+            return candidates
+        _, hits, _, _ = join_footprints([footprint1], footprints, self.minimal_area)
+        hits = set(hits)
+        kept = [
+            candidate
+            for position, (candidate, footprint) in enumerate(zip(candidates, footprints))
+            if (footprint is None) or (position in hits)
+        ]
+        logger.debug(
+            f"{len(kept)} / {len(candidates)} comparison products kept by the footprint intersection"
+        )
+        return kept
+
     def fill_intersections(self):
         """
         Fill a dictionary as `self.intersections` with intersections (`sar_coloc.ProductIntersection`) between
         `self.product1_id` and products that are in `self.comparison_files`. If no products are in
         `self.comparison_files`, so `self.intersections` remains with None value.
+        Products are opened and their intersections are verified with the executor `self.executor`. Products whose
+        filename dates don't respect the time criteria aren't opened.
         """
         _intersections = {}
         if len(self.footprints_other) != len(self.comparison_files):
             fp = [None for _ in self.comparison_files]
         else:
             fp = self.footprints_other
-        for i in range(len(self.comparison_files)):
-            try:
-                file = self.comparison_files[i]
-                opened_file = call_meta_class(
-                    file, product_generation=self._product_generation, footprint=fp[i]
-                )
-                intersecter = ProductIntersection(
-                    self.product1,
-                    opened_file,
-                    delta_time=self.delta_time,
-                    minimal_area=self.minimal_area,
-                    resampling_method=self.resampling_method,
-                    product_generation=self._product_generation,
-                )
-                _intersections[file] = intersecter
-            except FileNotFoundError:
-                pass
+        candidates = [
+            (file, footprint)
+            for file, footprint in zip(self.comparison_files, fp)
+            if self.is_in_time_range(file)
+        ]
+        logger.debug(
+            f"{len(candidates)} / {len(self.comparison_files)} comparison products kept by the time criteria"
+        )
+        candidates = self.filter_candidates_by_footprint(candidates)
+        # rename longitude/latitude once, so that the workers don't modify the shared product1
+        self.product1 = reformat_meta(self.product1)
+        intersection_kwargs = dict(
+            delta_time=self.delta_time,
+            minimal_area=self.minimal_area,
+            resampling_method=self.resampling_method,
+            resampler_cache_dir=self.resampler_cache_dir,
+        )
+        args = [
+            (
+                self.product1,
+                file,
+                footprint,
+                self._product_generation,
+                intersection_kwargs,
+                self._config_path,
+                self.use_meta_cache,
+                self.roi,
+            )
+            for file, footprint in candidates
+        ]
+        if (self.executor == "serial") or (len(args) <= 1):
+            results = [evaluate_intersection(*arg) for arg in args]
+        else:
+            pool = (
+                ThreadPoolExecutor
+                if self.executor == "threads"
+                else ProcessPoolExecutor
+            )
+            with pool(max_workers=self.max_workers) as executor:
+                results = list(executor.map(evaluate_intersection, *zip(*args)))
+        for (file, _), result in zip(candidates, results):
+            if result is not None:
+                _intersections[file], self._intersection_results[file] = result
+        logger.debug(f"Meta cache: {get_meta_cache().info()}")
         if len(list(_intersections.keys())) > 0:
             self.intersections = _intersections
 
@@ -354,7 +650,11 @@ class GenerateColoc:
         if self.intersections is not None:
             _colocated_files = []
             for filename, intersection in self.intersections.items():
-                if intersection.has_intersection:
+                if filename in self._intersection_results:
+                    has_intersection = self._intersection_results[filename]
+                else:
+                    has_intersection = intersection.has_intersection
+                if has_intersection:
                     _colocated_files.append(filename)
             if len(_colocated_files) > 0:
                 self.colocated_files = _colocated_files
@@ -381,6 +681,24 @@ class GenerateColoc:
 
         pass
 
+    def coloc_dataset(self, intersection):
+        """
+        Get the co-location product of an intersection, as 2D grids or matchups depending on `self.output_mode`.
+
+        Parameters
+        ----------
+        intersection: coloc_sat.ProductIntersection
+            intersection between 2 products
+
+        Returns
+        -------
+        xarray.Dataset
+            Co-location product
+        """
+        if self.output_mode == "matchups":
+            return intersection.coloc_matchups
+        return intersection.coloc_product_datasets
+
     def save_results(self):
         """
         Save the result listing as a text file, and / or the resulting co-location product as a netcdf file.
@@ -398,20 +716,10 @@ class GenerateColoc:
                     # Create the destination directory if it doesn't exist
                     if not os.path.exists(self.destination_folder):
                         os.makedirs(self.destination_folder)
-                    line = f"{self.product1.product_path}:{colocated_file}\n"
-                    reversed_line = f"{colocated_file}:{self.product1.product_path}\n"
                     # only write the 2 co-located product if the co-location doesn't exist in the listing file
-                    if os.path.exists(listing_path):
-                        with open(listing_path, "r") as listing_file:
-                            existing_lines = listing_file.readlines()
-                    else:
-                        # if the listing file doesn't exist, so there are no existing lines
-                        existing_lines = []
-                    if (line not in existing_lines) and (
-                        reversed_line not in existing_lines
+                    if get_listing_store(listing_path).add(
+                        self.product1.product_path, colocated_file
                     ):
-                        with open(listing_path, "a") as listing_file:
-                            listing_file.write(line)
                         logger.info(
                             f"A co-located product have been added in the listing file "
                             + f"{listing_path}"
@@ -422,15 +730,37 @@ class GenerateColoc:
                             + f"{listing_path}"
                         )
 
-                if self.product_generation(intersection):
+                if self.product_generation(intersection) and (
+                    self.campaign_store is not None
+                ):
+                    meta1, meta2 = intersection.meta1, intersection.meta2
+                    with CampaignStore(
+                        self.campaign_store, encoding_options=self.encoding_options
+                    ) as store:
+                        store.append(
+                            self.coloc_dataset(intersection),
+                            meta1.product_path,
+                            meta2.product_path,
+                            start_date=min(meta1.start_date, meta2.start_date),
+                            stop_date=max(meta1.stop_date, meta2.stop_date),
+                            group=self.colocation_filename(intersection).split(".")[0],
+                        )
+                elif self.product_generation(intersection):
                     colocation_product_path = os.path.join(
                         self.destination_folder, self.colocation_filename(intersection)
                     )
                     # Create the destination directory if it doesn't exist
                     if not os.path.exists(self.destination_folder):
                         os.makedirs(self.destination_folder)
-                    coloc_ds = intersection.coloc_product_datasets
-                    coloc_ds.to_netcdf(colocation_product_path)
+                    coloc_ds = self.coloc_dataset(intersection)
+                    if (self.output_mode == "matchups") and (
+                        self.matchup_format == "parquet"
+                    ):
+                        write_geoparquet(coloc_ds, colocation_product_path)
+                    else:
+                        write_netcdf(
+                            coloc_ds, colocation_product_path, self.encoding_options
+                        )
                     logger.info(
                         f"A co-located product have been created: {colocation_product_path}"
                     )
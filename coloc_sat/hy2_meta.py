@@ -22,22 +22,61 @@ class GetHy2Meta:
         self._latitude_name = "lat"
         if footprint is not None:
             self._footprint = footprint
-        self._dataset = GetHy2Meta._open_nc(product_path).load()
-        self.dataset = correct_dataset(self._dataset, self.longitude_name)
+        self._dataset = None
+        self._start_date = None
+        self._stop_date = None
+        # without product generation, the dataset is only opened when the intersection is verified
+        if self.product_generation:
+            self._dataset = self._open_dataset()
+
+    def _open_dataset(self):
+        """
+        Open the acquisition dataset. When a co-location product is generated, the whole dataset is loaded in memory.
+        Else, only the variables needed to verify an intersection are read.
+
+        Returns
+        -------
+        xarray.Dataset
+            Acquisition dataset
+        """
+        if self.product_generation:
+            ds = GetHy2Meta._open_nc(self.product_path).load()
+        else:
+            ds = GetHy2Meta._open_nc(
+                self.product_path, variables=self.necessary_vars_for_intersection
+            ).load()
+        return correct_dataset(ds, self.longitude_name)
+
+    def _read_time_bounds(self):
+        """
+        Fill start and stop dates, only reading the time variable if the dataset hasn't been opened yet.
+        """
+        if self._dataset is not None:
+            times = self._dataset[self.time_name].values
+        else:
+            times = GetHy2Meta._open_nc(
+                self.product_path, variables=[self.time_name]
+            )[self.time_name].values
+        unique_times = np.unique(times)
+        self._start_date = min(unique_times)
+        self._stop_date = max(unique_times)
 
     @staticmethod
-    def _open_nc(product_path):
+    def _open_nc(product_path, variables=None):
         logger.debug(f"Opening {product_path}")
         ds = xr.open_dataset(product_path, decode_cf=False)
+        if variables is not None:
+            ds = ds[variables]
         # Convert all integer variables to float
         for var in ds.data_vars:
             if np.issubdtype(ds[var].dtype, np.integer):
                 ds[var] = ds[var].astype("float64")
 
         ds = xr.decode_cf(ds)
-        ds["lon"].values = np.where(
-            ds["lon"].values > 180, ds["lon"].values - 360, ds["lon"].values
-        )
+        if "lon" in ds.variables:
+            ds["lon"].values = np.where(
+                ds["lon"].values > 180, ds["lon"].values - 360, ds["lon"].values
+            )
 
         return ds
 
@@ -60,7 +99,9 @@ class GetHy2Meta:
         numpy.datetime64
             Start time
         """
-        return min(np.unique(self.dataset[self.time_name]))
+        if self._start_date is None:
+            self._read_time_bounds()
+        return self._start_date
 
     @property
     def stop_date(self):
@@ -72,7 +113,9 @@ class GetHy2Meta:
         numpy.datetime64
             Stop time
         """
-        return max(np.unique(self.dataset[self.time_name]))
+        if self._stop_date is None:
+            self._read_time_bounds()
+        return self._stop_date
 
     @property
     def longitude_name(self):
@@ -145,6 +188,8 @@ class GetHy2Meta:
         xarray.Dataset
             Acquisition dataset
         """
+        if self._dataset is None:
+            self._dataset = self._open_dataset()
         return self._dataset
 
     @dataset.setter
@@ -207,6 +252,18 @@ class GetHy2Meta:
         """
         return []
 
+    @property
+    def necessary_vars_for_intersection(self):
+        """
+        Get variables needed to verify an intersection (the only ones read when no co-location product is generated)
+
+        Returns
+        -------
+        list[str]
+            Variables needed to verify an intersection
+        """
+        return [self.longitude_name, self.latitude_name, self.time_name]
+
     @property
     def necessary_attrs_in_coloc_product(self):
         """
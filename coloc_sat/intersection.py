@@ -18,14 +18,15 @@ from .intersection_tools import (
     get_common_points,
     get_nearest_time_datasets,
     remove_nat,
+    subset_where,
 )
 from .tools import (
     mean_time_diff,
     reformat_meta,
     convert_str_to_polygon,
     filter_data_polygon,
-    compute_colocated_data,
 )
+from .resampling import SwathResampler, get_swath_resampler
 from .version import __version__
 from numba.typed import Dict
 from numba.core import types
@@ -42,9 +43,11 @@ class ProductIntersection:
         minimal_area=1600,
         resampling_method="nearest",
         product_generation=True,
+        resampler_cache_dir=None,
     ):
         """
         The intersection information can be be given if available. If not, it'll try to compute it.
+        `resampler_cache_dir` is an optional folder where swath resampling operators are stored and reused.
         """
 
         resampling_mapping = {
@@ -65,6 +68,9 @@ class ProductIntersection:
         self.resampled_datasets = None
         self.common_zone_datasets = None
         self.colocation_product = None
+        self.matchup_product = None
+        self.resampler_cache_dir = resampler_cache_dir
+        self.swath_resampler = None
 
     @property
     def has_intersection(self):
@@ -223,11 +229,10 @@ class ProductIntersection:
                     lat_name = open_acquisition.latitude_name
 
                     rasterized = rasterize_polygon(open_acquisition, polygon)
-                    dataset = open_acquisition.dataset.where(rasterized)
-
-                    dataset = dataset.dropna(lon_name, how="all")
-                    dataset = dataset.dropna(lat_name, how="all")
-                    return dataset
+                    return subset_where(
+                        open_acquisition.dataset,
+                        xr.DataArray(rasterized, dims=[lat_name, lon_name]),
+                    )
             else:
                 raise ValueError(
                     "`geographic_intersection` only can be applied on model regular grid acquisition"
@@ -316,11 +321,10 @@ class ProductIntersection:
                     lat_name = open_acquisition.latitude_name
 
                     rasterized = rasterize_polygon(open_acquisition, polygon)
-                    dataset = open_acquisition.dataset.where(rasterized)
-
-                    dataset = dataset.dropna(lon_name, how="all")
-                    dataset = dataset.dropna(lat_name, how="all")
-                    return dataset
+                    return subset_where(
+                        open_acquisition.dataset,
+                        xr.DataArray(rasterized, dims=[lat_name, lon_name]),
+                    )
             else:
                 raise ValueError(
                     "`geographic_intersection` only can be applied on daily regular grid acquisition"
@@ -335,8 +339,8 @@ class ProductIntersection:
                     start_date=self.start_date,
                     stop_date=self.stop_date,
                 )
-                return dataset.where(
-                    ~np.isnan(dataset[open_acquisition.wind_name]), drop=True
+                return subset_where(
+                    dataset, ~np.isnan(dataset[open_acquisition.wind_name])
                 )
             else:
                 raise ValueError(
@@ -423,8 +427,7 @@ class ProductIntersection:
                         & (ds_scat[lat_name] > min_lat)
                         & (ds_scat[lat_name] < max_lat)
                     )
-                    ds_scat_intersected = ds_scat.where(condition, drop=True)
-                    return ds_scat_intersected
+                    return subset_where(ds_scat, condition)
             else:
                 raise ValueError(
                     "`geographic_intersection` only can be applied on daily regular grid acquisition"
@@ -663,16 +666,19 @@ class ProductIntersection:
             "reprojected_dataset": reprojected_dataset,
         }
 
-    def coloc_resample_swath(self):
+    def swath_association(self):
         """
-        Resample 2 satellite swath (2D lon and lat) datasets from `self.meta1`and `self.meta2`. If a dataset exists in `self._datasets`
-        (it means that a meta dataset has been intersected temporally and spatially), so this one is chosen.
+        Associate the pixels of 2 satellite swath (2D lon and lat) datasets from `self.meta1`and `self.meta2`, both
+        reduced to the common footprint. If a dataset exists in `self._datasets` (it means that a meta dataset has
+        been intersected temporally and spatially), so this one is chosen. The dataset with the coarser resolution
+        is the target of the association.
 
         Returns
         -------
-        Dict[str, Union[xarray.Dataset, str]]
-            Two first values of the dictionary are resampled datasets from meta1 and meta 2.  Last value is a string
-            that precise which dataset of both has been reprojected.
+        Dict[str, Any]
+            `target_data` and `source_data` (variables by name), `target_lon`, `target_lat`, `source_lon`,
+            `source_lat`, `resampler` (`coloc_sat.resampling.SwathResampler`), `valid` (mask of the target pixels
+            associated to source pixels) and `reprojected_dataset` ('dataset1' or 'dataset2', the source dataset).
         """
         # FIXME this should be a parameter
         radius_km = 25 * np.sqrt(2) / 2
@@ -742,12 +748,11 @@ class ProductIntersection:
         for n in ds2.data_vars:
             data_vars_2[n] = ds2[n].astype("float64").values
 
-        polyg_coords = np.array(self.common_footprint.exterior.coords)
         data_1_reduced, lon_1_reduced, lat_1_reduced = filter_data_polygon(
-            lon_1, lat_1, data_vars_1, polyg_coords
+            lon_1, lat_1, data_vars_1, self.common_footprint
         )
         data_2_reduced, lon_2_reduced, lat_2_reduced = filter_data_polygon(
-            lon_2, lat_2, data_vars_2, polyg_coords
+            lon_2, lat_2, data_vars_2, self.common_footprint
         )
 
         if lon_1_reduced is None or lon_2_reduced is None:
@@ -759,56 +764,102 @@ class ProductIntersection:
                 "Reduced lon/lat arrays must not be empty. Verify that the two datasets really intersects."
             )
 
-        if lon_1_delta > lon_2_delta:
-            lon_reduced = lon_1_reduced
-            lat_reduced = lat_1_reduced
-        else:
-            lon_reduced = lon_2_reduced
-            lat_reduced = lat_2_reduced
-
-        colocated_data_2 = Dict.empty(
-            key_type=types.unicode_type, value_type=types.float64[:, :]
-        )
-        for n in data_vars_2:
-            colocated_data_2[n] = np.full(lon_reduced.shape, np.nan)
-
-        colocated_data_1 = Dict.empty(
-            key_type=types.unicode_type, value_type=types.float64[:, :]
-        )
-        for n in data_vars_1:
-            colocated_data_1[n] = np.full(lon_reduced.shape, np.nan)
-
-        logger.info("Start pixel association...")
+        # The dataset with the coarser resolution is the target of the resampling
         if lon_1_delta > lon_2_delta:
             reprojected_dataset = "dataset2"
-            colocated_data_1, colocated_data_2 = compute_colocated_data(
+            lon_reduced, lat_reduced, target_data = (
                 lon_1_reduced,
                 lat_1_reduced,
-                lon_2,
-                lat_2,
                 data_1_reduced,
+            )
+            source_lon, source_lat, source_data = (
+                lon_2_reduced,
+                lat_2_reduced,
                 data_2_reduced,
-                1,
-                colocated_data_1,
-                colocated_data_2,
-                "wind_speed",
-                radius_km,
             )
         else:
             reprojected_dataset = "dataset1"
-            colocated_data_2, colocated_data_1 = compute_colocated_data(
+            lon_reduced, lat_reduced, target_data = (
                 lon_2_reduced,
                 lat_2_reduced,
-                lon_1,
-                lat_1,
                 data_2_reduced,
+            )
+            source_lon, source_lat, source_data = (
+                lon_1_reduced,
+                lat_1_reduced,
                 data_1_reduced,
-                1,
-                colocated_data_2,
-                colocated_data_1,
-                "wind_speed",
+            )
+
+        logger.info("Start pixel association...")
+        geometry_key = SwathResampler.make_geometry_key(
+            lon_reduced, lat_reduced, source_lon, source_lat, radius_km
+        )
+        if (
+            self.swath_resampler is None
+            or self.swath_resampler.geometry_key != geometry_key
+        ):
+            self.swath_resampler = get_swath_resampler(
+                lon_reduced,
+                lat_reduced,
+                source_lon,
+                source_lat,
                 radius_km,
+                cache_dir=self.resampler_cache_dir,
             )
+        resampler = self.swath_resampler
+        # a target pixel is kept when at least `min_px` source pixels are associated
+        min_px = 1
+        valid = resampler.n_neighbours >= min_px
+
+        return {
+            "target_data": target_data,
+            "source_data": source_data,
+            "target_lon": lon_reduced,
+            "target_lat": lat_reduced,
+            "source_lon": source_lon,
+            "source_lat": source_lat,
+            "resampler": resampler,
+            "valid": valid,
+            "reprojected_dataset": reprojected_dataset,
+        }
+
+    def coloc_resample_swath(self):
+        """
+        Resample 2 satellite swath (2D lon and lat) datasets from `self.meta1`and `self.meta2`. If a dataset exists in `self._datasets`
+        (it means that a meta dataset has been intersected temporally and spatially), so this one is chosen.
+
+        Returns
+        -------
+        Dict[str, Union[xarray.Dataset, str]]
+            Two first values of the dictionary are resampled datasets from meta1 and meta 2.  Last value is a string
+            that precise which dataset of both has been reprojected.
+        """
+        association = self.swath_association()
+        meta1 = self.meta1
+        meta2 = self.meta2
+        target_data = association["target_data"]
+        source_data = association["source_data"]
+        lon_reduced = association["target_lon"]
+        lat_reduced = association["target_lat"]
+        resampler = association["resampler"]
+        valid = association["valid"]
+        reprojected_dataset = association["reprojected_dataset"]
+
+        colocated_target = {
+            n: np.where(valid, target_data[n], np.nan) for n in target_data
+        }
+        main_var_name = "wind_speed"
+        if main_var_name in target_data:
+            valid = valid & ~np.isnan(target_data[main_var_name])
+        source_names = list(source_data)
+        resampled = resampler.apply(np.stack([source_data[n] for n in source_names]))
+        colocated_source = {
+            n: np.where(valid, resampled[k], np.nan) for k, n in enumerate(source_names)
+        }
+        if reprojected_dataset == "dataset2":
+            colocated_data_1, colocated_data_2 = colocated_target, colocated_source
+        else:
+            colocated_data_1, colocated_data_2 = colocated_source, colocated_target
 
         colocated_ds_1 = xr.Dataset(
             {var: (("y", "x"), colocated_data_1[var]) for var in colocated_data_1},
@@ -937,19 +988,19 @@ class ProductIntersection:
         lat_min = round(np.nanmin(lat2D), 6)
         lat_max = round(np.nanmax(lat2D), 6)
         # reshape
-        dataset1_common_zone = dataset1_common_zone.where(
+        dataset1_common_zone = subset_where(
+            dataset1_common_zone,
             (dataset1_common_zone[meta1.longitude_name] > lon_min)
             & (dataset1_common_zone[meta1.longitude_name] < lon_max)
             & (dataset1_common_zone[meta1.latitude_name] > lat_min)
             & (dataset1_common_zone[meta1.latitude_name] < lat_max),
-            drop=True,
         )
-        dataset2_common_zone = dataset2_common_zone.where(
+        dataset2_common_zone = subset_where(
+            dataset2_common_zone,
             (dataset2_common_zone[meta2.longitude_name] > lon_min)
             & (dataset2_common_zone[meta2.longitude_name] < lon_max)
             & (dataset2_common_zone[meta2.latitude_name] > lat_min)
             & (dataset2_common_zone[meta2.latitude_name] < lat_max),
-            drop=True,
         )
         dataset1_common_zone = dataset1_common_zone.assign_attrs(
             {"polygon_common_zone": str(poly_intersection)}
@@ -965,11 +1016,11 @@ class ProductIntersection:
         )
         logger.info("Modifying datasets coords in range -180,180.")
 
-        dataset1_common_zone = dataset1_common_zone.where(
-            np.isfinite(dataset1_common_zone[meta1.time_name]), drop=True
+        dataset1_common_zone = subset_where(
+            dataset1_common_zone, np.isfinite(dataset1_common_zone[meta1.time_name])
         )
-        dataset2_common_zone = dataset2_common_zone.where(
-            np.isfinite(dataset2_common_zone[meta2.time_name]), drop=True
+        dataset2_common_zone = subset_where(
+            dataset2_common_zone, np.isfinite(dataset2_common_zone[meta2.time_name])
         )
 
         logger.info("Done getting common zone.")
@@ -1228,6 +1279,180 @@ class ProductIntersection:
             self.colocation_product = self.merge_datasets
         return self.colocation_product
 
+    def matchups_swath(self):
+        """
+        Build the matchups of 2 satellite swaths straight from the pixel association (see `swath_association`): only
+        the target pixels with a finite main variable (`wind_speed`) on both sides are resampled, so that the 2D grids
+        of the common zone are never built.
+
+        Returns
+        -------
+        xarray.Dataset
+            Matchups along an `obs` dimension: target lon / lat, variables of both products (with `_1` / `_2`
+            suffixes) and distance between the target pixel and its source pixels
+        """
+        association = self.swath_association()
+        target_data = association["target_data"]
+        source_data = association["source_data"]
+        resampler = association["resampler"]
+        main_var_name = "wind_speed"
+        valid = association["valid"]
+        if main_var_name in target_data:
+            valid = valid & ~np.isnan(target_data[main_var_name])
+        rows = np.flatnonzero(valid.ravel())
+        source_names = list(source_data)
+        resampled = resampler.apply_points(
+            np.stack([source_data[n] for n in source_names]), rows
+        )
+        if main_var_name in source_names:
+            kept = ~np.isnan(resampled[source_names.index(main_var_name)])
+        else:
+            kept = ~np.all(np.isnan(resampled), axis=0)
+        rows, resampled = rows[kept], resampled[:, kept]
+        distance = resampler.distances(
+            rows,
+            association["target_lon"],
+            association["target_lat"],
+            association["source_lon"],
+            association["source_lat"],
+        )
+        coords = {
+            "lon": ("obs", association["target_lon"].ravel()[rows]),
+            "lat": ("obs", association["target_lat"].ravel()[rows]),
+        }
+        target_ds = xr.Dataset(
+            {n: ("obs", target_data[n].ravel()[rows]) for n in target_data},
+            coords=coords,
+        )
+        source_ds = xr.Dataset(
+            {n: ("obs", resampled[k]) for k, n in enumerate(source_names)},
+            coords=coords,
+        )
+        if association["reprojected_dataset"] == "dataset2":
+            ds1, ds2 = target_ds, source_ds
+        else:
+            ds1, ds2 = source_ds, target_ds
+        matchups = []
+        attrs = {}
+        for meta, ds, ds_nb in [(self.meta1, ds1, 1), (self.meta2, ds2, 2)]:
+            ds[meta.time_name] = ds[meta.time_name].astype("datetime64[ns]")
+            attrs[f"sourceProduct_{ds_nb}"] = meta.product_name
+            attrs[f"missionName_{ds_nb}"] = meta.mission_name
+            attrs[f"measurementStartDate_{ds_nb}"] = str(ds[meta.time_name].min().values)
+            attrs[f"measurementStopDate_{ds_nb}"] = str(ds[meta.time_name].max().values)
+            if hasattr(meta, "rename_vars_in_coloc"):
+                ds = meta.rename_vars_in_coloc(ds)
+            matchups.append(ds)
+        ds1, ds2 = get_common_points(*matchups)
+        ds1 = ds1.rename_vars({var: f"{var}_1" for var in ds1.data_vars})
+        ds2 = ds2.rename_vars({var: f"{var}_2" for var in ds2.data_vars})
+        merged_ds = xr.merge([ds1, ds2], compat="override")
+        merged_ds["distance"] = xr.DataArray(
+            distance,
+            dims="obs",
+            attrs={
+                "units": "km",
+                "long_name": "mean distance between the target pixel and its associated source pixels",
+            },
+        )
+        merged_ds.attrs = attrs
+        return merged_ds
+
+    def matchups_gridded(self):
+        """
+        Build the matchups of gridded products from the co-location product (see `coloc_product_datasets`): both
+        products are reprojected on the same grid, so the distance between the 2 values of a matchup is 0.
+
+        Returns
+        -------
+        xarray.Dataset
+            Matchups along an `obs` dimension
+        """
+        ds = self.coloc_product_datasets
+        stacked = ds.stack(obs=list(ds.dims)).reset_index("obs")
+        masks = [
+            stacked[var].notnull()
+            for var in stacked.data_vars
+            if var.startswith("wind_speed_")
+        ] or [stacked[var].notnull() for var in stacked.data_vars]
+        valid = masks[0]
+        for mask in masks[1:]:
+            valid = valid & mask
+        matchups = stacked.isel(obs=np.flatnonzero(valid.values))
+        matchups = matchups.drop_vars(
+            [c for c in matchups.coords if c not in ["lon", "lat"]]
+        )
+        matchups["distance"] = xr.DataArray(
+            np.zeros(matchups.sizes["obs"]),
+            dims="obs",
+            attrs={"units": "km", "long_name": "distance between the 2 values (same grid cell)"},
+        )
+        matchups.attrs = {
+            f"{attr}_{ds_nb}": ds.attrs[f"{attr}_{ds_nb}"]
+            for attr in [
+                "sourceProduct",
+                "missionName",
+                "measurementStartDate",
+                "measurementStopDate",
+            ]
+            for ds_nb in [1, 2]
+            if f"{attr}_{ds_nb}" in ds.attrs
+        }
+        return matchups
+
+    @property
+    def coloc_matchups(self):
+        """
+        Get the co-located pixels as a 1D table (`obs` dimension) instead of 2D grids of the common zone: lon, lat,
+        times and variables of both products, and distance between the 2 pixels of each matchup. For swaths, it is
+        built from the pixel association without the 2D grids; for gridded products, from the co-location product.
+        The result is stored in `self.matchup_product`.
+
+        Returns
+        -------
+        xarray.Dataset
+            Matchups
+        """
+        if self.matchup_product is not None:
+            return self.matchup_product
+        swath_types = ["truncated_swath", "swath"]
+        if (self.meta1.acquisition_type in swath_types) and (
+            self.meta2.acquisition_type in swath_types
+        ):
+            matchups = self.matchups_swath()
+        else:
+            matchups = self.matchups_gridded()
+        if matchups.sizes["obs"] == 0:
+            raise ValueError("There are no common points to create the matchups")
+        attrs = dict(matchups.attrs)
+        attrs["time_difference"] = str(
+            mean_time_diff(
+                attrs["measurementStartDate_1"],
+                attrs["measurementStopDate_1"],
+                attrs["measurementStartDate_2"],
+                attrs["measurementStopDate_2"],
+            )
+        )
+        attrs["polygon_common_zone"] = str(self.common_footprint)
+        attrs["area_intersection"] = str(
+            get_polygon_area_in_km_squared(self.common_footprint)
+        )
+        if ("wind_speed_1" in matchups) and ("wind_speed_2" in matchups):
+            difference = (matchups["wind_speed_1"] - matchups["wind_speed_2"]).values
+            counted_points = int(np.count_nonzero(~np.isnan(difference)))
+            attrs["counted_points"] = counted_points
+            # same statistics as the co-location product (see `coloc_product_datasets`)
+            if counted_points > 5:
+                attrs["Bias"] = float(np.nanmean(difference))
+                attrs["Standard deviation"] = float(np.nanstd(difference))
+            else:
+                attrs["Bias"] = np.nan
+                attrs["Standard deviation"] = np.nan
+        attrs["coloc_sat_version"] = __version__
+        matchups.attrs = attrs
+        self.matchup_product = matchups
+        return self.matchup_product
+
     @property
     def meta1(self):
         """
@@ -1,12 +1,93 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
 import numpy as np
 import pyproj
-from shapely import MultiPolygon
-from shapely.geometry import Polygon, MultiPoint, LineString, Point
-from itertools import product
-import math
+import shapely
+import xarray as xr
+from shapely.geometry.base import BaseGeometry
 from affine import Affine
 from .tools import extract_name_from_meta_class, convert_str_to_polygon
 
+# Geodesic computations (areas) on the WGS84 ellipsoid
+_GEOD = pyproj.Geod(ellps="WGS84")
+
+# Maximum number of areas kept in the cache of `get_polygons_area_in_km_squared`
+AREA_CACHE_SIZE = 100000
+_area_cache = OrderedDict()
+_area_cache_lock = threading.Lock()
+
+
+def get_condition_indexers(cond):
+    """
+    Get, for each dimension of a condition, the positions where the condition is True somewhere along the other
+    dimensions. Contiguous positions are given as a slice, so that lazily opened variables are read as a
+    hyperslab.
+
+    Parameters
+    ----------
+    cond: xarray.DataArray
+        Boolean condition
+
+    Returns
+    -------
+    dict[str, slice | numpy.ndarray]
+        Indexers of the dimensions that have positions to drop
+    """
+    values = np.asarray(cond.values, dtype=bool)
+    indexers = {}
+    for axis, dim in enumerate(cond.dims):
+        other_axes = tuple(a for a in range(values.ndim) if a != axis)
+        keep = np.flatnonzero(values.any(axis=other_axes))
+        if keep.size == values.shape[axis]:
+            continue
+        if (keep.size > 0) and (keep[-1] - keep[0] + 1 == keep.size):
+            indexers[dim] = slice(keep[0], keep[-1] + 1)
+        else:
+            indexers[dim] = keep
+    return indexers
+
+
+def subset_where(dataset, cond):
+    """
+    Subset a dataset like `dataset.where(cond, drop=True)`: positions where the condition is False along all the
+    other dimensions are dropped with `isel`, then the data variables having all the dimensions of the condition
+    are masked (set to NaN) where the condition is False. Unlike `xarray.Dataset.where`, the other variables are
+    neither broadcast to the condition dimensions nor masked, and floating variables aren't copied when the
+    condition is True everywhere in the subset.
+
+    Parameters
+    ----------
+    dataset: xarray.Dataset
+        Dataset to subset
+    cond: xarray.DataArray | numpy.ndarray
+        Boolean condition. A numpy array must have the dimensions of the dataset, in the order of `dataset.dims`.
+
+    Returns
+    -------
+    xarray.Dataset
+        Subset of the dataset
+    """
+    if not isinstance(cond, xr.DataArray):
+        cond = xr.DataArray(np.asarray(cond), dims=list(dataset.dims)[: np.ndim(cond)])
+    cond = cond.astype(bool).compute()
+    indexers = get_condition_indexers(cond)
+    dataset = dataset.isel(indexers)
+    cond = cond.isel(indexers)
+    all_true = bool(cond.all())
+    masked = {}
+    for name, var in dataset.data_vars.items():
+        if not set(cond.dims).issubset(var.dims):
+            continue
+        if all_true and (
+            np.issubdtype(var.dtype, np.floating)
+            or np.issubdtype(var.dtype, np.datetime64)
+        ):
+            continue
+        masked[name] = var.where(cond)
+    return dataset.assign(masked)
+
 
 def extract_times_dataset(acquisition, dataset=None, start_date=None, stop_date=None):
     """
@@ -39,8 +120,8 @@ def extract_times_dataset(acquisition, dataset=None, start_date=None, stop_date=
     if stop_date is None:
         stop_date = acquisition.stop_date
     time_name = acquisition.time_name
-    return dataset.where((dataset[time_name] >= start_date) &
-                         (dataset[time_name] <= stop_date), drop=True)
+    return subset_where(dataset, (dataset[time_name] >= start_date) &
+                        (dataset[time_name] <= stop_date))
 
 
 def are_dimensions_empty(dataset):
@@ -63,9 +144,101 @@ def are_dimensions_empty(dataset):
     return True
 
 
+def _to_geometry(polygon):
+    """
+    Get a shapely geometry from a geometry, its WKT or its WKB (None is kept as is).
+    """
+    if (polygon is None) or isinstance(polygon, BaseGeometry):
+        return polygon
+    elif isinstance(polygon, str):
+        return convert_str_to_polygon(polygon)
+    elif isinstance(polygon, (bytes, bytearray)):
+        return shapely.from_wkb(bytes(polygon))
+    raise ValueError(f"Area from type {type(polygon)} can't be computed. Polygon is : {polygon}")
+
+
+def _geodesic_areas(geometries):
+    """
+    Geodesic areas (square kilometers) of an array of geometries, on the WGS84 ellipsoid. Only the polygonal parts
+    of the geometries have an area: rings are measured with `pyproj.Geod.polygon_area_perimeter` and the area of the
+    holes is removed from the one of their exterior ring.
+    """
+    parts, part_geometry = shapely.get_parts(geometries, return_index=True)
+    # parts of the multipolygons of geometry collections
+    parts, subpart_part = shapely.get_parts(parts, return_index=True)
+    part_geometry = part_geometry[subpart_part]
+    # other parts (lines, points) have no area
+    is_polygon = shapely.get_type_id(parts) == shapely.GeometryType.POLYGON
+    parts, part_geometry = parts[is_polygon], part_geometry[is_polygon]
+    rings, ring_part = shapely.get_rings(parts, return_index=True)
+    coords, coord_ring = shapely.get_coordinates(rings, return_index=True)
+    bounds = np.searchsorted(coord_ring, np.arange(rings.size + 1))
+    lons, lats = np.ascontiguousarray(coords[:, 0]), np.ascontiguousarray(coords[:, 1])
+    ring_areas = np.array(
+        [
+            abs(_GEOD.polygon_area_perimeter(lons[start:stop], lats[start:stop])[0])
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+    )
+    # the exterior ring of a polygon comes first, then its holes
+    is_exterior = np.ones(rings.size, dtype=bool)
+    is_exterior[1:] = ring_part[1:] != ring_part[:-1]
+    areas = np.zeros(len(geometries))
+    if rings.size:
+        np.add.at(
+            areas,
+            part_geometry[ring_part],
+            np.where(is_exterior, ring_areas, -ring_areas),
+        )
+    return areas / 1e6
+
+
+def get_polygons_area_in_km_squared(polygons):
+    """
+    Get the geodesic areas (WGS84 ellipsoid) of several polygons in square kilometers. Areas are cached by geometry
+    (hash of its WKB), so that a footprint is measured once per process.
+
+    Parameters
+    ----------
+    polygons: Iterable[shapely.geometry.base.BaseGeometry | str | bytes | None]
+        Polygons, multipolygons or geometry collections (footprints, common zones, ...), their WKT or their WKB
+
+    Returns
+    -------
+    numpy.ndarray
+        Areas in square kilometers. Geometries without polygonal part (lines, points, empty geometries) have a 0
+        area, missing geometries (None) a NaN area.
+    """
+    geometries = np.array([_to_geometry(polygon) for polygon in polygons], dtype=object)
+    areas = np.full(geometries.size, np.nan)
+    present = np.flatnonzero(geometries != None)  # noqa: E711 (element-wise comparison)
+    if present.size == 0:
+        return areas
+    keys = [hashlib.sha1(wkb).digest() for wkb in shapely.to_wkb(geometries[present])]
+    missing = []
+    with _area_cache_lock:
+        for position, key in zip(present, keys):
+            area = _area_cache.get(key, None)
+            if area is None:
+                missing.append(position)
+            else:
+                _area_cache.move_to_end(key)
+                areas[position] = area
+    if missing:
+        missing = np.array(missing)
+        areas[missing] = _geodesic_areas(geometries[missing])
+        with _area_cache_lock:
+            for position, key in zip(present, keys):
+                _area_cache[key] = areas[position]
+                _area_cache.move_to_end(key)
+            while len(_area_cache) > AREA_CACHE_SIZE:
+                _area_cache.popitem(last=False)
+    return areas
+
+
 def get_polygon_area_in_km_squared(polygon):
     """
-    From a polygon, get its area in square kilometers
+    From a polygon, get its geodesic area (WGS84 ellipsoid) in square kilometers
 
     Parameters
     ----------
@@ -77,31 +250,115 @@ def get_polygon_area_in_km_squared(polygon):
     float
         Area of the polygon in square kilometers
     """
-    if isinstance(polygon, str):
-        polygon = convert_str_to_polygon(polygon)
+    polygon = _to_geometry(polygon)
+    if polygon is None:
+        raise ValueError(f"Area from type {type(polygon)} can't be computed. Polygon is : {polygon}")
+    return float(get_polygons_area_in_km_squared([polygon])[0])
 
-    # Define the projection for converting latitude/longitude to meters (EPSG:4326 -> EPSG:3857)
-    proj = pyproj.Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
 
-    if isinstance(polygon, Polygon):
-        projected_polygon = Polygon(proj.itransform(polygon.exterior.coords))
-        area_in_square_meters = projected_polygon.area
+def join_footprints(footprints1, footprints2, minimal_area=None):
+    """
+    Find the intersecting pairs between 2 sets of footprints in a single bulk query: the footprints of
+    `footprints1` are prepared once and tested against the candidates of a `shapely.STRtree` of `footprints2` (or
+    against all of them in a vectorized predicate when there is a single footprint in `footprints1`). Intersection
+    geometries and areas are only computed for intersecting pairs.
 
-    elif isinstance(polygon, MultiPolygon):
-        area_in_square_meters = sum(Polygon(proj.itransform(p.exterior.coords)).area for p in polygon.geoms)
-    elif isinstance(polygon, LineString) or isinstance(polygon, Point):
-        return 0.0
+    Parameters
+    ----------
+    footprints1: Iterable[shapely.geometry.base.BaseGeometry | str | None]
+        Footprints (for example of the reference products), or their WKT. Missing footprints (None) are ignored.
+    footprints2: Iterable[shapely.geometry.base.BaseGeometry | str | None]
+        Footprints (for example of the comparison products), or their WKT. Missing footprints (None) are ignored.
+    minimal_area: float | None
+        Minimal intersection area in square kilometers. Pairs with a smaller intersection are discarded.
 
+    Returns
+    -------
+    numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray
+        For each pair: position in `footprints1`, position in `footprints2`, intersection geometry and its area in
+        square kilometers
+    """
+    footprints1 = np.array([_to_geometry(fp) for fp in footprints1], dtype=object)
+    footprints2 = np.array([_to_geometry(fp) for fp in footprints2], dtype=object)
+    known1 = np.flatnonzero(footprints1 != None)  # noqa: E711 (element-wise comparison)
+    known2 = np.flatnonzero(footprints2 != None)  # noqa: E711 (element-wise comparison)
+    shapely.prepare(footprints1[known1])
+    if known1.size == 1:
+        # a single reference footprint: a vectorized predicate is cheaper than building the tree
+        positions2 = np.flatnonzero(shapely.intersects(footprints1[known1[0]], footprints2[known2]))
+        positions1 = np.zeros(positions2.size, dtype=np.int64)
     else:
-        raise ValueError(f"Area from type {type(polygon)} can't be computed. Polygon is : {polygon}")
-
-    # Convert the area from square meters to square kilometers
-    area_in_square_km = area_in_square_meters / 1e6
-
-    return area_in_square_km
+        tree = shapely.STRtree(footprints2[known2])
+        positions1, positions2 = tree.query(footprints1[known1], predicate="intersects")
+    index1, index2 = known1[positions1], known2[positions2]
+    intersections = shapely.intersection(footprints1[index1], footprints2[index2])
+    areas = get_polygons_area_in_km_squared(intersections)
+    if minimal_area is not None:
+        keep = areas >= minimal_area
+        index1, index2, intersections, areas = (
+            index1[keep],
+            index2[keep],
+            intersections[keep],
+            areas[keep],
+        )
+    return index1, index2, intersections, areas
+
+
+def get_footprint_from_lon_lat(lon, lat, method="convex", concave_ratio=0.3):
+    """
+    Get the footprint of a set of longitude / latitude positions. Positions are paired element-wise, and positions
+    with a NaN longitude or latitude are ignored.
 
+    Parameters
+    ----------
+    lon: numpy.ndarray
+        Longitudes. Must have the same shape as `lat`.
+    lat: numpy.ndarray
+        Latitudes. Must have the same shape as `lon`.
+    method: str
+        `'convex'` (default) gives the convex hull of all the positions. `'boundary'` gives the convex hull of the
+        outer rows and columns of 2D arrays only, which is much faster and exact when the edges of the arrays hold
+        valid positions (regular grids, L2 swaths). `'concave'` gives a concave hull (see `concave_ratio`), better
+        suited to curved swaths.
+    concave_ratio: float
+        Used when `method` is `'concave'`. Number between 0 and 1 (see `shapely.concave_hull`); 1 gives the convex
+        hull, lower values give more detailed footprints.
 
-def get_footprint_from_ll_ds(acquisition, ds=None, start_date=None, stop_date=None):
+    Returns
+    -------
+    shapely.geometry.polygon.Polygon
+        Footprint of the positions
+    """
+    lon = np.asarray(lon, dtype="float64")
+    lat = np.asarray(lat, dtype="float64")
+    if lon.shape != lat.shape:
+        raise ValueError(
+            f"Longitude and latitude shapes must be the same, got {lon.shape} and {lat.shape}"
+        )
+    if method == "boundary" and lon.ndim == 2:
+        lon = np.concatenate([lon[0, :], lon[-1, :], lon[:, 0], lon[:, -1]])
+        lat = np.concatenate([lat[0, :], lat[-1, :], lat[:, 0], lat[:, -1]])
+    elif method not in ["convex", "boundary", "concave"]:
+        raise ValueError(
+            f"Unknown footprint method {method}. Choose from 'convex', 'boundary', 'concave'"
+        )
+    lon = lon.ravel()
+    lat = lat.ravel()
+    valid = ~(np.isnan(lon) | np.isnan(lat))
+    points = shapely.multipoints(np.column_stack((lon[valid], lat[valid])))
+    if method == "concave":
+        return shapely.concave_hull(points, ratio=concave_ratio)
+    return shapely.convex_hull(points)
+
+
+def get_footprint_from_ll_ds(
+    acquisition,
+    ds=None,
+    start_date=None,
+    stop_date=None,
+    method="convex",
+    concave_ratio=0.3,
+):
     """
     Get the footprint from a dataset in an acquisition. If there is a start and a stop time, the footprint is selected
     on this time range.
@@ -117,6 +374,10 @@ def get_footprint_from_ll_ds(acquisition, ds=None, start_date=None, stop_date=No
         Start chosen date.
     stop_date: numpy.datetime64 | None
         End chosen date.
+    method: str
+        Hull computation method: `'convex'`, `'boundary'` or `'concave'` (see `get_footprint_from_lon_lat`)
+    concave_ratio: float
+        Ratio used when `method` is `'concave'` (see `get_footprint_from_lon_lat`)
 
     Returns
     -------
@@ -127,11 +388,23 @@ def get_footprint_from_ll_ds(acquisition, ds=None, start_date=None, stop_date=No
         ds = acquisition.dataset
     if (start_date is not None) or (stop_date is not None):
         ds = extract_times_dataset(acquisition, dataset=ds, start_date=start_date, stop_date=stop_date)
-    flatten_lon = ds[acquisition.longitude_name].data.flatten()
-    flatten_lat = ds[acquisition.latitude_name].data.flatten()
-    mpt_coords = [(lon, lat) for lon, lat in product(flatten_lon, flatten_lat) if not (math.isnan(lon) or
-                                                                                       math.isnan(lat))]
-    return MultiPoint(mpt_coords).convex_hull
+    lon = ds[acquisition.longitude_name]
+    lat = ds[acquisition.latitude_name]
+    if lon.ndim == 1 and lat.ndim == 1 and lon.dims != lat.dims and method != "concave":
+        # Regular grid: the convex hull of all the grid points is the one of the extreme coordinates
+        lon_extremes = [np.nanmin(lon.values), np.nanmax(lon.values)] if lon.size else []
+        lat_extremes = [np.nanmin(lat.values), np.nanmax(lat.values)] if lat.size else []
+        lon2d, lat2d = np.meshgrid(lon_extremes, lat_extremes)
+        return get_footprint_from_lon_lat(lon2d, lat2d)
+    # 1D longitude and latitude along different dimensions are broadcast against each other,
+    # 2D ones are paired element-wise
+    lon, lat = xr.broadcast(lon, lat)
+    return get_footprint_from_lon_lat(
+        lon.transpose(*lat.dims).values,
+        lat.values,
+        method=method,
+        concave_ratio=concave_ratio,
+    )
 
 
 def get_transform(ds, lon_name, lat_name):
@@ -195,7 +468,7 @@ def remove_nat(meta, dataset=None):
     """
     if dataset is None:
         dataset = meta.dataset
-    dataset = dataset.where(np.isfinite(dataset[meta.time_name]), drop=True).squeeze()
+    dataset = subset_where(dataset, np.isfinite(dataset[meta.time_name])).squeeze()
     if meta.has_orbited_segmentation:
         dimension_to_check = meta.orbit_segment_name
         # Verify if the orbit dimension is used by variables in the dataset
@@ -0,0 +1,241 @@
+import logging
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def pair_lines(product1, product2):
+    """
+    Lines of a co-located pair in a listing file, in both orders of the 2 products.
+
+    Returns
+    -------
+    tuple[str]
+        `product1:product2` and `product2:product1`
+    """
+    return f"{product1}:{product2}", f"{product2}:{product1}"
+
+
+def reversed_lines(line):
+    """
+    Lines of the reversed pair of a listing line. Paths can contain ':' (`s3://...`), so the line is reversed at each
+    of its ':'.
+
+    Returns
+    -------
+    list[str]
+        Candidate reversed lines
+    """
+    parts = line.split(":")
+    return [
+        ":".join(parts[k:]) + ":" + ":".join(parts[:k]) for k in range(1, len(parts))
+    ]
+
+
+def parse_listing_line(line):
+    """
+    Get the key of a line of a listing file (`product1:product2`): the line itself, without its surrounding blanks.
+
+    Returns
+    -------
+    str | None
+        Line, or None for an empty line
+    """
+    line = line.strip()
+    return line or None
+
+
+class ListingStore:
+    """
+    Listing file of co-located products (`listing_coloc_*.txt`, one `product1:product2` line per pair) with an
+    in-memory index of its lines, so that duplicates (in both orders) are detected without reading the whole file
+    again.
+    Appends are done under an exclusive lock of the file (on POSIX systems), after reading the lines written by
+    other processes since the last access, so that concurrent writers don't duplicate nor interleave lines. Readers
+    take a shared lock, and only index complete lines.
+
+    Parameters
+    ----------
+    path: str
+        Path of the listing file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lines = set()
+        # number of bytes of the file already read in the index
+        self._offset = 0
+        self._ends_with_newline = True
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __contains__(self, pair):
+        with self._lock:
+            self._read()
+            return any(line in self._lines for line in pair_lines(*pair))
+
+    def _read(self):
+        """
+        Index the lines written since the last access, under a shared lock of the file (appends are waited for).
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as listing_file:
+            if fcntl is not None:
+                fcntl.flock(listing_file.fileno(), fcntl.LOCK_SH)
+            try:
+                self._refresh(listing_file)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(listing_file.fileno(), fcntl.LOCK_UN)
+
+    def _refresh(self, listing_file, whole=False):
+        size = os.fstat(listing_file.fileno()).st_size
+        if size < self._offset:
+            # the file has been truncated or replaced, index it again
+            self._lines.clear()
+            self._offset = 0
+        if size == self._offset:
+            return
+        listing_file.seek(self._offset)
+        data = listing_file.read(size - self._offset)
+        if not whole:
+            # a last line without newline may be still written (by a process that doesn't lock the file): it is read
+            # once complete. Bytes of a multibyte character are never split from their line.
+            data = data[: data.rfind(b"\n") + 1]
+        for line in data.decode().splitlines():
+            line = parse_listing_line(line)
+            if line is not None:
+                self._lines.add(line)
+        self._offset += len(data)
+        if data:
+            self._ends_with_newline = data.endswith(b"\n")
+
+    def add(self, product1, product2):
+        """
+        Append a co-located pair to the listing file, unless it (or the reversed pair) is already in it.
+
+        Parameters
+        ----------
+        product1: str
+            Path of the first product
+        product2: str
+            Path of the second product
+
+        Returns
+        -------
+        bool
+            True if the pair has been added
+        """
+        lines = pair_lines(product1, product2)
+        with self._lock:
+            # the file is read (from the last read offset) before checking the pair, in case it has been modified by
+            # another process, truncated or replaced
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "ab+") as listing_file:
+                if fcntl is not None:
+                    fcntl.flock(listing_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    # under the exclusive lock, a last line without newline is complete
+                    self._refresh(listing_file, whole=True)
+                    if any(line in self._lines for line in lines):
+                        return False
+                    line = lines[0] + "\n"
+                    if not self._ends_with_newline:
+                        line = "\n" + line
+                    data = line.encode()
+                    listing_file.write(data)
+                    listing_file.flush()
+                    self._lines.add(lines[0])
+                    self._offset += len(data)
+                    self._ends_with_newline = True
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(listing_file.fileno(), fcntl.LOCK_UN)
+        return True
+
+    def pairs(self):
+        """
+        Get the co-located pairs of the listing file
+
+        Returns
+        -------
+        list[str]
+            Sorted `product1:product2` lines
+        """
+        with self._lock:
+            self._read()
+            return sorted(self._lines)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_listing_store(path):
+    """
+    Get the process-wide `ListingStore` of a listing file, so that its index is shared by the `GenerateColoc` of a
+    process.
+
+    Parameters
+    ----------
+    path: str
+        Path of the listing file
+
+    Returns
+    -------
+    ListingStore
+        Listing store
+    """
+    path = os.path.abspath(path)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = ListingStore(path)
+        return _stores[path]
+
+
+def merge_listings(listing_paths, output_path):
+    """
+    Merge listing files (for example one per worker) into a single `listing_coloc_*.txt` file without duplicated
+    pairs (in both orders). Lines keep the order of their first occurrence.
+
+    Parameters
+    ----------
+    listing_paths: list[str]
+        Listing files to merge
+    output_path: str
+        Path of the merged listing file. It is replaced if it exists.
+
+    Returns
+    -------
+    int
+        Number of pairs in the merged listing
+    """
+    keys = set()
+    lines = []
+    for listing_path in listing_paths:
+        with open(listing_path, "r") as listing_file:
+            for line in listing_file:
+                key = parse_listing_line(line)
+                if (key is None) or (key in keys):
+                    continue
+                if any(reversed_line in keys for reversed_line in reversed_lines(key)):
+                    continue
+                keys.add(key)
+                lines.append(key + "\n")
+    tmp_path = f"{output_path}.tmp{os.getpid()}"
+    with open(tmp_path, "w") as output_file:
+        output_file.writelines(lines)
+    os.replace(tmp_path, output_path)
+    logger.info(f"{len(lines)} co-located pairs written in {output_path}")
+    return len(lines)
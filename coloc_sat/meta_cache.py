@@ -0,0 +1,340 @@
+import copy
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import shapely
+import xarray as xr
+
+from .roi import roi_key
+from .tools import extract_name_from_meta_class, load_config
+
+logger = logging.getLogger(__name__)
+
+# Default memory budget of the process-wide cache (in bytes)
+DEFAULT_MAX_BYTES = 512 * 1024**2
+# Environment variable of the memory budget of the process-wide cache (in MB), before the `meta_cache_max_mb` key of
+# the configuration
+META_CACHE_ENV = "COLOC_SAT_META_CACHE_MB"
+# Part of the memory limit of a worker (see `limit_meta_cache`) usable by its cache
+WORKER_MEMORY_FRACTION = 0.25
+# Minimal memory counted for an xsar meta object of a SAR L1 product (reader, annotations, lazily loaded rasters that
+# aren't found by `meta_nbytes`)
+SAR_META_MIN_BYTES = 32 * 1024**2
+# Depth of the attributes walked by `meta_nbytes`
+_NBYTES_DEPTH = 4
+
+# Memory budget cap of the process (see `limit_meta_cache`)
+_memory_cap = None
+
+
+def _nbytes(value, seen, depth):
+    """
+    Memory used by the arrays of a value (datasets, arrays, data frames), found in its containers and attributes up to
+    `depth` levels. Values already in `seen` aren't counted again.
+    """
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, (xr.Dataset, xr.DataArray, np.ndarray, pd.Series, pd.Index)):
+        return int(value.nbytes)
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if type(value).__name__ == "DataTree":
+        return int(value.nbytes)
+    if depth <= 0:
+        return 0
+    if isinstance(value, dict):
+        children = value.values()
+    elif isinstance(value, (list, tuple, set)):
+        children = value
+    elif hasattr(value, "__dict__") and not isinstance(value, type):
+        children = vars(value).values()
+    else:
+        return 0
+    return sum(_nbytes(child, seen, depth - 1) for child in children)
+
+
+def meta_nbytes(meta):
+    """
+    Estimate the memory used by a meta object: its datasets, and the arrays of its xsar meta objects for SAR L1
+    products (at least `SAR_META_MIN_BYTES` each).
+
+    Parameters
+    ----------
+    meta: coloc_sat.GetSarMeta | coloc_sat.GetSmosMeta | coloc_sat.GetSmapMeta | coloc_sat.GetHy2Meta |
+    coloc_sat.GetEra5Meta | coloc_sat.GetWindsatMeta
+        Meta object
+
+    Returns
+    -------
+    int
+        Number of bytes
+    """
+    nbytes = _nbytes(meta, set(), _NBYTES_DEPTH)
+    l1_info = getattr(meta, "_l1_info", None)
+    if isinstance(l1_info, dict):
+        sar_metas = {
+            id(value)
+            for value in [l1_info.get("meta"), *l1_info.get("submeta", {}).values()]
+            if value is not None
+        }
+        nbytes = max(nbytes, len(sar_metas) * SAR_META_MIN_BYTES)
+    return nbytes
+
+
+def configured_max_bytes():
+    """
+    Memory budget of the process-wide cache: `COLOC_SAT_META_CACHE_MB` environment variable, else `meta_cache_max_mb`
+    key of the configuration, else `DEFAULT_MAX_BYTES`, capped by `limit_meta_cache`.
+
+    Returns
+    -------
+    int
+        Number of bytes
+    """
+    max_mb = os.environ.get(META_CACHE_ENV, None)
+    if max_mb is None:
+        try:
+            max_mb = load_config().get("meta_cache_max_mb", None)
+        except ValueError:
+            # no configuration set
+            max_mb = None
+    max_bytes = DEFAULT_MAX_BYTES if max_mb is None else int(float(max_mb) * 1024**2)
+    if _memory_cap is not None:
+        max_bytes = min(max_bytes, _memory_cap)
+    return max_bytes
+
+
+def limit_meta_cache(memory_limit, fraction=WORKER_MEMORY_FRACTION):
+    """
+    Cap the memory budget of the process-wide cache to a part of the memory limit of the process (ex: memory limit of
+    a dask worker, see `coloc_sat.executors`).
+
+    Parameters
+    ----------
+    memory_limit: int | None
+        Memory limit of the process in bytes. Not limited if None or 0.
+    fraction: float
+        Part of the memory limit usable by the cache
+    """
+    global _memory_cap
+    if not memory_limit:
+        return
+    _memory_cap = int(memory_limit * fraction)
+    _meta_cache.set_max_bytes(configured_max_bytes())
+
+
+def meta_view(meta):
+    """
+    Get a view of a cached meta object: a shallow copy whose datasets are shallow copies too. Attributes reassigned
+    on the view (like in `coloc_sat.tools.reformat_meta`), as well as variables or attributes added to its datasets,
+    don't modify the cached object. Array values are shared and must not be modified in place.
+
+    Parameters
+    ----------
+    meta: coloc_sat.GetSarMeta | coloc_sat.GetSmosMeta | coloc_sat.GetSmapMeta | coloc_sat.GetHy2Meta |
+    coloc_sat.GetEra5Meta | coloc_sat.GetWindsatMeta
+        Cached meta object
+
+    Returns
+    -------
+    coloc_sat.GetSarMeta | coloc_sat.GetSmosMeta | coloc_sat.GetSmapMeta | coloc_sat.GetHy2Meta |
+    coloc_sat.GetEra5Meta | coloc_sat.GetWindsatMeta
+        View of the meta object
+    """
+    view = copy.copy(meta)
+    for name, value in list(vars(view).items()):
+        if isinstance(value, (xr.Dataset, xr.DataArray)):
+            setattr(view, name, value.copy(deep=False))
+    return view
+
+
+def _warm(meta):
+    """
+    Read the dates and open the dataset of a meta object before caching it, so that every view shares them
+    instead of opening the product again.
+    """
+    meta.start_date
+    meta.stop_date
+    if (extract_name_from_meta_class(meta) != "Sar") or (not meta.is_safe):
+        meta.dataset
+
+
+class MetaCache:
+    """
+    Thread-safe cache of opened meta objects, with a least recently used eviction when the memory used by their
+    datasets exceeds `max_bytes`. Products are identified by their path, modification time, product generation mode
+    and footprint, so that a modified product is opened again.
+
+    Parameters
+    ----------
+    max_bytes: int
+        Memory budget in bytes. Caching is disabled if it is 0.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(product_path, product_generation=False, footprint=None, roi=None):
+        """
+        Key of a product in the cache
+
+        Returns
+        -------
+        tuple
+            (path, modification time, product generation, footprint WKB, region of interest)
+        """
+        path = os.path.abspath(product_path)
+        if footprint is None:
+            footprint_key = None
+        elif isinstance(footprint, str):
+            footprint_key = footprint
+        else:
+            footprint_key = shapely.to_wkb(footprint)
+        return (
+            path,
+            os.path.getmtime(path),
+            bool(product_generation),
+            footprint_key,
+            roi_key(roi),
+        )
+
+    def get_or_open(
+        self, product_path, opener, product_generation=False, footprint=None, roi=None
+    ):
+        """
+        Get a view (see `meta_view`) of the meta object of a product, opening it with `opener` if it isn't cached.
+
+        Parameters
+        ----------
+        product_path: str
+            Path of the product
+        opener: Callable
+            Function called as `opener(product_path, product_generation=..., footprint=..., roi=...)` to open the
+            product
+        product_generation: bool
+            True if a co-location product must be created
+        footprint: shapely.geometry.Polygon | str | None
+            Footprint of the product
+        roi: dict | None
+            Region of interest (see `coloc_sat.roi`)
+
+        Returns
+        -------
+        coloc_sat.GetSarMeta | coloc_sat.GetSmosMeta | coloc_sat.GetSmapMeta | coloc_sat.GetHy2Meta |
+        coloc_sat.GetEra5Meta | coloc_sat.GetWindsatMeta
+            Meta object
+        """
+        if self.max_bytes <= 0:
+            return opener(
+                product_path,
+                product_generation=product_generation,
+                footprint=footprint,
+                roi=roi,
+            )
+        key = self.make_key(product_path, product_generation, footprint, roi)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return meta_view(entry[0])
+            self.misses += 1
+        # products are opened outside the lock, so that other products can be read meanwhile
+        meta = opener(
+            product_path,
+            product_generation=product_generation,
+            footprint=footprint,
+            roi=roi,
+        )
+        _warm(meta)
+        nbytes = meta_nbytes(meta)
+        with self._lock:
+            # entries of a previous version of the product will never be used again
+            for stale_key in [
+                k for k in self._entries if (k[0] == key[0]) and (k[1] != key[1])
+            ]:
+                self._nbytes -= self._entries.pop(stale_key)[1]
+            if (key not in self._entries) and (nbytes <= self.max_bytes):
+                self._entries[key] = (meta, nbytes)
+                self._nbytes += nbytes
+                self._evict()
+        return meta_view(meta)
+
+    def set_max_bytes(self, max_bytes):
+        """
+        Change the memory budget, evicting the least recently used products if it is exceeded.
+
+        Parameters
+        ----------
+        max_bytes: int
+            Memory budget in bytes. Caching is disabled if it is 0.
+        """
+        with self._lock:
+            if max_bytes == self.max_bytes:
+                return
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self):
+        while self._entries and (self._nbytes > self.max_bytes):
+            key, (_, nbytes) = self._entries.popitem(last=False)
+            self._nbytes -= nbytes
+            self.evictions += 1
+            logger.debug(f"Meta cache: evicted {key[0]}")
+
+    def clear(self):
+        """
+        Remove all the cached meta objects and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def info(self):
+        """
+        Get cache statistics
+
+        Returns
+        -------
+        dict
+            Number of hits, misses, evictions and cached products, memory used and memory budget (in bytes)
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "nbytes": self._nbytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_meta_cache = MetaCache()
+
+
+def get_meta_cache():
+    """
+    Get the process-wide cache used by `coloc_sat.tools.call_meta_class`
+
+    Returns
+    -------
+    MetaCache
+        Meta cache
+    """
+    return _meta_cache
@@ -1,58 +1,145 @@
 import logging
 
-import geopandas as gpd
-from coloc_sat.generate_coloc import GenerateColoc
+import pandas as pd
+import shapely
+from coloc_sat.generate_coloc import GenerateColoc, get_minimal_area_in_km_squared
+from coloc_sat.intersection_tools import get_polygons_area_in_km_squared
+from coloc_sat.parquet_reader import (
+    PARQUET_BATCH_SIZE,
+    batch_records,
+    decode_parquet_record,
+    iter_parquet_batches,
+    keep_closest_rows,
+)
 from coloc_sat.tools import (
     get_all_comparison_files,
     set_config,
     load_config,
     check_file_match_pattern_date,
 )
-from coloc_sat import init_cluster
+from coloc_sat.sharding import (
+    ShardSelector,
+    append_shard_results,
+    close_shard_results,
+    estimate_group_costs,
+    open_shard_results,
+    shard_results_path,
+)
+from coloc_sat.executors import batch_tasks, get_executor
 from typing import Optional
 import numpy as np
 import os
-from dask.distributed import Client
-from dask import delayed, compute
 import traceback
 from datetime import timedelta
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of parquet rows co-located in the same process (see `group_parquet_rows`)
+PARQUET_GROUP_SIZE = 50
+# Status of a row whose footprints intersect on less than the minimal area: no co-location, like when its products are
+# opened (see `plan_parquet_batch`)
+STATUS_AREA_TOO_SMALL = 20
 
-def setup_logger(filename):
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
 
-    # Create file handler which logs even debug messages
-    fh = logging.FileHandler(filename)
-    fh.setLevel(logging.INFO)
+def _to_geometries(values):
+    """
+    Geometries of a column of a parquet batch (WKB, as read by `coloc_sat.parquet_reader`, or shapely objects).
+    """
+    values = np.asarray(values, dtype=object)
+    is_wkb = np.array([isinstance(value, bytes) for value in values], dtype=bool)
+    if is_wkb.any():
+        values = values.copy()
+        values[is_wkb] = shapely.from_wkb(values[is_wkb])
+    return values
+
 
-    # Create console handler with a higher log level
-    ch = logging.StreamHandler()
-    ch.setLevel(logging.INFO)
+def setup_logger(filename, console=True):
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
 
     # Create formatter and add it to the handlers
     formatter = logging.Formatter(
         "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     )
-    fh.setFormatter(formatter)
-    ch.setFormatter(formatter)
 
-    # Add the handlers to the logger
-    logger.addHandler(fh)
-    logger.addHandler(ch)
+    # Create file handler which logs even debug messages
+    fh = None
+    if filename is not None:
+        fh = logging.FileHandler(filename)
+        fh.setLevel(logging.INFO)
+        fh.setFormatter(formatter)
+        logger.addHandler(fh)
+
+    # Create console handler with a higher log level (the caller may already have one, see `process_parquet_task`)
+    ch = None
+    if console:
+        ch = logging.StreamHandler()
+        ch.setLevel(logging.INFO)
+        ch.setFormatter(formatter)
+        logger.addHandler(ch)
 
     return logger, fh, ch
 
 
 def teardown_logger(logger, fh, ch):
     # Remove handlers to stop logging to the file
-    logger.removeHandler(fh)
-    logger.removeHandler(ch)
+    for handler in [fh, ch]:
+        if handler is not None:
+            logger.removeHandler(handler)
+            handler.close()
+
+
+def find_parquet_file(
+    granule_start,
+    granule_end,
+    ds_name,
+    data_base,
+    time_accuracy,
+    match_filename,
+    match_time_delta_sec,
+):
+    """
+    Find the file of a granule of a parquet file, from its time range.
 
-    fh.close()
-    ch.close()
+    Parameters
+    ----------
+    granule_start: pandas.Timestamp
+        Start date of the granule
+    granule_end: pandas.Timestamp
+        End date of the granule
+    ds_name: str
+        Dataset name
+    data_base: str
+        Filename pattern of the dataset (last component of its path template)
+    time_accuracy: str
+        Accuracy of the research ('day', 'hour', 'minute' or 'second')
+    match_filename: bool
+        True to select the file whose name matches the start date of the granule, else the first file found
+    match_time_delta_sec: datetime.timedelta
+        Margin added to the time range of the granule
+
+    Returns
+    -------
+    str | None, int
+        Selected file (None if no file matches) and number of files found in the time range
+    """
+    files = get_all_comparison_files(
+        start_date=granule_start - match_time_delta_sec,
+        stop_date=granule_end + match_time_delta_sec,
+        ds_name=ds_name,
+        input_ds=None,
+        level=2,
+        accuracy=time_accuracy,
+    )
+    if len(files) == 0:
+        return None, 0
+    if not match_filename:
+        return files[0], len(files)
+    selected = None
+    for f in files:
+        if check_file_match_pattern_date(f, data_base, granule_start):
+            selected = f
+    return selected, len(files)
 
 
 def process_parquet_coloc(
@@ -76,12 +163,15 @@ def process_parquet_coloc(
     exception_to_log=True,
     log_name="coloc_hy2.log",
     status_name="coloc_hy2.status",
+    resampler_cache_dir=None,
+    resolved=None,
+    log_to_console=True,
 ):
     if exception_to_log:
         log_path = os.path.join(destination_folder, log_name)
         status_path = os.path.join(destination_folder, status_name)
         os.makedirs(destination_folder, exist_ok=True)
-        logger, fh, ch = setup_logger(log_path)
+        logger, fh, ch = setup_logger(log_path, console=log_to_console)
         status = 1
     else:
         logger = logging.getLogger()
@@ -91,65 +181,67 @@ def process_parquet_coloc(
         if config is not None:
             set_config(config)
 
+        row = decode_parquet_record(row)
         footprint1 = row["ref_geometry"]
         footprint2 = row["match_geometry"]
 
-        # if (
-        #    row["ref_granule"]
-        #    != "S1A_IW_OCN__2SDV_20220531T235908_20220531T235933_043462_05308F_8771.SAFE"
-        # ):
-        #    continue
-
-        o_files = get_all_comparison_files(
-            start_date=row["match_start"] - match_time_delta_sec_2,
-            stop_date=row["match_end"] + match_time_delta_sec_2,
-            ds_name=ds2,
-            input_ds=None,
-            level=2,
-            accuracy=time_accuracy_2,
-        )
+        # files are resolved by the plan (see `plan_parquet_coloc`), or for this row only
+        if resolved is None:
+            resolved = {}
+        if resolved.get("discarded", None) is not None:
+            # discarded by the plan (see `plan_parquet_batch`): products aren't opened
+            logger.info(
+                f"Pair {row['ref_granule']} and {row['match_granule']} discarded: {resolved['discarded']}"
+            )
+            status = STATUS_AREA_TOO_SMALL
+            return status
+        match_resolution = resolved.get("match", None)
+        if match_resolution is None:
+            match_resolution = find_parquet_file(
+                row["match_start"],
+                row["match_end"],
+                ds2,
+                data_base_2,
+                time_accuracy_2,
+                match_filename_2,
+                match_time_delta_sec_2,
+            )
+        elif isinstance(match_resolution, str):
+            raise RuntimeError(f"File research failed:\n{match_resolution}")
+        o_file, n_o_files = match_resolution
 
-        if len(o_files) == 0:
+        if n_o_files == 0:
             logger.warning(f"No file found for {row['match_granule']}")
             return 2
+        if not o_file:
+            logger.warning(f"File {row['match_granule']} not found.")
+            return 2
 
-        if match_filename_2:
-            o_file = None
-            for f in o_files:
-                if check_file_match_pattern_date(f, data_base_2, row["match_start"]):
-                    o_file = f
-            if not o_file:
-                logger.warning(f"File {row['match_granule']} not found.")
-                return 2
-        else:
-            o_file = o_files[0]
-
-        ref_files = get_all_comparison_files(
-            start_date=row["ref_start"] - match_time_delta_sec_1,
-            stop_date=row["ref_end"] + match_time_delta_sec_1,
-            ds_name=ds1,
-            input_ds=None,
-            level=2,
-            accuracy=time_accuracy_1,
-        )
-        if len(ref_files) == 0:
+        ref_resolution = resolved.get("ref", None)
+        if ref_resolution is None:
+            ref_resolution = find_parquet_file(
+                row["ref_start"],
+                row["ref_end"],
+                ds1,
+                data_base_1,
+                time_accuracy_1,
+                match_filename_1,
+                match_time_delta_sec_1,
+            )
+        elif isinstance(ref_resolution, str):
+            raise RuntimeError(f"File research failed:\n{ref_resolution}")
+        r_file, n_r_files = ref_resolution
+
+        if n_r_files == 0:
             logger.warning(
                 f"No file found for {row['ref_granule']}, {row['ref_start'] - match_time_delta_sec_1}, {row['ref_end'] + match_time_delta_sec_1}"
             )
             return 2
+        if not r_file:
+            logger.warning(f"File {row['ref_granule']} not found.")
+            return 2
 
-        if match_filename_1:
-            r_file = None
-            for f in ref_files:
-                if check_file_match_pattern_date(f, data_base_1, row["ref_start"]):
-                    r_file = f
-            if not r_file:
-                logger.warning(f"File {row['ref_granule']} not found.")
-                return 2
-        else:
-            r_file = ref_files[0]
-
-        logger.info(f"Found file {ref_files[0]}")
+        logger.info(f"Found file {r_file}")
         logger.info(f"Found file {o_file}")
 
         logger.info(f"Process {row['ref_granule']} and {row['match_granule']}")
@@ -165,6 +257,7 @@ def process_parquet_coloc(
             minimal_area=minimal_area,
             resampling_method=resampling_method,
             config=config,
+            resampler_cache_dir=resampler_cache_dir,
         )
         status = generator.save_results()
 
@@ -179,6 +272,301 @@ def process_parquet_coloc(
             teardown_logger(logger, fh, ch)
             with open(status_path, "w") as status_f:
                 status_f.write(str(status))
+    return status
+
+
+def group_parquet_rows(prq, group_size=PARQUET_GROUP_SIZE):
+    """
+    Group the rows of a parquet file that share products: rows are linked by their `match_granule` and their
+    `ref_granule` (connected components), so that each product is used by a single group. Large components are
+    split in groups of at most `group_size` rows, sorted by granules so that consecutive rows share their products.
+
+    Parameters
+    ----------
+    prq: pandas.DataFrame
+        Rows of the parquet file
+    group_size: int | None
+        Maximum number of rows in a group. Not limited if None.
+
+    Returns
+    -------
+    list[numpy.ndarray]
+        Positions of the rows of each group, groups in order of their first row
+    """
+    match_codes, match_granules = pd.factorize(prq["match_granule"])
+    ref_codes, ref_granules = pd.factorize(prq["ref_granule"])
+    # union-find on granules: match granules are numbered first, then ref granules
+    parents = np.arange(len(match_granules) + len(ref_granules))
+
+    def find(node):
+        while parents[node] != node:
+            parents[node] = parents[parents[node]]
+            node = parents[node]
+        return node
+
+    for match_code, ref_code in zip(match_codes, ref_codes + len(match_granules)):
+        root1, root2 = find(match_code), find(ref_code)
+        if root1 != root2:
+            parents[max(root1, root2)] = min(root1, root2)
+    # components numbered in order of their first row
+    components, _ = pd.factorize(np.array([find(code) for code in match_codes]))
+    order = np.lexsort((ref_codes, match_codes, components))
+    groups = []
+    for positions in np.split(order, np.flatnonzero(np.diff(components[order])) + 1):
+        step = group_size or len(positions)
+        groups += [positions[k : k + step] for k in range(0, len(positions), step)]
+    return [positions for positions in groups if len(positions)]
+
+
+def plan_parquet_coloc(
+    prq,
+    ds1,
+    ds2,
+    data_base_1,
+    data_base_2,
+    time_accuracy_1,
+    time_accuracy_2,
+    match_filename_1,
+    match_filename_2,
+    match_time_delta_sec_1,
+    match_time_delta_sec_2,
+    group_size=PARQUET_GROUP_SIZE,
+    groups=None,
+):
+    """
+    Plan the co-locations of a parquet file: the file of every granule is resolved once (a granule shared by
+    several rows isn't searched again), and rows sharing products are grouped (see `group_parquet_rows`), so that
+    a group can be run in a single process where each product is opened once (see `coloc_sat.meta_cache`).
+
+    Parameters
+    ----------
+    prq: pandas.DataFrame
+        Rows of the parquet file
+    ds1: str
+        Reference dataset name
+    ds2: str
+        Matched dataset name
+    data_base_1: str
+        Filename pattern of the reference dataset
+    data_base_2: str
+        Filename pattern of the matched dataset
+    time_accuracy_1: str
+        Research accuracy of the reference files
+    time_accuracy_2: str
+        Research accuracy of the matched files
+    match_filename_1: bool
+        True to select the reference files by their name (see `find_parquet_file`)
+    match_filename_2: bool
+        True to select the matched files by their name (see `find_parquet_file`)
+    match_time_delta_sec_1: datetime.timedelta
+        Margin added to the time range of the reference granules
+    match_time_delta_sec_2: datetime.timedelta
+        Margin added to the time range of the matched granules
+    group_size: int | None
+        Maximum number of rows in a group
+    groups: list[numpy.ndarray] | None
+        Groups of rows to plan (see `group_parquet_rows`), for example the groups of a shard (see
+        `coloc_sat.sharding`): only the granules of their rows are resolved. Default is all the groups of `prq`.
+
+    Returns
+    -------
+    list[list[(dict, dict)]]
+        Groups of rows (records, see `coloc_sat.parquet_reader`), with the resolved files of each row (`match` and `ref` keys: selected file and number of
+        files found, or the traceback of the error raised by the research)
+    """
+    sides = {
+        "match": (
+            ds2,
+            data_base_2,
+            time_accuracy_2,
+            match_filename_2,
+            match_time_delta_sec_2,
+        ),
+        "ref": (
+            ds1,
+            data_base_1,
+            time_accuracy_1,
+            match_filename_1,
+            match_time_delta_sec_1,
+        ),
+    }
+    if groups is None:
+        groups = group_parquet_rows(prq, group_size)
+    planned = prq.iloc[np.concatenate(groups)] if groups else prq.iloc[:0]
+    resolutions = {}
+    for side, options in sides.items():
+        granules = planned[
+            [f"{side}_granule", f"{side}_start", f"{side}_end"]
+        ].drop_duplicates()
+        for granule, start, end in granules.itertuples(index=False):
+            try:
+                resolution = find_parquet_file(
+                    pd.Timestamp(start), pd.Timestamp(end), *options
+                )
+            except Exception:
+                # the error is reported in the log of each row of the granule
+                resolution = traceback.format_exc()
+            resolutions[(side, granule, start, end)] = resolution
+        logger.info(f"{len(granules)} {side} granules resolved for {len(planned)} rows")
+
+    plan = []
+    for positions in groups:
+        group = []
+        # compact records (see `coloc_sat.parquet_reader`) are sent to the workers instead of pandas rows
+        for row in batch_records(prq.iloc[positions]):
+            group.append(
+                (
+                    row,
+                    {
+                        side: resolutions[
+                            (side, row[f"{side}_granule"], row[f"{side}_start"], row[f"{side}_end"])
+                        ]
+                        for side in sides
+                    },
+                )
+            )
+        plan.append(group)
+    logger.info(f"{len(planned)} rows divided in {len(plan)} groups sharing their products")
+    return plan
+
+
+def process_parquet_group(
+    group,
+    ds1,
+    ds2,
+    data_base_1,
+    data_base_2,
+    time_accuracy_1,
+    time_accuracy_2,
+    match_filename_1,
+    match_filename_2,
+    match_time_delta_sec_1,
+    match_time_delta_sec_2,
+    product_generation,
+    delta_time,
+    minimal_area,
+    resampling_method,
+    config,
+    resampler_cache_dir=None,
+    log_to_console=True,
+):
+    """
+    Run the co-locations of a group of rows (see `plan_parquet_coloc`) in the same process, so that their shared
+    products are opened once. Each row keeps its own log and status (see `process_parquet_coloc`), in its
+    `destination_folder`.
+
+    Parameters
+    ----------
+    group: list[(dict, dict)]
+        Rows and their resolved files
+
+    Other parameters are the ones of `process_parquet_coloc`.
+
+    Returns
+    -------
+    list
+        Status of each row
+    """
+    return [
+        process_parquet_coloc(
+            row,
+            ds1,
+            ds2,
+            data_base_1,
+            data_base_2,
+            time_accuracy_1,
+            time_accuracy_2,
+            match_filename_1,
+            match_filename_2,
+            match_time_delta_sec_1,
+            match_time_delta_sec_2,
+            row["destination_folder"],
+            product_generation,
+            delta_time,
+            minimal_area,
+            resampling_method,
+            config,
+            resampler_cache_dir=resampler_cache_dir,
+            resolved=resolved,
+            log_to_console=log_to_console,
+        )
+        for row, resolved in group
+    ]
+
+
+def process_parquet_task(
+    groups,
+    ds1,
+    ds2,
+    data_base_1,
+    data_base_2,
+    time_accuracy_1,
+    time_accuracy_2,
+    match_filename_1,
+    match_filename_2,
+    match_time_delta_sec_1,
+    match_time_delta_sec_2,
+    product_generation,
+    delta_time,
+    minimal_area,
+    resampling_method,
+    config,
+    resampler_cache_dir=None,
+):
+    """
+    Run a task of several groups of rows (see `coloc_sat.executors.batch_tasks`): the configuration and the console
+    logger are set once for the task instead of once per row.
+
+    Parameters
+    ----------
+    groups: list[list[(dict, dict)]]
+        Groups of rows and their resolved files (see `plan_parquet_coloc`)
+
+    Other parameters are the ones of `process_parquet_group`.
+
+    Returns
+    -------
+    list[dict]
+        Result of each row: granules, destination folder and status
+    """
+    if config is not None:
+        set_config(config)
+    root_logger, _, ch = setup_logger(None)
+    try:
+        results = []
+        for group in groups:
+            statuses = process_parquet_group(
+                group,
+                ds1,
+                ds2,
+                data_base_1,
+                data_base_2,
+                time_accuracy_1,
+                time_accuracy_2,
+                match_filename_1,
+                match_filename_2,
+                match_time_delta_sec_1,
+                match_time_delta_sec_2,
+                product_generation,
+                delta_time,
+                minimal_area,
+                resampling_method,
+                config,
+                resampler_cache_dir=resampler_cache_dir,
+                log_to_console=False,
+            )
+            results.extend(
+                {
+                    "ref_granule": row["ref_granule"],
+                    "match_granule": row["match_granule"],
+                    "destination_folder": row["destination_folder"],
+                    "status": status,
+                }
+                for (row, _), status in zip(group, statuses)
+            )
+    finally:
+        teardown_logger(root_logger, None, ch)
+    return results
 
 
 def coloc_from_parquet(
@@ -192,8 +580,24 @@ def coloc_from_parquet(
     config: Optional[str] = None,
     parallel: Optional[bool] = False,
     parallel_datarmor: Optional[bool] = False,
-    memory: Optional[int] = 2,
+    memory: Optional[int] = None,
     n_workers: Optional[int] = 5,
+    resampler_cache_dir: Optional[str] = None,
+    group_size: Optional[int] = PARQUET_GROUP_SIZE,
+    start_date: Optional[str] = None,
+    stop_date: Optional[str] = None,
+    ref_dataset_ids: Optional[list] = None,
+    match_dataset_ids: Optional[list] = None,
+    granules: Optional[list] = None,
+    batch_size: Optional[int] = PARQUET_BATCH_SIZE,
+    shard_index: Optional[int] = None,
+    shard_count: Optional[int] = None,
+    results_folder: Optional[str] = None,
+    executor: Optional[str] = None,
+    retries: Optional[int] = 0,
+    task_rows: Optional[int] = None,
+    task_cost: Optional[float] = None,
+    max_in_flight: Optional[int] = None,
     **kwargs,
 ):
     """
@@ -217,6 +621,22 @@ def coloc_from_parquet(
     minimal_area: str Minimal area for the coloc to be valid. Examples: 300km2, 10m2...
     resampling_method: str Value from rasterio.enums.Resampling. Only used when colocating gridded data.
     filter_dataset_unique: str Can be "ref" or "match", specifies which dataset will be filtered to keep unique values (filtered on granule name)
+    resampler_cache_dir: str Folder where swath resampling operators are stored and reused. Optional
+    group_size: int Maximum number of rows sharing products co-located in the same process (see `plan_parquet_coloc`). Optional
+    start_date: str Rows whose reference product stops before this date aren't read. Optional
+    stop_date: str Rows whose reference product starts after this date aren't read. Optional
+    ref_dataset_ids: list Only rows with these `ref_dataset_id` values are read. Optional
+    match_dataset_ids: list Only rows with these `match_dataset_id` values are read. Optional
+    granules: list Only rows with these `ref_granule` or `match_granule` values are read. Optional
+    batch_size: int Number of rows read and co-located at once. Optional
+    shard_index: int Index of the shard to run, in [0, shard_count). Each shard co-locates its part of the rows, balanced by estimated cost (see `coloc_sat.sharding`); all the shards must be run with the same parameters. Optional
+    shard_count: int Number of shards. Optional
+    results_folder: str Folder of the results table of the shard (see `coloc_sat.sharding.merge_shard_results`). Default is destination_folder, or the folder of the parquet file. Optional
+    executor: str Execution backend: 'serial', 'processes', 'dask-local' or 'dask-jobqueue' (see `coloc_sat.executors`). Default is 'dask-jobqueue' with parallel_datarmor, 'dask-local' with parallel, else 'serial'. Optional
+    retries: int Number of times a failed task is run again. Optional
+    task_rows: int Maximum number of rows of a task: consecutive groups of rows are packed in the same task to cut the scheduling overhead (see `coloc_sat.executors.batch_tasks`). Default is one group per task. Optional
+    task_cost: float Maximum estimated cost of a task (see `coloc_sat.sharding.estimate_group_costs`). Optional
+    max_in_flight: int Maximum number of tasks submitted and not yet completed: tasks are planned and submitted as others complete. Default is twice the number of workers. Optional
     """
 
     config_path = config
@@ -225,14 +645,14 @@ def coloc_from_parquet(
 
     conf_data = load_config()
 
-    if parallel_datarmor:
-        init_cluster(n_workers=n_workers, memory=memory)
-    elif parallel:
-        from dask.distributed import Client
-
-        # Initiate Dask Client
-        client = Client(processes=True, n_workers=n_workers)
-        logger.info(f"Dashboard link: {client.dashboard_link}")
+    if executor is None:
+        # former options: dask cluster of datarmor, dask local cluster
+        if parallel_datarmor:
+            executor = "dask-jobqueue"
+        elif parallel:
+            executor = "dask-local"
+        else:
+            executor = "serial"
 
     ds1 = conf_data["dataset_name_1"]
     ds2 = conf_data["dataset_name_2"]
@@ -254,32 +674,62 @@ def coloc_from_parquet(
     else:
         data_base_2 = os.path.basename(conf_data["paths"][ds2][0])
 
-    prq = gpd.read_parquet(parquet)
-
-    if "destination_folder" not in prq.columns and destination_folder is not None:
-        prq["destination_folder"] = destination_folder
-    elif "destination_folder" not in prq.columns and destination_folder is None:
-        raise ValueError(
-            "destination_folder is neither given in parquet or parameters."
-        )
-
+    batches = iter_parquet_batches(
+        parquet,
+        start_date=start_date,
+        stop_date=stop_date,
+        ref_dataset_ids=ref_dataset_ids,
+        match_dataset_ids=match_dataset_ids,
+        granules=granules,
+        batch_size=batch_size,
+    )
     if filter_dataset_unique:
-        prq["time_diff"] = (prq["ref_start"] - prq["match_start"]).abs()
-        prq = prq.sort_values(by=["time_diff"])
-
-        if filter_dataset_unique == "ref":
-            prq = prq.drop_duplicates(subset=["ref_granule"])
-        elif filter_dataset_unique == "match":
-            prq = prq.drop_duplicates(subset=["match_granule"])
-        else:
-            raise ValueError(
-                f"Unsupported value {filter_dataset_unique} for filter_dataset_unique. Must be 'ref' or 'match'."
-            )
+        # the kept row of a granule can be in any batch: rows are reduced over the whole file first
+        batches = [keep_closest_rows(batches, filter_dataset_unique)]
+
+    shard_selector = None
+    if (shard_index is not None) or (shard_count is not None):
+        if (shard_index is None) or (shard_count is None):
+            raise ValueError("shard_index and shard_count must be given together.")
+        shard_selector = ShardSelector(shard_index, shard_count)
+        results_folder = (
+            results_folder
+            or destination_folder
+            or os.path.dirname(os.path.abspath(parquet))
+        )
+        results_path = shard_results_path(results_folder, shard_index, shard_count)
+        open_shard_results(results_path)
+
+    group_args = (
+        ds1,
+        ds2,
+        data_base_1,
+        data_base_2,
+        t_acc_1,
+        t_acc_2,
+        match_filename_1,
+        match_filename_2,
+        match_time_delta_sec_1,
+        match_time_delta_sec_2,
+        product_generation,
+        delta_time,
+        minimal_area,
+        resampling_method,
+        config,
+    )
 
-    if parallel or parallel_datarmor:
-        tasks = [
-            delayed(process_parquet_coloc)(
-                row,
+    def iter_tasks():
+        # batches are read and planned lazily, when the executor has room for more tasks: there is no barrier
+        # between batches
+        for prq in batches:
+            if "destination_folder" not in prq.columns and destination_folder is not None:
+                prq["destination_folder"] = destination_folder
+            elif "destination_folder" not in prq.columns and destination_folder is None:
+                raise ValueError(
+                    "destination_folder is neither given in parquet or parameters."
+                )
+            plan, costs = plan_parquet_batch(
+                prq,
                 ds1,
                 ds2,
                 data_base_1,
@@ -290,36 +740,145 @@ def coloc_from_parquet(
                 match_filename_2,
                 match_time_delta_sec_1,
                 match_time_delta_sec_2,
-                row["destination_folder"],
-                product_generation,
-                delta_time,
                 minimal_area,
-                resampling_method,
-                config,
-            )
-            for _, row in prq.iterrows()
-        ]
-        results = compute(*tasks)
-    else:
-        for _, row in prq.iterrows():
-            status = process_parquet_coloc(
-                row,
-                ds1,
-                ds2,
-                data_base_1,
-                data_base_2,
-                t_acc_1,
-                t_acc_2,
-                match_filename_1,
-                match_filename_2,
-                match_time_delta_sec_1,
-                match_time_delta_sec_2,
-                row["destination_folder"],
-                product_generation,
-                delta_time,
-                minimal_area,
-                resampling_method,
-                config,
+                group_size=group_size,
+                shard_selector=shard_selector,
+                with_costs=task_cost is not None,
             )
-            # if status == 1:
-            #    raise RuntimeError(f"Fail to process, status {status}")
+            for groups in batch_tasks(
+                plan,
+                sizes=[len(group) for group in plan],
+                max_size=task_rows,
+                costs=costs,
+                max_cost=task_cost,
+            ):
+                yield (groups, *group_args)
+
+    n_tasks, n_rows = 0, 0
+    with get_executor(
+        executor,
+        max_workers=n_workers,
+        memory=memory,
+        retries=retries,
+        max_in_flight=max_in_flight,
+    ) as backend:
+        for _, results in backend.imap(
+            process_parquet_task,
+            iter_tasks(),
+            resampler_cache_dir=resampler_cache_dir,
+        ):
+            n_tasks += 1
+            n_rows += len(results)
+            if shard_selector is not None:
+                append_shard_results(
+                    results_path,
+                    [dict(result, shard_index=shard_index) for result in results],
+                )
+            logger.info(f"{n_tasks} tasks completed, {n_rows} rows co-located")
+    if shard_selector is not None:
+        close_shard_results(results_path)
+        logger.info(f"Results of shard {shard_index}/{shard_count} written in {results_path}")
+
+
+def plan_parquet_batch(
+    prq,
+    ds1,
+    ds2,
+    data_base_1,
+    data_base_2,
+    t_acc_1,
+    t_acc_2,
+    match_filename_1,
+    match_filename_2,
+    match_time_delta_sec_1,
+    match_time_delta_sec_2,
+    minimal_area,
+    group_size=PARQUET_GROUP_SIZE,
+    shard_selector=None,
+    with_costs=False,
+):
+    """
+    Plan the rows of a batch of a parquet file (see `coloc_sat.parquet_reader.iter_parquet_batches`): rows whose
+    footprints intersection is too small are discarded without opening their products (they are planned as groups
+    whose rows only record their `STATUS_AREA_TOO_SMALL` status, see `process_parquet_coloc`), the other ones are
+    grouped and their files resolved (see `plan_parquet_coloc`).
+
+    Parameters
+    ----------
+    prq: pandas.DataFrame
+        Rows of the batch
+    shard_selector: coloc_sat.sharding.ShardSelector | None
+        Shard of the run: only the groups of rows assigned to this shard are planned
+    with_costs: bool
+        True to return the estimated cost of the groups even without shard
+
+    Other parameters are the ones of `plan_parquet_coloc` and `process_parquet_coloc`.
+
+    Returns
+    -------
+    list, numpy.ndarray | None
+        Groups of rows with their resolved files, and their estimated costs (see
+        `coloc_sat.sharding.estimate_group_costs`, None if not computed)
+    """
+    # pairs whose footprints intersect on less than the minimal area can't be co-located, they are discarded before
+    # opening their products
+    areas = get_polygons_area_in_km_squared(
+        shapely.intersection(
+            _to_geometries(prq["ref_geometry"]), _to_geometries(prq["match_geometry"])
+        )
+    )
+    too_small = areas < get_minimal_area_in_km_squared(minimal_area)
+    discarded = prq[too_small]
+    discarded_areas = areas[too_small]
+    if too_small.any():
+        logger.info(
+            f"{too_small.sum()} of {len(prq)} pairs discarded: footprints intersection smaller than {minimal_area}"
+        )
+        prq = prq[~too_small]
+        areas = areas[~too_small]
+
+    groups = group_parquet_rows(prq, group_size)
+    costs = None
+    if (shard_selector is not None) or with_costs:
+        costs = estimate_group_costs(prq, groups, areas)
+    if shard_selector is not None:
+        selected = shard_selector.select(costs)
+        groups = [positions for positions, kept in zip(groups, selected) if kept]
+        costs = costs[selected]
+    plan = plan_parquet_coloc(
+        prq,
+        ds1,
+        ds2,
+        data_base_1,
+        data_base_2,
+        t_acc_1,
+        t_acc_2,
+        match_filename_1,
+        match_filename_2,
+        match_time_delta_sec_1,
+        match_time_delta_sec_2,
+        groups=groups,
+    )
+
+    if shard_selector is not None:
+        kept = shard_selector.select_keys(
+            (discarded["ref_granule"] + ":" + discarded["match_granule"]).tolist()
+        )
+        discarded, discarded_areas = discarded[kept], discarded_areas[kept]
+    discarded_rows = [
+        (
+            row,
+            {
+                "discarded": f"footprints intersection of {area:.1f} km2, smaller than {minimal_area}"
+            },
+        )
+        for row, area in zip(batch_records(discarded), discarded_areas)
+    ]
+    step = group_size or len(discarded_rows) or 1
+    discarded_groups = [
+        discarded_rows[k : k + step] for k in range(0, len(discarded_rows), step)
+    ]
+    plan += discarded_groups
+    if costs is not None:
+        costs = np.concatenate([costs, np.zeros(len(discarded_groups))])
+    return plan, costs
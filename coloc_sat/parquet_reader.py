@@ -0,0 +1,263 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import shapely
+
+logger = logging.getLogger(__name__)
+
+# Number of rows read at once from a parquet file
+PARQUET_BATCH_SIZE = 65536
+
+GEOMETRY_COLUMNS = ["ref_geometry", "match_geometry"]
+TIME_COLUMNS = ["ref_start", "ref_end", "match_start", "match_end"]
+# Columns of the parquet files used by the co-location (other columns aren't read)
+RECORD_COLUMNS = (
+    GEOMETRY_COLUMNS
+    + TIME_COLUMNS
+    + [
+        "ref_granule",
+        "match_granule",
+        "ref_dataset_id",
+        "match_dataset_id",
+        "destination_folder",
+    ]
+)
+
+
+def _time_scalar(value, field_type):
+    """
+    Scalar comparable to a timestamp column of a parquet file. Naive dates are considered in UTC.
+    """
+    import pyarrow as pa
+
+    value = pd.Timestamp(value)
+    if field_type.tz is not None:
+        value = value.tz_localize("UTC") if value.tz is None else value
+        value = value.tz_convert(field_type.tz)
+    elif value.tz is not None:
+        value = value.tz_convert("UTC").tz_localize(None)
+    return pa.scalar(value, type=field_type)
+
+
+def build_parquet_filter(
+    schema,
+    start_date=None,
+    stop_date=None,
+    ref_dataset_ids=None,
+    match_dataset_ids=None,
+    granules=None,
+):
+    """
+    Build the filter pushed down to the parquet reader, so that row groups out of the filter aren't read.
+
+    Parameters
+    ----------
+    schema: pyarrow.Schema
+        Schema of the parquet file
+    start_date: numpy.datetime64 | datetime.datetime | str | None
+        Rows whose reference product stops before this date are discarded
+    stop_date: numpy.datetime64 | datetime.datetime | str | None
+        Rows whose reference product starts after this date are discarded
+    ref_dataset_ids: list[str] | None
+        Kept values of `ref_dataset_id`
+    match_dataset_ids: list[str] | None
+        Kept values of `match_dataset_id`
+    granules: list[str] | None
+        Kept granules (rows whose `ref_granule` or `match_granule` is in the list)
+
+    Returns
+    -------
+    pyarrow.dataset.Expression | None
+        Filter expression, None if there is no filter
+    """
+    import pyarrow.dataset as pds
+
+    conditions = []
+    if start_date is not None:
+        conditions.append(
+            pds.field("ref_end") >= _time_scalar(start_date, schema.field("ref_end").type)
+        )
+    if stop_date is not None:
+        conditions.append(
+            pds.field("ref_start")
+            <= _time_scalar(stop_date, schema.field("ref_start").type)
+        )
+    if ref_dataset_ids is not None:
+        conditions.append(pds.field("ref_dataset_id").isin(list(ref_dataset_ids)))
+    if match_dataset_ids is not None:
+        conditions.append(pds.field("match_dataset_id").isin(list(match_dataset_ids)))
+    if granules is not None:
+        granules = list(granules)
+        conditions.append(
+            pds.field("ref_granule").isin(granules)
+            | pds.field("match_granule").isin(granules)
+        )
+    if not conditions:
+        return None
+    expression = conditions[0]
+    for condition in conditions[1:]:
+        expression = expression & condition
+    return expression
+
+
+def _compact_batch(batch):
+    """
+    Convert a record batch to a table of compact values: geometries as WKB, dates as int64 nanoseconds since epoch
+    (UTC), strings.
+    """
+    import pyarrow as pa
+
+    columns = {}
+    for name, column in zip(batch.schema.names, batch.columns):
+        if pa.types.is_timestamp(column.type):
+            column = column.cast(pa.timestamp("ns", column.type.tz)).cast(pa.int64())
+        columns[name] = column.to_numpy(zero_copy_only=False)
+    return pd.DataFrame(columns)
+
+
+def batch_records(batch):
+    """
+    Rows of a batch (see `iter_parquet_batches`) as records of Python values, like `batch.to_dict("records")` but
+    without walking the arrow backed columns value by value (about 4 times faster on string columns).
+
+    Parameters
+    ----------
+    batch: pandas.DataFrame
+        Rows of a batch
+
+    Returns
+    -------
+    list[dict]
+        Records of the rows
+    """
+    names = list(batch.columns)
+    columns = [batch[name].to_numpy(dtype=object) for name in names]
+    return [dict(zip(names, values)) for values in zip(*columns)]
+
+def iter_parquet_batches(
+    parquet,
+    columns=None,
+    start_date=None,
+    stop_date=None,
+    ref_dataset_ids=None,
+    match_dataset_ids=None,
+    granules=None,
+    batch_size=PARQUET_BATCH_SIZE,
+):
+    """
+    Read a parquet file of co-locations (see `coloc_sat.parquet_coloc.coloc_from_parquet`) by batches of rows, with
+    the filters pushed down to the reader (see `build_parquet_filter`) and only the needed columns. Values are kept
+    compact (see `decode_parquet_record`): geometries as WKB, dates as int64 nanoseconds since epoch (UTC), strings.
+
+    Parameters
+    ----------
+    parquet: str
+        Path of the parquet file (or folder of parquet files)
+    columns: list[str] | None
+        Read columns. Default is the columns of `RECORD_COLUMNS` found in the file.
+    start_date: numpy.datetime64 | datetime.datetime | str | None
+        Start of the time range of the reference products
+    stop_date: numpy.datetime64 | datetime.datetime | str | None
+        Stop of the time range of the reference products
+    ref_dataset_ids: list[str] | None
+        Kept values of `ref_dataset_id`
+    match_dataset_ids: list[str] | None
+        Kept values of `match_dataset_id`
+    granules: list[str] | None
+        Kept reference or matched granules
+    batch_size: int
+        Maximum number of rows of a batch
+
+    Yields
+    ------
+    pandas.DataFrame
+        Rows of a batch
+    """
+    import pyarrow.dataset as pds
+
+    dataset = pds.dataset(parquet, format="parquet")
+    if columns is None:
+        columns = [name for name in RECORD_COLUMNS if name in dataset.schema.names]
+    expression = build_parquet_filter(
+        dataset.schema,
+        start_date=start_date,
+        stop_date=stop_date,
+        ref_dataset_ids=ref_dataset_ids,
+        match_dataset_ids=match_dataset_ids,
+        granules=granules,
+    )
+    n_rows = 0
+    for batch in dataset.to_batches(
+        columns=columns, filter=expression, batch_size=batch_size
+    ):
+        if batch.num_rows == 0:
+            continue
+        n_rows += batch.num_rows
+        yield _compact_batch(batch)
+    logger.info(f"{n_rows} rows read from {parquet}")
+
+
+def keep_closest_rows(batches, side):
+    """
+    Keep a single row by granule of a side (the row whose reference and matched products start the closest in
+    time), over all the batches. Memory is bounded by the number of granules.
+
+    Parameters
+    ----------
+    batches: Iterable[pandas.DataFrame]
+        Batches of rows (see `iter_parquet_batches`)
+    side: str
+        'ref' or 'match'
+
+    Returns
+    -------
+    pandas.DataFrame
+        Kept rows, sorted by the time difference of their products
+    """
+    if side not in ["ref", "match"]:
+        raise ValueError(
+            f"Unsupported value {side} for filter_dataset_unique. Must be 'ref' or 'match'."
+        )
+    kept = None
+    for batch in batches:
+        batch = batch.assign(
+            time_diff=np.abs(batch["ref_start"] - batch["match_start"])
+        )
+        if kept is not None:
+            batch = pd.concat([kept, batch], ignore_index=True)
+        kept = batch.sort_values("time_diff", kind="stable").drop_duplicates(
+            subset=[f"{side}_granule"]
+        )
+    if kept is None:
+        return pd.DataFrame(columns=RECORD_COLUMNS)
+    return kept.drop(columns="time_diff").reset_index(drop=True)
+
+
+def decode_parquet_record(record):
+    """
+    Decode a compact row of a parquet file (see `iter_parquet_batches`): geometries as shapely objects and dates as
+    naive UTC `pandas.Timestamp`. Values already decoded are kept.
+
+    Parameters
+    ----------
+    record: dict | pandas.Series
+        Row of the parquet file
+
+    Returns
+    -------
+    dict
+        Decoded row
+    """
+    row = dict(record)
+    for name in GEOMETRY_COLUMNS:
+        value = row.get(name, None)
+        if isinstance(value, bytes):
+            row[name] = shapely.from_wkb(value)
+        elif isinstance(value, str):
+            row[name] = shapely.from_wkt(value)
+    for name in TIME_COLUMNS:
+        value = row.get(name, None)
+        if isinstance(value, (int, np.integer)):
+            row[name] = pd.Timestamp(int(value))
+    return row
@@ -0,0 +1,378 @@
+import hashlib
+import logging
+import os
+
+import numpy as np
+from numba import njit, prange
+
+from .tools import find_neighbours_within_radius, haversine
+
+logger = logging.getLogger(__name__)
+
+
+@njit(parallel=True)
+def sparse_weighted_nanmean(offsets, indices, weights, data, rows):
+    """
+    Apply rows of a sparse operator (compressed sparse row layout) to stacked variables. For each variable and
+    target pixel, the result is the weighted mean of the finite source values of the target neighbourhood.
+
+    Parameters
+    ----------
+    offsets: numpy.ndarray
+        Row offsets (size: number of target pixels + 1)
+    indices: numpy.ndarray
+        Flat indices of the source pixels
+    weights: numpy.ndarray
+        Weights associated to `indices`
+    data: numpy.ndarray
+        Stacked source variables, with shape (number of variables, number of source pixels)
+    rows: numpy.ndarray
+        Flat indices of the target pixels to compute
+
+    Returns
+    -------
+    numpy.ndarray
+        Resampled variables, with shape (number of variables, number of rows). NaN where no finite value is found
+        in the neighbourhood.
+    """
+    n_vars = data.shape[0]
+    result = np.full((n_vars, rows.size), np.nan)
+    for r in prange(rows.size):
+        q = rows[r]
+        for v in range(n_vars):
+            total = 0.0
+            total_weights = 0.0
+            for k in range(offsets[q], offsets[q + 1]):
+                value = data[v, indices[k]]
+                if not np.isnan(value):
+                    total += weights[k] * value
+                    total_weights += weights[k]
+            if total_weights > 0:
+                result[v, r] = total / total_weights
+    return result
+
+
+@njit(parallel=True)
+def sparse_weighted_mean_distance(
+    offsets, indices, weights, rows, target_lon, target_lat, source_lon, source_lat
+):
+    """
+    For rows of a sparse operator, weighted mean distance (in kilometers) between the target pixel and its
+    associated source pixels.
+
+    Returns
+    -------
+    numpy.ndarray
+        Distances (size: number of rows). NaN for target pixels without source pixel.
+    """
+    result = np.full(rows.size, np.nan)
+    for r in prange(rows.size):
+        q = rows[r]
+        total = 0.0
+        total_weights = 0.0
+        for k in range(offsets[q], offsets[q + 1]):
+            m = indices[k]
+            total += weights[k] * haversine(
+                target_lat[q], target_lon[q], source_lat[m], source_lon[m]
+            )
+            total_weights += weights[k]
+        if total_weights > 0:
+            result[r] = total / total_weights
+    return result
+
+
+class SwathResampler:
+    """
+    Sparse resampling operator of a source swath onto target pixels. The pixel association (neighbours within
+    `radius_km`) is computed once and stored as compressed sparse row arrays, so that any number of variables can
+    then be resampled with a single sparse product. The operator can be saved and reloaded to resample again the
+    same pair of geometries without a new neighbour search.
+
+    Parameters
+    ----------
+    offsets: numpy.ndarray
+        Row offsets (size: number of target pixels + 1)
+    indices: numpy.ndarray
+        Flat indices of the source pixels associated to each target pixel
+    weights: numpy.ndarray
+        Weights associated to `indices`
+    target_shape: tuple[int]
+        Shape of the target lon/lat arrays
+    source_shape: tuple[int]
+        Shape of the source lon/lat arrays
+    radius_km: float
+        Radius used for the pixel association
+    geometry_key: str | None
+        Hash of the geometries and radius used to build the operator (see `SwathResampler.geometry_key`)
+    """
+
+    def __init__(
+        self,
+        offsets,
+        indices,
+        weights,
+        target_shape,
+        source_shape,
+        radius_km,
+        geometry_key=None,
+    ):
+        self.offsets = offsets
+        self.indices = indices
+        self.weights = weights
+        self.target_shape = tuple(target_shape)
+        self.source_shape = tuple(source_shape)
+        self.radius_km = radius_km
+        self.geometry_key = geometry_key
+
+    @staticmethod
+    def make_geometry_key(target_lon, target_lat, source_lon, source_lat, radius_km):
+        """
+        Hash of a pair of geometries and a radius, used to identify a resampling operator.
+
+        Returns
+        -------
+        str
+            Hexadecimal digest
+        """
+        h = hashlib.sha1()
+        for arr in [target_lon, target_lat, source_lon, source_lat]:
+            arr = np.ascontiguousarray(arr, dtype="float64")
+            h.update(str(arr.shape).encode())
+            h.update(arr.tobytes())
+        h.update(repr(float(radius_km)).encode())
+        return h.hexdigest()
+
+    @classmethod
+    def from_lon_lat(cls, target_lon, target_lat, source_lon, source_lat, radius_km):
+        """
+        Build the operator by associating to each target pixel the source pixels located within `radius_km`.
+
+        Parameters
+        ----------
+        target_lon: numpy.ndarray
+            2D longitudes of the target pixels
+        target_lat: numpy.ndarray
+            2D latitudes of the target pixels
+        source_lon: numpy.ndarray
+            2D longitudes of the source pixels
+        source_lat: numpy.ndarray
+            2D latitudes of the source pixels
+        radius_km: float
+            Maximum distance between a target pixel and its source pixels
+
+        Returns
+        -------
+        SwathResampler
+            Resampling operator
+        """
+        offsets, indices = find_neighbours_within_radius(
+            target_lon, target_lat, source_lon, source_lat, radius_km
+        )
+        return cls(
+            offsets,
+            indices,
+            np.ones(indices.size),
+            target_lon.shape,
+            source_lon.shape,
+            radius_km,
+            geometry_key=cls.make_geometry_key(
+                target_lon, target_lat, source_lon, source_lat, radius_km
+            ),
+        )
+
+    @property
+    def n_neighbours(self):
+        """
+        Number of source pixels associated to each target pixel
+
+        Returns
+        -------
+        numpy.ndarray
+            Array with the target shape
+        """
+        return np.diff(self.offsets).reshape(self.target_shape)
+
+    def apply(self, data):
+        """
+        Resample stacked variables of the source swath onto the target pixels.
+
+        Parameters
+        ----------
+        data: numpy.ndarray
+            Stacked variables with shape (number of variables, *source_shape)
+
+        Returns
+        -------
+        numpy.ndarray
+            Resampled variables with shape (number of variables, *target_shape)
+        """
+        n_vars = data.shape[0]
+        if tuple(data.shape[1:]) != self.source_shape:
+            raise ValueError(
+                f"Data shape {data.shape[1:]} doesn't match the source shape {self.source_shape}"
+            )
+        flat_data = np.ascontiguousarray(data, dtype="float64").reshape(n_vars, -1)
+        rows = np.arange(self.offsets.size - 1)
+        result = sparse_weighted_nanmean(
+            self.offsets, self.indices, self.weights, flat_data, rows
+        )
+        return result.reshape((n_vars,) + self.target_shape)
+
+    def apply_points(self, data, rows):
+        """
+        Resample stacked variables of the source swath onto some target pixels only, without building the target
+        grid.
+
+        Parameters
+        ----------
+        data: numpy.ndarray
+            Stacked variables with shape (number of variables, *source_shape)
+        rows: numpy.ndarray
+            Flat indices of the target pixels
+
+        Returns
+        -------
+        numpy.ndarray
+            Resampled variables with shape (number of variables, number of rows)
+        """
+        n_vars = data.shape[0]
+        if tuple(data.shape[1:]) != self.source_shape:
+            raise ValueError(
+                f"Data shape {data.shape[1:]} doesn't match the source shape {self.source_shape}"
+            )
+        flat_data = np.ascontiguousarray(data, dtype="float64").reshape(n_vars, -1)
+        return sparse_weighted_nanmean(
+            self.offsets,
+            self.indices,
+            self.weights,
+            flat_data,
+            np.asarray(rows, dtype=np.int64),
+        )
+
+    def distances(self, rows, target_lon, target_lat, source_lon, source_lat):
+        """
+        Weighted mean distance between some target pixels and their associated source pixels.
+
+        Parameters
+        ----------
+        rows: numpy.ndarray
+            Flat indices of the target pixels
+        target_lon: numpy.ndarray
+            Longitudes of the target pixels (target shape)
+        target_lat: numpy.ndarray
+            Latitudes of the target pixels (target shape)
+        source_lon: numpy.ndarray
+            Longitudes of the source pixels (source shape)
+        source_lat: numpy.ndarray
+            Latitudes of the source pixels (source shape)
+
+        Returns
+        -------
+        numpy.ndarray
+            Distances in kilometers (size: number of rows)
+        """
+        return sparse_weighted_mean_distance(
+            self.offsets,
+            self.indices,
+            self.weights,
+            np.asarray(rows, dtype=np.int64),
+            np.ascontiguousarray(target_lon, dtype="float64").ravel(),
+            np.ascontiguousarray(target_lat, dtype="float64").ravel(),
+            np.ascontiguousarray(source_lon, dtype="float64").ravel(),
+            np.ascontiguousarray(source_lat, dtype="float64").ravel(),
+        )
+
+    def save(self, path):
+        """
+        Save the operator as a numpy `.npz` file.
+
+        Parameters
+        ----------
+        path: str
+            Destination path
+        """
+        np.savez(
+            path,
+            offsets=self.offsets,
+            indices=self.indices,
+            weights=self.weights,
+            target_shape=np.array(self.target_shape),
+            source_shape=np.array(self.source_shape),
+            radius_km=self.radius_km,
+            geometry_key=str(self.geometry_key or ""),
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load an operator saved with `SwathResampler.save`.
+
+        Parameters
+        ----------
+        path: str
+            Path of the `.npz` file
+
+        Returns
+        -------
+        SwathResampler
+            Resampling operator
+        """
+        with np.load(path) as content:
+            return cls(
+                content["offsets"],
+                content["indices"],
+                content["weights"],
+                tuple(content["target_shape"]),
+                tuple(content["source_shape"]),
+                float(content["radius_km"]),
+                geometry_key=str(content["geometry_key"]) or None,
+            )
+
+
+def get_swath_resampler(
+    target_lon, target_lat, source_lon, source_lat, radius_km, cache_dir=None
+):
+    """
+    Get the resampling operator of a pair of geometries. If `cache_dir` is given, the operator is reloaded from it
+    when it has already been computed for the same geometries, else it is computed and stored in it.
+
+    Parameters
+    ----------
+    target_lon: numpy.ndarray
+        2D longitudes of the target pixels
+    target_lat: numpy.ndarray
+        2D latitudes of the target pixels
+    source_lon: numpy.ndarray
+        2D longitudes of the source pixels
+    source_lat: numpy.ndarray
+        2D latitudes of the source pixels
+    radius_km: float
+        Maximum distance between a target pixel and its source pixels
+    cache_dir: str | None
+        Folder where operators are stored
+
+    Returns
+    -------
+    SwathResampler
+        Resampling operator
+    """
+    if cache_dir is None:
+        return SwathResampler.from_lon_lat(
+            target_lon, target_lat, source_lon, source_lat, radius_km
+        )
+    key = SwathResampler.make_geometry_key(
+        target_lon, target_lat, source_lon, source_lat, radius_km
+    )
+    path = os.path.join(cache_dir, f"swath_resampler_{key}.npz")
+    if os.path.exists(path):
+        logger.info(f"Reusing resampling operator {path}")
+        return SwathResampler.load(path)
+    resampler = SwathResampler.from_lon_lat(
+        target_lon, target_lat, source_lon, source_lat, radius_km
+    )
+    os.makedirs(cache_dir, exist_ok=True)
+    # write in a temporary file first, so that concurrent readers never see a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    resampler.save(tmp_path)
+    os.replace(tmp_path, path)
+    return resampler
@@ -0,0 +1,250 @@
+import logging
+
+import numpy as np
+import shapely
+import xarray as xr
+
+from .intersection_tools import get_condition_indexers
+
+logger = logging.getLogger(__name__)
+
+# Margin (in degrees) added around the footprint of the reference product, so that the grid cells touching it are
+# read too
+ROI_MARGIN = 1.0
+
+
+def _to_180(lon):
+    return ((np.asarray(lon, dtype="float64") + 180) % 360) - 180
+
+
+def get_region_of_interest(footprint, start_date=None, stop_date=None, margin=ROI_MARGIN):
+    """
+    Get the region of interest of a co-location: bounding box of the footprint of the reference product (with a
+    margin) and time window.
+
+    Parameters
+    ----------
+    footprint: shapely.geometry.Polygon | shapely.geometry.MultiPolygon | str | None
+        Footprint of the reference product (or its WKT). A footprint crossing the antimeridian can be split in several
+        polygons or expressed in [0, 360].
+    start_date: numpy.datetime64 | None
+        Start of the time window
+    stop_date: numpy.datetime64 | None
+        Stop of the time window
+    margin: float
+        Margin added around the footprint in degrees
+
+    Returns
+    -------
+    dict | None
+        `bbox` (min lon, min lat, max lon, max lat; longitudes in [-180, 180], min lon > max lon when the box crosses
+        the antimeridian), `start_date` and `stop_date`. None if there is no footprint.
+    """
+    if isinstance(footprint, str):
+        footprint = shapely.from_wkt(footprint)
+    if (footprint is None) or footprint.is_empty:
+        return None
+    coords = shapely.get_coordinates(footprint)
+    lon = _to_180(coords[:, 0])
+    min_lat = max(float(coords[:, 1].min()) - margin, -90.0)
+    max_lat = min(float(coords[:, 1].max()) + margin, 90.0)
+    if lon.max() - lon.min() > 180:
+        # the footprint crosses the antimeridian: its bounds are computed in [0, 360]
+        lon = lon % 360
+    min_lon, max_lon = float(lon.min()) - margin, float(lon.max()) + margin
+    if max_lon - min_lon >= 360:
+        min_lon, max_lon = -180.0, 180.0
+    else:
+        min_lon, max_lon = float(_to_180(min_lon)), float(_to_180(max_lon))
+        if max_lon == -180.0:
+            max_lon = 180.0
+    return {
+        "bbox": (min_lon, min_lat, max_lon, max_lat),
+        "start_date": start_date,
+        "stop_date": stop_date,
+    }
+
+
+def get_group_region_of_interest(
+    footprints, start_date=None, stop_date=None, margin=ROI_MARGIN
+):
+    """
+    Get a region of interest covering the footprints of several reference products (see `get_region_of_interest`),
+    so that the comparison products they share are read and cached once. Longitudes cover the whole globe when a
+    footprint crosses the antimeridian.
+
+    Parameters
+    ----------
+    footprints: list[shapely.geometry.base.BaseGeometry | str | None]
+        Footprints of the reference products
+    start_date: numpy.datetime64 | None
+        Start of the time window
+    stop_date: numpy.datetime64 | None
+        Stop of the time window
+    margin: float
+        Margin added around the footprints in degrees
+
+    Returns
+    -------
+    dict | None
+        Region of interest. None if a footprint is unknown (the whole grid is read).
+    """
+    boxes = []
+    for footprint in footprints:
+        roi = get_region_of_interest(footprint, margin=margin)
+        if roi is None:
+            return None
+        boxes.append(roi["bbox"])
+    if not boxes:
+        return None
+    boxes = np.array(boxes, dtype="float64")
+    if (boxes[:, 0] <= boxes[:, 2]).all():
+        min_lon, max_lon = float(boxes[:, 0].min()), float(boxes[:, 2].max())
+    else:
+        min_lon, max_lon = -180.0, 180.0
+    return {
+        "bbox": (min_lon, float(boxes[:, 1].min()), max_lon, float(boxes[:, 3].max())),
+        "start_date": start_date,
+        "stop_date": stop_date,
+    }
+
+
+def roi_key(roi):
+    """
+    Hashable description of a region of interest (used to identify cached products)
+
+    Returns
+    -------
+    tuple | None
+        (bbox, start date, stop date)
+    """
+    if roi is None:
+        return None
+    return (
+        tuple(roi["bbox"]),
+        str(roi.get("start_date", None)),
+        str(roi.get("stop_date", None)),
+    )
+
+
+def _contiguous_slices(positions):
+    """
+    Split sorted positions in slices of contiguous positions.
+    """
+    if positions.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(positions) != 1) + 1
+    return [slice(run[0], run[-1] + 1) for run in np.split(positions, breaks)]
+
+
+def get_lon_lat_indexers(lon, lat, bbox):
+    """
+    Get the index windows of the cells of a regular grid located in a bounding box.
+
+    Parameters
+    ----------
+    lon: numpy.ndarray
+        1D longitudes of the grid (in [-180, 180] or [0, 360])
+    lat: numpy.ndarray
+        1D latitudes of the grid
+    bbox: tuple[float]
+        min lon, min lat, max lon, max lat (see `get_region_of_interest`)
+
+    Returns
+    -------
+    slice, list[slice]
+        Latitude window, and longitude windows (2 windows when the box crosses the antimeridian, or the
+        meridian 0 of a [0, 360] grid)
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    lat_positions = np.flatnonzero((lat >= min_lat) & (lat <= max_lat))
+    lat_slice = (
+        slice(lat_positions[0], lat_positions[-1] + 1)
+        if lat_positions.size
+        else slice(0, 0)
+    )
+    lon_180 = _to_180(lon)
+    if min_lon <= max_lon:
+        in_box = (lon_180 >= min_lon) & (lon_180 <= max_lon)
+    else:
+        in_box = (lon_180 >= min_lon) | (lon_180 <= max_lon)
+    return lat_slice, _contiguous_slices(np.flatnonzero(in_box))
+
+
+def read_region(dataset, lon_name, lat_name, roi):
+    """
+    Select the cells of a global regular grid located in the bounding box of a region of interest. With a lazily
+    opened dataset, only these cells are read. Longitudes of the result are in [-180, 180] and sorted.
+
+    Parameters
+    ----------
+    dataset: xarray.Dataset
+        Global regular grid (1D `lon_name` and `lat_name` dimensions)
+    lon_name: str
+        Name of the longitude dimension
+    lat_name: str
+        Name of the latitude dimension
+    roi: dict
+        Region of interest (see `get_region_of_interest`)
+
+    Returns
+    -------
+    xarray.Dataset
+        Cells of the region of interest
+    """
+    lat_slice, lon_slices = get_lon_lat_indexers(
+        dataset[lon_name].values, dataset[lat_name].values, roi["bbox"]
+    )
+    if not lon_slices:
+        lon_slices = [slice(0, 0)]
+    parts = [
+        dataset.isel({lat_name: lat_slice, lon_name: lon_slice})
+        for lon_slice in lon_slices
+    ]
+    # variables without longitude (ex: crs) are kept as they are
+    region = (
+        parts[0]
+        if len(parts) == 1
+        else xr.concat(parts, dim=lon_name, data_vars="minimal", coords="minimal", compat="override")
+    )
+    region = region.assign_coords({lon_name: _to_180(region[lon_name].values)})
+    logger.debug(
+        f"Region of interest {roi['bbox']}: {dict(region.sizes)} cells of {dict(dataset.sizes)}"
+    )
+    return region.sortby(lon_name)
+
+
+def restrict_to_time_window(dataset, time_name, lon_name, lat_name, roi):
+    """
+    Reduce the lat / lon window of a regular grid to the cells acquired in the time window of a region of interest
+    (at any other position, like an orbit segment). Values aren't masked. The window is kept as is if no cell is
+    acquired in the time window.
+
+    Parameters
+    ----------
+    dataset: xarray.Dataset
+        Regular grid
+    time_name: str
+        Name of the time variable
+    lon_name: str
+        Name of the longitude dimension
+    lat_name: str
+        Name of the latitude dimension
+    roi: dict
+        Region of interest (see `get_region_of_interest`)
+
+    Returns
+    -------
+    xarray.Dataset
+        Reduced grid
+    """
+    start_date, stop_date = roi.get("start_date", None), roi.get("stop_date", None)
+    if (start_date is None) or (stop_date is None):
+        return dataset
+    times = dataset[time_name]
+    cond = (times >= start_date) & (times <= stop_date)
+    other_dims = [dim for dim in cond.dims if dim not in [lon_name, lat_name]]
+    cond = cond.any(dim=other_dims)
+    if not cond.any():
+        return dataset
+    return dataset.isel(get_condition_indexers(cond))
@@ -0,0 +1,99 @@
+import argparse
+import sys
+import logging
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build or update the product catalog used to find co-location candidates."
+    )
+
+    parser.add_argument(
+        "--config",
+        type=str,
+        required=True,
+        help="Configuration file giving the product paths and the catalog location (`catalog` key).",
+    )
+    parser.add_argument(
+        "--catalog",
+        type=str,
+        default=None,
+        help="Path of the catalog database. Overrides the `catalog` key of the configuration.",
+    )
+    parser.add_argument(
+        "--ds-name",
+        type=str,
+        nargs="+",
+        required=True,
+        choices=["S1", "RS2", "RCM", "HY2", "SMOS", "SMAP", "WS"],
+        help="Datasets to index.",
+    )
+    parser.add_argument(
+        "--start-date",
+        type=str,
+        required=True,
+        help="Start of the crawled time range (ex: 2023-01-01).",
+    )
+    parser.add_argument(
+        "--stop-date",
+        type=str,
+        required=True,
+        help="Stop of the crawled time range (ex: 2023-12-31).",
+    )
+    parser.add_argument(
+        "--level",
+        type=int,
+        default=None,
+        choices=[1, 2],
+        help="Product level of SAR datasets. All levels are indexed if not given.",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        default=False,
+        help="Remove the indexed products of the datasets before crawling.",
+    )
+    parser.add_argument("--debug", action="store_true", default=False)
+    parser.add_argument("-v", "--version", action="store_true", help="Print version")
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format="%(asctime)s [%(levelname)s]: %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    logger = logging.getLogger(__name__)
+
+    from coloc_sat.version import __version__
+
+    if args.version:
+        print(__version__)
+        sys.exit(0)
+
+    import pandas as pd
+    from coloc_sat.tools import set_config, load_config
+    from coloc_sat.catalog import ProductCatalog, update_catalog
+
+    set_config(args.config)
+    catalog_path = args.catalog or load_config().get("catalog", None)
+    if catalog_path is None:
+        parser.error("No catalog path given (--catalog or `catalog` key of the configuration).")
+
+    start_date = pd.to_datetime(args.start_date).to_pydatetime()
+    stop_date = pd.to_datetime(args.stop_date).to_pydatetime()
+
+    with ProductCatalog(catalog_path) as catalog:
+        for ds_name in args.ds_name:
+            counts = update_catalog(
+                catalog,
+                ds_name,
+                start_date,
+                stop_date,
+                level=args.level,
+                rebuild=args.rebuild,
+            )
+            logger.info(f"{ds_name}: {counts}")
+
+    logger.info(f"Catalog {catalog_path} successfully updated")
+    sys.exit(0)
@@ -74,6 +74,12 @@ def main():
     parser.add_argument(
         "--resampling-method", type=str, default="nearest", choices=resampling_methods
     )
+    parser.add_argument(
+        "--resampler-cache-dir",
+        type=str,
+        default=None,
+        help="Folder where swath resampling operators are stored and reused.",
+    )
     parser.add_argument(
         "--footprint1",
         type=str,
@@ -86,6 +92,60 @@ def main():
         default=None,
         help="Optional argument to provide a WKT footprint for product2.",
     )
+    parser.add_argument(
+        "--encoding-policy",
+        type=str,
+        default=None,
+        choices=["none", "lossless", "float32", "packed"],
+        help="Encoding of the co-location product. Default is the `output_encoding` section of the configuration, "
+        "else 'none' (xarray defaults).",
+    )
+    parser.add_argument(
+        "--compression",
+        type=str,
+        default=None,
+        choices=["none", "zlib", "zstd"],
+        help="Compression of the co-location product. Default is given by the encoding policy.",
+    )
+    parser.add_argument(
+        "--complevel", type=int, default=None, help="Compression level."
+    )
+    parser.add_argument(
+        "--netcdf-engine",
+        type=str,
+        default=None,
+        choices=["netcdf4", "h5netcdf"],
+        help="Engine used to write the co-location product.",
+    )
+    parser.add_argument(
+        "--chunks",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Chunk sizes of the co-location product by dimension (ex: y=256 x=256).",
+    )
+    parser.add_argument(
+        "--campaign-store",
+        type=str,
+        default=None,
+        help="NetCDF4 file (or Zarr store ending with .zarr) where the co-location product is added as a group, "
+        "instead of its own file.",
+    )
+    parser.add_argument(
+        "--output-mode",
+        type=str,
+        default="grid",
+        choices=["grid", "matchups"],
+        help="Write the co-location product as 2D grids of the common zone, or only the co-located pixels as a "
+        "1D table of matchups.",
+    )
+    parser.add_argument(
+        "--matchup-format",
+        type=str,
+        default="netcdf",
+        choices=["netcdf", "parquet"],
+        help="Format of the matchup file (with --output-mode matchups).",
+    )
     parser.add_argument(
         "--config",
         type=str,
@@ -145,6 +205,10 @@ def main():
         "WARNING : product colocation has only been tested on _ll_gd SAR products."
     )
 
+    from coloc_sat.encoding import parse_chunks
+
+    args.chunks = parse_chunks(args.chunks)
+
     if args.footprint1 is not None:
         args.footprint1 = loads(args.footprint1)
 
@@ -7,9 +7,14 @@ import rasterio.enums
 def main():
     resampling_methods = [method.name for method in rasterio.enums.Resampling]
 
-    parser = argparse.ArgumentParser(description="Generate co-locations between a specified product and a mission. Exit codes: 20 = no coloc found. 0 = OK. 1 = unknown error.")
+    parser = argparse.ArgumentParser(description="Generate co-locations between a specified product and a mission. Exit codes: 20 = no coloc found. 0 = OK. 1 = unknown error. In batch mode (several products), the exit code is 1 if a product failed, else 0 if a co-location has been found, else 20.")
 
-    parser.add_argument("--product1-id", type=str, help="Path of the first product.")
+    parser.add_argument("--product1-id", type=str, nargs='+', help="Path of the first product. Several paths enable batch mode.")
+    parser.add_argument("--product1-list", type=str, nargs='?',
+                        help="Txt file that contains paths of first products (one per line). Enables batch mode.")
+    parser.add_argument("--summary-file", type=str, nargs='?',
+                        help="Csv summary of the batch mode (status of each product). Default is "
+                             "coloc_batch_summary.csv in the destination folder.")
     parser.add_argument("--destination-folder", default='/tmp', nargs='?', type=str, help="Folder path for the output.")
     parser.add_argument("--delta-time", default=30, nargs='?', type=int,
                         help="Maximum time in minutes between two product acquisitions.")
@@ -35,6 +40,30 @@ def main():
                         help="Name of the co-location product to be created.")
     parser.add_argument("--resampling-method", type=str, default="nearest",
                         choices=resampling_methods)
+    parser.add_argument("--resampler-cache-dir", type=str, default=None,
+                        help="Folder where swath resampling operators are stored and reused.")
+    parser.add_argument("--executor", type=str, default="serial", choices=["serial", "threads", "processes"],
+                        help="How comparison products are opened and their intersections verified.")
+    parser.add_argument("--max-workers", type=int, default=None,
+                        help="Maximum number of workers of the executor.")
+    parser.add_argument("--encoding-policy", type=str, default=None, choices=["none", "lossless", "float32", "packed"],
+                        help="Encoding of the co-location products. Default is the `output_encoding` section of the "
+                             "configuration, else 'none' (xarray defaults).")
+    parser.add_argument("--compression", type=str, default=None, choices=["none", "zlib", "zstd"],
+                        help="Compression of the co-location products. Default is given by the encoding policy.")
+    parser.add_argument("--complevel", type=int, default=None, help="Compression level.")
+    parser.add_argument("--netcdf-engine", type=str, default=None, choices=["netcdf4", "h5netcdf"],
+                        help="Engine used to write the co-location products.")
+    parser.add_argument("--chunks", type=str, nargs='+', default=None,
+                        help="Chunk sizes of the co-location products by dimension (ex: y=256 x=256).")
+    parser.add_argument("--campaign-store", type=str, default=None,
+                        help="NetCDF4 file (or Zarr store ending with .zarr) where co-location products are added as "
+                             "groups, instead of one file per pair.")
+    parser.add_argument("--output-mode", type=str, default="grid", choices=["grid", "matchups"],
+                        help="Write the co-location products as 2D grids of the common zone, or only the co-located "
+                             "pixels as 1D tables of matchups.")
+    parser.add_argument("--matchup-format", type=str, default="netcdf", choices=["netcdf", "parquet"],
+                        help="Format of the matchup files (with --output-mode matchups).")
     parser.add_argument("--config", type=str, help="Configuration file to use instead of the "
                                                    "default one.")
     parser.add_argument("--debug", action="store_true", default=False)
@@ -72,8 +101,18 @@ def main():
     logger.info(f"The script is executed from {__file__}")
 
     # Check for missing required arguments
-    if not args.product1_id or not args.mission_name:
-        parser.error("product1-id and mission-name are required aprguments.")
+    if not (args.product1_id or args.product1_list) or not args.mission_name:
+        parser.error("product1-id (or product1-list) and mission-name are required aprguments.")
+
+    from coloc_sat.batch_coloc import read_product_ids, coloc_batch
+    product1_ids = read_product_ids((args.product1_id or []) +
+                                    (read_product_ids(args.product1_list) if args.product1_list else []))
+    summary_path = args.summary_file
+    del args.product1_list
+    del args.summary_file
+
+    from coloc_sat.encoding import parse_chunks
+    args.chunks = parse_chunks(args.chunks)
 
     # rename mission_name by ds_name in the args because it is the argument used in GenerateColoc
     args.ds_name = args.mission_name
@@ -87,8 +126,20 @@ def main():
 
     logger.warning("WARNING : product colocation has only been tested on _ll_gd SAR products.")
 
-    generator = GenerateColoc(**vars(args))
-    status = generator.save_results()
+    if len(product1_ids) == 1:
+        args.product1_id = product1_ids[0]
+        generator = GenerateColoc(**vars(args))
+        status = generator.save_results()
+    else:
+        del args.product1_id
+        rows = coloc_batch(product1_ids, summary_path=summary_path, **vars(args))
+        statuses = [row["status"] for row in rows]
+        if 1 in statuses:
+            status = 1
+        elif 0 in statuses:
+            status = 0
+        else:
+            status = 20
 
     logger.info("Coloc python program successfully ended")
     sys.exit(status)
@@ -53,20 +53,124 @@ def main():
     parser.add_argument(
         "--resampling-method", type=str, default="nearest", choices=resampling_methods
     )
+    parser.add_argument(
+        "--resampler-cache-dir",
+        type=str,
+        default=None,
+        help="Folder where swath resampling operators are stored and reused.",
+    )
+    parser.add_argument(
+        "--group-size",
+        type=int,
+        default=50,
+        help="Maximum number of rows sharing products co-located in the same process (their products are opened once).",
+    )
+    parser.add_argument(
+        "--start-date",
+        type=str,
+        default=None,
+        help="Only rows whose reference product stops after this date are read (ex: 2023-01-01).",
+    )
+    parser.add_argument(
+        "--stop-date",
+        type=str,
+        default=None,
+        help="Only rows whose reference product starts before this date are read (ex: 2023-12-31).",
+    )
+    parser.add_argument(
+        "--ref-dataset-ids",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Only rows with these 'ref_dataset_id' values are read.",
+    )
+    parser.add_argument(
+        "--match-dataset-ids",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Only rows with these 'match_dataset_id' values are read.",
+    )
+    parser.add_argument(
+        "--granules",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Only rows with these 'ref_granule' or 'match_granule' values are read.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=65536,
+        help="Number of rows of the parquet file read and co-located at once.",
+    )
+    parser.add_argument(
+        "--shard-index",
+        type=int,
+        default=None,
+        help="Index of the shard to run, in [0, shard-count). Rows are shared between the shards by estimated cost; "
+        "all the shards must be run with the same arguments (ex: one shard by job of an array job).",
+    )
+    parser.add_argument(
+        "--shard-count",
+        type=int,
+        default=None,
+        help="Number of shards.",
+    )
+    parser.add_argument(
+        "--results-folder",
+        type=str,
+        default=None,
+        help="Folder of the results table of the shard (merged with Coloc_merge_parquet_shards). Default is the "
+        "destination folder, or the folder of the parquet file.",
+    )
     parser.add_argument(
         "--config",
         type=str,
         help="Configuration file to use instead of the " "default one.",
     )
+    parser.add_argument(
+        "--executor",
+        type=str,
+        default=None,
+        choices=["serial", "processes", "dask-local", "dask-jobqueue"],
+        help="Execution backend: current process, local process pool, dask LocalCluster, or dask-jobqueue cluster "
+        "described by the `dask_jobqueue` section of the configuration. Default is serial.",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=0,
+        help="Number of times a failed task is run again.",
+    )
+    parser.add_argument(
+        "--task-rows",
+        type=int,
+        default=None,
+        help="Maximum number of rows of a task: groups of rows are packed in tasks to cut the scheduling overhead. "
+        "Default is one group per task.",
+    )
+    parser.add_argument(
+        "--task-cost",
+        type=float,
+        default=None,
+        help="Maximum estimated cost of a task (products to open and intersection area).",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=None,
+        help="Maximum number of tasks submitted and not yet completed. Default is twice the number of workers.",
+    )
     parser.add_argument(
         "--parallel",
         action="store_true",
-        help="Enable parallel processing on dask LocalCluster",
+        help="Enable parallel processing on dask LocalCluster (same as --executor dask-local)",
     )
     parser.add_argument(
         "--parallel-datarmor",
         action="store_true",
-        help="Enable parallel processing on datarmor",
+        help="Enable parallel processing on datarmor (same as --executor dask-jobqueue)",
     )
     parser.add_argument(
         "--n-workers", type=int, help="Number of worker to use.", default=1
@@ -74,8 +178,9 @@ def main():
     parser.add_argument(
         "--memory",
         type=int,
-        help="Memory to use in GB (useful only in datarmor mode)",
-        default=1,
+        help="Memory of a worker in GB (dask executors), if not given by the configuration. Default is dask's "
+        "automatic limit with dask-local, 2GB with dask-jobqueue.",
+        default=None,
     )
 
     parser.add_argument("--debug", action="store_true", default=False)
@@ -0,0 +1,46 @@
+import argparse
+import sys
+import logging
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Consolidate a campaign store once all the workers have written their co-location products: "
+        "metadata of a zarr store are consolidated, a NetCDF4 file can be repacked to reclaim the space of its "
+        "replaced groups."
+    )
+
+    parser.add_argument(
+        "--campaign-store",
+        type=str,
+        required=True,
+        help="Path of the campaign store (NetCDF4 file, or Zarr store if it ends with .zarr).",
+    )
+    parser.add_argument(
+        "--repack",
+        action="store_true",
+        default=False,
+        help="Repack a NetCDF4 campaign store with h5repack, so that the space of the replaced groups is reclaimed.",
+    )
+    parser.add_argument("--debug", action="store_true", default=False)
+    parser.add_argument("-v", "--version", action="store_true", help="Print version")
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format="%(asctime)s [%(levelname)s]: %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+    from coloc_sat.version import __version__
+
+    if args.version:
+        print(__version__)
+        sys.exit(0)
+
+    from coloc_sat.campaign_store import CampaignStore
+
+    with CampaignStore(args.campaign_store) as store:
+        store.consolidate(repack=args.repack)
+    sys.exit(0)
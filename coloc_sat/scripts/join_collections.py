@@ -0,0 +1,135 @@
+import argparse
+import sys
+import logging
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compute the pairs of products of 2 datasets that can be co-located in a time range, from the "
+        "product catalog. The pairs are written as a parquet file usable by Coloc_from_parquet."
+    )
+
+    parser.add_argument(
+        "--config",
+        type=str,
+        required=True,
+        help="Configuration file giving the catalog location (`catalog` key) and the datasets (`dataset_name_1`, "
+        "`dataset_name_2`).",
+    )
+    parser.add_argument(
+        "--catalog",
+        type=str,
+        default=None,
+        help="Path of the catalog database. Overrides the `catalog` key of the configuration.",
+    )
+    parser.add_argument(
+        "--ds-name-1",
+        type=str,
+        default=None,
+        choices=["S1", "RS2", "RCM", "HY2", "SMOS", "SMAP", "WS"],
+        help="Reference dataset. Overrides the `dataset_name_1` key of the configuration.",
+    )
+    parser.add_argument(
+        "--ds-name-2",
+        type=str,
+        default=None,
+        choices=["S1", "RS2", "RCM", "HY2", "SMOS", "SMAP", "WS"],
+        help="Matched dataset. Overrides the `dataset_name_2` key of the configuration.",
+    )
+    parser.add_argument(
+        "--level-1",
+        type=int,
+        default=None,
+        choices=[1, 2],
+        help="Product level of the reference dataset (SAR datasets only).",
+    )
+    parser.add_argument(
+        "--level-2",
+        type=int,
+        default=None,
+        choices=[1, 2],
+        help="Product level of the matched dataset (SAR datasets only).",
+    )
+    parser.add_argument(
+        "--start-date",
+        type=str,
+        required=True,
+        help="Start of the time range of the reference products (ex: 2023-01-01).",
+    )
+    parser.add_argument(
+        "--stop-date",
+        type=str,
+        required=True,
+        help="Stop of the time range of the reference products (ex: 2023-12-31).",
+    )
+    parser.add_argument(
+        "--delta-time",
+        default=30,
+        type=int,
+        help="Maximum time in minutes between two product acquisitions.",
+    )
+    parser.add_argument(
+        "--minimal-area",
+        default="1600km2",
+        type=str,
+        help="Minimal intersection area in square kilometers.",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        required=True,
+        help="Path of the parquet file of pairs.",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help="Number of reference products joined at once.",
+    )
+    parser.add_argument("--debug", action="store_true", default=False)
+    parser.add_argument("-v", "--version", action="store_true", help="Print version")
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format="%(asctime)s [%(levelname)s]: %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    logger = logging.getLogger(__name__)
+
+    from coloc_sat.version import __version__
+
+    if args.version:
+        print(__version__)
+        sys.exit(0)
+
+    from coloc_sat.tools import set_config, load_config
+    from coloc_sat.collection_join import coloc_collections, JOIN_CHUNK_SIZE
+
+    set_config(args.config)
+    conf = load_config()
+    ds_name_1 = args.ds_name_1 or conf.get("dataset_name_1", None)
+    ds_name_2 = args.ds_name_2 or conf.get("dataset_name_2", None)
+    if (ds_name_1 is None) or (ds_name_2 is None):
+        parser.error(
+            "Datasets must be given (--ds-name-1 / --ds-name-2 or `dataset_name_1` / `dataset_name_2` keys of the "
+            "configuration)."
+        )
+
+    pairs = coloc_collections(
+        ds_name_1,
+        ds_name_2,
+        args.start_date,
+        args.stop_date,
+        output=args.output,
+        delta_time=args.delta_time,
+        minimal_area=args.minimal_area,
+        level_1=args.level_1,
+        level_2=args.level_2,
+        catalog_path=args.catalog,
+        chunk_size=args.chunk_size or JOIN_CHUNK_SIZE,
+    )
+
+    logger.info(f"{len(pairs)} pairs of {ds_name_1} and {ds_name_2} products written in {args.output}")
+    sys.exit(0)
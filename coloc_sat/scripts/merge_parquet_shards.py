@@ -0,0 +1,50 @@
+import argparse
+import sys
+import logging
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Merge the results tables written by the shards of Coloc_from_parquet (--shard-index / "
+        "--shard-count), and check that every shard is complete."
+    )
+
+    parser.add_argument(
+        "--results-folder",
+        type=str,
+        required=True,
+        help="Folder of the results tables of the shards.",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Path of the merged csv table. Default is coloc_parquet_results.csv in the results folder.",
+    )
+    parser.add_argument("--debug", action="store_true", default=False)
+    parser.add_argument("-v", "--version", action="store_true", help="Print version")
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format="%(asctime)s [%(levelname)s]: %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    logger = logging.getLogger(__name__)
+
+    from coloc_sat.version import __version__
+
+    if args.version:
+        print(__version__)
+        sys.exit(0)
+
+    from coloc_sat.sharding import merge_shard_results
+
+    try:
+        _, missing = merge_shard_results(args.results_folder, args.output)
+    except FileNotFoundError as e:
+        logger.error(e)
+        sys.exit(1)
+    # a non zero exit status lets the job scheduler know that shards must be run again
+    sys.exit(1 if missing else 0)
@@ -0,0 +1,257 @@
+import csv
+import glob
+import logging
+import os
+import re
+import zlib
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Estimated cost of co-locating an intersection of this area (square kilometers), relatively to the cost of opening
+# a product
+COST_AREA_KM2 = 10000
+
+SHARD_RESULTS_FIELDS = [
+    "shard_index",
+    "ref_granule",
+    "match_granule",
+    "destination_folder",
+    "status",
+]
+_SHARD_RESULTS_PATTERN = re.compile(r"coloc_parquet_shard_(\d+)_of_(\d+)\.csv(\.partial)?$")
+
+
+def estimate_group_costs(prq, groups, areas=None):
+    """
+    Estimate the cost of running groups of rows of a parquet file (see
+    `coloc_sat.parquet_coloc.group_parquet_rows`): number of products opened by the group (distinct granules) plus
+    the intersection area of its rows, counted in `COST_AREA_KM2` units (the number of co-located pixels grows with
+    it).
+
+    Parameters
+    ----------
+    prq: pandas.DataFrame
+        Rows of the parquet file
+    groups: list[numpy.ndarray]
+        Positions of the rows of each group
+    areas: numpy.ndarray | None
+        Intersection area (square kilometers) of each row. Not counted if None.
+
+    Returns
+    -------
+    numpy.ndarray
+        Cost of each group
+    """
+    ref_granules = prq["ref_granule"].to_numpy()
+    match_granules = prq["match_granule"].to_numpy()
+    costs = np.zeros(len(groups), dtype="float64")
+    for k, positions in enumerate(groups):
+        costs[k] = len(set(ref_granules[positions])) + len(
+            set(match_granules[positions])
+        )
+        if areas is not None:
+            costs[k] += np.nansum(areas[positions]) / COST_AREA_KM2
+    return costs
+
+
+class ShardSelector:
+    """
+    Deterministic, cost balanced assignment of groups of rows to independent shards (array jobs): groups are
+    assigned by decreasing cost to the least loaded shard (ties broken by group position, then by shard index).
+    Every shard computes the same assignment from the same rows, so that no coordination is needed; the loads are
+    kept from a batch of rows to the next one.
+
+    Parameters
+    ----------
+    shard_index: int
+        Index of this shard, in [0, `shard_count`)
+    shard_count: int
+        Number of shards
+    """
+
+    def __init__(self, shard_index, shard_count):
+        if shard_count < 1:
+            raise ValueError(f"shard_count must be at least 1, not {shard_count}")
+        if not 0 <= shard_index < shard_count:
+            raise ValueError(
+                f"shard_index must be in [0, {shard_count}), not {shard_index}"
+            )
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.loads = np.zeros(shard_count, dtype="float64")
+
+    def select(self, costs):
+        """
+        Assign groups to the shards, and select the groups of this shard.
+
+        Parameters
+        ----------
+        costs: numpy.ndarray
+            Estimated cost of each group (see `estimate_group_costs`)
+
+        Returns
+        -------
+        numpy.ndarray
+            True for the groups of this shard
+        """
+        costs = np.asarray(costs, dtype="float64")
+        shards = np.empty(len(costs), dtype="int64")
+        # stable sort: equal costs keep the order of the groups
+        for k in np.argsort(-costs, kind="stable"):
+            shard = int(np.argmin(self.loads))
+            shards[k] = shard
+            self.loads[shard] += costs[k]
+        selected = shards == self.shard_index
+        logger.info(
+            f"Shard {self.shard_index}/{self.shard_count}: {selected.sum()} of {len(costs)} groups, "
+            f"estimated cost {costs[selected].sum():.1f} of {costs.sum():.1f}"
+        )
+        return selected
+
+    def select_keys(self, keys):
+        """
+        Select the items without cost of this shard (ex: discarded rows), by a stable hash of their key, so that each
+        item is assigned to a single shard without changing the loads.
+
+        Parameters
+        ----------
+        keys: list[str]
+            Key of each item
+
+        Returns
+        -------
+        numpy.ndarray
+            True for the items of this shard
+        """
+        return np.array(
+            [zlib.crc32(key.encode()) % self.shard_count == self.shard_index for key in keys],
+            dtype=bool,
+        )
+
+
+def shard_results_path(results_folder, shard_index, shard_count):
+    """
+    Path of the results table of a shard
+
+    Returns
+    -------
+    str
+        `coloc_parquet_shard_<index>_of_<count>.csv` in `results_folder`
+    """
+    return os.path.join(
+        results_folder, f"coloc_parquet_shard_{shard_index:05d}_of_{shard_count:05d}.csv"
+    )
+
+
+def append_shard_results(path, rows):
+    """
+    Append rows to the results table of a shard being written (`.partial` suffix until `close_shard_results`).
+
+    Parameters
+    ----------
+    path: str
+        Path of the results table (see `shard_results_path`)
+    rows: list[dict]
+        Results of co-locations (columns of `SHARD_RESULTS_FIELDS`)
+    """
+    partial = path + ".partial"
+    new_file = not os.path.exists(partial)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(partial, "a", newline="") as results_file:
+        writer = csv.DictWriter(
+            results_file, fieldnames=SHARD_RESULTS_FIELDS, extrasaction="ignore"
+        )
+        if new_file:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def open_shard_results(path):
+    """
+    Start the results table of a shard: results of a previous run of the shard are removed.
+
+    Parameters
+    ----------
+    path: str
+        Path of the results table (see `shard_results_path`)
+    """
+    for stale in [path, path + ".partial"]:
+        if os.path.exists(stale):
+            os.remove(stale)
+    append_shard_results(path, [])
+
+
+def close_shard_results(path):
+    """
+    Mark the results table of a shard as complete.
+
+    Parameters
+    ----------
+    path: str
+        Path of the results table (see `shard_results_path`)
+    """
+    os.replace(path + ".partial", path)
+
+
+def merge_shard_results(results_folder, output=None):
+    """
+    Merge the results tables of the shards of a parquet co-location (see
+    `coloc_sat.parquet_coloc.coloc_from_parquet`), and check that every shard is complete.
+
+    Parameters
+    ----------
+    results_folder: str
+        Folder of the results tables
+    output: str | None
+        Path of the merged csv table. Default is `coloc_parquet_results.csv` in `results_folder`.
+
+    Returns
+    -------
+    pandas.DataFrame, list[int]
+        Merged results, and indexes of the missing (or incomplete) shards
+
+    Raises
+    ------
+    FileNotFoundError
+        If there is no results table of shard, complete or not, in `results_folder`
+    """
+    tables = {}
+    shard_counts = set()
+    # the tables being written also give the shard count: shards still running (or killed) are reported as missing
+    for path in glob.glob(os.path.join(results_folder, "coloc_parquet_shard_*_of_*.csv*")):
+        match = _SHARD_RESULTS_PATTERN.search(os.path.basename(path))
+        if match is None:
+            continue
+        shard_index, shard_count = int(match.group(1)), int(match.group(2))
+        shard_counts.add(shard_count)
+        if match.group(3) is None:
+            tables[shard_index] = path
+    if not shard_counts:
+        raise FileNotFoundError(f"No results table of shard in {results_folder}")
+    if len(shard_counts) > 1:
+        raise ValueError(
+            f"Results of runs with different shard counts {sorted(shard_counts)} in {results_folder}"
+        )
+    shard_count = shard_counts.pop()
+    missing = [index for index in range(shard_count) if index not in tables]
+    merged = pd.concat(
+        [pd.read_csv(tables[index], dtype={"status": "Int64"}) for index in sorted(tables)]
+        or [pd.DataFrame(columns=SHARD_RESULTS_FIELDS)],
+        ignore_index=True,
+    )
+    if output is None:
+        output = os.path.join(results_folder, "coloc_parquet_results.csv")
+    merged.to_csv(output, index=False)
+    statuses = {
+        str(status): int(count)
+        for status, count in merged["status"].value_counts(dropna=False).items()
+    }
+    logger.info(
+        f"{len(tables)} of {shard_count} shards merged in {output}: {len(merged)} rows, statuses {statuses}"
+    )
+    if missing:
+        logger.warning(f"Missing or incomplete shards: {missing}")
+    return merged, missing
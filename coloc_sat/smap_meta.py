@@ -3,11 +3,18 @@ import numpy as np
 from datetime import datetime
 import xarray as xr
 
-from .tools import open_nc, convert_mingmt, correct_dataset, common_var_names
+from .tools import (
+    open_nc,
+    convert_mingmt,
+    correct_dataset,
+    common_var_names,
+    minutes_to_datetime,
+)
+from .roi import read_region, restrict_to_time_window
 
 
 class GetSmapMeta:
-    def __init__(self, product_path, product_generation=False, footprint=None):
+    def __init__(self, product_path, product_generation=False, footprint=None, roi=None):
         self.product_path = product_path
         self.product_name = os.path.basename(self.product_path)
         self.product_generation = product_generation
@@ -16,14 +23,74 @@ class GetSmapMeta:
         self._latitude_name = "lat"
         if footprint is not None:
             self._footprint = footprint
-        self._dataset = open_nc(product_path).load()
-        self.dataset = self.add_source_reference_attribute(ds=self.dataset)
-        self.dataset = correct_dataset(self.dataset, self.longitude_name)
-        self.dataset = convert_mingmt(self)
+        self._dataset = None
+        self._start_date = None
+        self._stop_date = None
+        # region of interest (see `coloc_sat.roi`): only the grid cells of this region are read
+        self.roi = roi
+        # without product generation, the dataset is only opened when the intersection is verified
+        if self.product_generation:
+            self._dataset = self._open_dataset()
+
+    def _open_dataset(self):
+        """
+        Open the acquisition dataset. When a co-location product is generated, the whole dataset is loaded in memory.
+        Else, only the variables needed to verify an intersection are read. With a region of interest, only its grid
+        cells are read.
+
+        Returns
+        -------
+        xarray.Dataset
+            Acquisition dataset
+        """
+        ds = open_nc(self.product_path)
+        if self.roi is not None:
+            ds = read_region(ds, self.longitude_name, self.latitude_name, self.roi)
+        if self.product_generation:
+            ds = ds.load()
+        else:
+            ds = ds[
+                [self.minute_name]
+                + [
+                    var
+                    for var in self.necessary_vars_for_intersection
+                    if var != self.time_name
+                ]
+            ].load()
+        # `self.dataset` is set step by step because `convert_mingmt` reads it
+        self._dataset = self.add_source_reference_attribute(ds=ds)
+        if self.roi is None:
+            # longitudes of the region of interest are already in [-180, 180]
+            self._dataset = correct_dataset(self._dataset, self.longitude_name)
+        self._dataset = convert_mingmt(self)
         # Modify orbit values by ascending and descending to be more significant
-        self.dataset[self.orbit_segment_name] = xr.where(
-            self.dataset[self.orbit_segment_name] == 0, "ascending", "descending"
+        self._dataset[self.orbit_segment_name] = xr.where(
+            self._dataset[self.orbit_segment_name] == 0, "ascending", "descending"
         )
+        if self.roi is not None:
+            self._dataset = restrict_to_time_window(
+                self._dataset,
+                self.time_name,
+                self.longitude_name,
+                self.latitude_name,
+                self.roi,
+            )
+        return self._dataset
+
+    def _read_time_bounds(self):
+        """
+        Fill start and stop dates, only reading the minute variable if the dataset hasn't been opened yet (or only
+        covers a region of interest).
+        """
+        if (self._dataset is not None) and (self.roi is None):
+            times = self._dataset[self.time_name].values
+        else:
+            times = minutes_to_datetime(
+                self.day_date, open_nc(self.product_path)[self.minute_name].values
+            )
+        unique_times = np.unique(times)
+        self._start_date = min(unique_times)
+        self._stop_date = max(unique_times)
 
     @property
     def footprint(self):
@@ -76,6 +143,8 @@ class GetSmapMeta:
         xarray.Dataset
             Acquisition dataset
         """
+        if self._dataset is None:
+            self._dataset = self._open_dataset()
         return self._dataset
 
     @dataset.setter
@@ -113,7 +182,9 @@ class GetSmapMeta:
         numpy.datetime64
             Start time
         """
-        return min(np.unique(self.dataset[self.time_name]))
+        if self._start_date is None:
+            self._read_time_bounds()
+        return self._start_date
 
     @property
     def stop_date(self):
@@ -125,7 +196,9 @@ class GetSmapMeta:
         numpy.datetime64
             Stop time
         """
-        return max(np.unique(self.dataset[self.time_name]))
+        if self._stop_date is None:
+            self._read_time_bounds()
+        return self._stop_date
 
     @property
     def orbit_segment_name(self):
@@ -234,6 +307,24 @@ class GetSmapMeta:
         """
         return [self.orbit_segment_name, self.time_name]
 
+    @property
+    def necessary_vars_for_intersection(self):
+        """
+        Get variables needed to verify an intersection (the only ones read when no co-location product is generated)
+
+        Returns
+        -------
+        list[str]
+            Variables needed to verify an intersection
+        """
+        return [
+            self.longitude_name,
+            self.latitude_name,
+            self.time_name,
+            self.orbit_segment_name,
+            self.wind_name,
+        ]
+
     @property
     def necessary_attrs_in_coloc_product(self):
         """
@@ -1,4 +1,5 @@
 from .tools import open_smos_file, correct_dataset, common_var_names
+from .roi import read_region, restrict_to_time_window
 import os
 import numpy as np
 
@@ -8,7 +9,7 @@ def extract_wind_speed(smos_dataset):
 
 
 class GetSmosMeta:
-    def __init__(self, product_path, product_generation=False, footprint=None):
+    def __init__(self, product_path, product_generation=False, footprint=None, roi=None):
         self.product_path = product_path
         self.product_name = os.path.basename(self.product_path)
         self.product_generation = product_generation
@@ -17,8 +18,51 @@ class GetSmosMeta:
         self._latitude_name = "lat"
         if footprint is not None:
             self._footprint = footprint
-        self._dataset = open_smos_file(product_path).squeeze().load()
-        self.dataset = correct_dataset(self.dataset, self.longitude_name)
+        self._dataset = None
+        self._start_date = None
+        self._stop_date = None
+        # region of interest (see `coloc_sat.roi`): only the grid cells of this region are read
+        self.roi = roi
+        # without product generation, the dataset is only opened when the intersection is verified
+        if self.product_generation:
+            self._dataset = self._open_dataset()
+
+    def _open_dataset(self):
+        """
+        Open the acquisition dataset. When a co-location product is generated, the whole dataset is loaded in memory.
+        Else, only the variables needed to verify an intersection are read. With a region of interest, only its grid
+        cells are read.
+
+        Returns
+        -------
+        xarray.Dataset
+            Acquisition dataset
+        """
+        ds = open_smos_file(self.product_path)
+        if self.roi is not None:
+            ds = read_region(ds, self.longitude_name, self.latitude_name, self.roi)
+        if self.product_generation:
+            ds = ds.squeeze().load()
+        else:
+            ds = ds[self.necessary_vars_for_intersection].squeeze().load()
+        if self.roi is None:
+            return correct_dataset(ds, self.longitude_name)
+        return restrict_to_time_window(
+            ds, self.time_name, self.longitude_name, self.latitude_name, self.roi
+        )
+
+    def _read_time_bounds(self):
+        """
+        Fill start and stop dates, only reading the time variable if the dataset hasn't been opened yet (or only
+        covers a region of interest).
+        """
+        if (self._dataset is not None) and (self.roi is None):
+            times = self._dataset[self.time_name].values
+        else:
+            times = open_smos_file(self.product_path)[self.time_name].values
+        unique_times = np.unique(times)
+        self._start_date = min(unique_times)
+        self._stop_date = max(unique_times)
 
     @property
     def footprint(self):
@@ -35,7 +79,9 @@ class GetSmosMeta:
         numpy.datetime64
             Start time
         """
-        return min(np.unique(self.dataset[self.time_name]))
+        if self._start_date is None:
+            self._read_time_bounds()
+        return self._start_date
 
     @property
     def stop_date(self):
@@ -47,7 +93,9 @@ class GetSmosMeta:
         numpy.datetime64
             Stop time
         """
-        return max(np.unique(self.dataset[self.time_name]))
+        if self._stop_date is None:
+            self._read_time_bounds()
+        return self._stop_date
 
     @property
     def longitude_name(self):
@@ -129,6 +177,23 @@ class GetSmosMeta:
         """
         return [self.time_name]
 
+    @property
+    def necessary_vars_for_intersection(self):
+        """
+        Get variables needed to verify an intersection (the only ones read when no co-location product is generated)
+
+        Returns
+        -------
+        list[str]
+            Variables needed to verify an intersection
+        """
+        return [
+            self.longitude_name,
+            self.latitude_name,
+            self.time_name,
+            self.wind_name,
+        ]
+
     @property
     def necessary_attrs_in_coloc_product(self):
         """
@@ -195,6 +260,8 @@ class GetSmosMeta:
         xarray.Dataset
             Acquisition dataset
         """
+        if self._dataset is None:
+            self._dataset = self._open_dataset()
         return self._dataset
 
     @dataset.setter
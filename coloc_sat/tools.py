@@ -2,14 +2,17 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+import copy
 import os
 import glob
 from pathlib import Path
 
 import xarray as xr
 import yaml
+import shapely
 from shapely import wkt
 from shapely.geometry import Polygon
+from shapely.geometry.base import BaseGeometry
 import numpy as np
 import fsspec
 from datetime import datetime, timedelta
@@ -19,7 +22,13 @@ from numba import njit, prange
 from numba.typed import Dict
 from numba.core import types
 
+from .discovery import DEFAULT_TTL, find_template_paths_between, get_directory_cache
+
 param_config = None
+# Parsed configuration files, by path and modification time (loaded for each co-location task)
+_config_cache = {}
+# Mean radius of the Earth in kilometers
+EARTH_RADIUS_KM = 6371.0
 
 
 def get_config_path():
@@ -30,9 +39,13 @@ def get_config_path():
 
 
 def load_config():
-    with open(get_config_path(), "r") as file:
-        config = yaml.safe_load(file)
-    return config
+    path = get_config_path()
+    key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+    if key not in _config_cache:
+        with open(path, "r") as file:
+            _config_cache[key] = yaml.safe_load(file)
+    # copy: callers may modify the returned configuration
+    return copy.deepcopy(_config_cache[key])
 
 def set_config(config_path: str):
     global param_config
@@ -47,7 +60,78 @@ def get_acquisition_root_paths(ds_name):
     return paths_dict[ds_name]
 
 
-def call_meta_class(file, product_generation=False, footprint=None):
+def call_meta_class(
+    file, product_generation=False, footprint=None, use_cache=True, roi=None
+):
+    """
+    Open a product with the meta class of its mission. Opened products are kept in a process-wide cache
+    (see `coloc_sat.meta_cache`), and each call returns a view of the cached object.
+
+    Parameters
+    ----------
+    file: str
+        Path of the product
+    product_generation: bool
+        True if a co-location product must be created
+    footprint: shapely.geometry.Polygon | None
+        Footprint of the product, if known
+    use_cache: bool
+        False to open the product without using the cache
+    roi: dict | None
+        Region of interest (see `coloc_sat.roi.get_region_of_interest`). Only used by global daily grids (SMOS, SMAP
+        and WindSat), that only read its grid cells.
+
+    Returns
+    -------
+    coloc_sat.GetSarMeta | coloc_sat.GetSmosMeta | coloc_sat.GetSmapMeta | coloc_sat.GetHy2Meta |
+    coloc_sat.GetEra5Meta | coloc_sat.GetWindsatMeta
+        Meta object
+    """
+    if not product_reads_roi(file):
+        # the region of interest doesn't change how other products are opened: one cached object for all of them
+        roi = None
+    if use_cache:
+        from .meta_cache import configured_max_bytes, get_meta_cache
+
+        meta_cache = get_meta_cache()
+        meta_cache.set_max_bytes(configured_max_bytes())
+        return meta_cache.get_or_open(
+            file,
+            open_meta_class,
+            product_generation=product_generation,
+            footprint=footprint,
+            roi=roi,
+        )
+    return open_meta_class(
+        file, product_generation=product_generation, footprint=footprint, roi=roi
+    )
+
+
+def product_reads_roi(file):
+    """
+    Check if the meta class of a product only reads the region of interest given at its opening (global daily grids:
+    SMOS, SMAP and WindSat).
+
+    Parameters
+    ----------
+    file: str
+        Path of the product
+
+    Returns
+    -------
+    bool
+        True if the product is read in the region of interest
+    """
+    basename = os.path.basename(file).upper()
+    parts = basename.split("_")
+    return (
+        basename.startswith("SM_")
+        or basename.startswith("WSAT_")
+        or ((len(parts) > 1) and (parts[1] == "SMAP"))
+    )
+
+
+def open_meta_class(file, product_generation=False, footprint=None, roi=None):
     sar_satellites = ["RS2", "S1A", "S1B", "RCM1", "RCM2", "RCM3"]
     basename = os.path.basename(file).upper()
     if basename.split("_")[0].split("-")[0] in sar_satellites:
@@ -60,19 +144,19 @@ def call_meta_class(file, product_generation=False, footprint=None):
         from .smos_meta import GetSmosMeta
 
         return GetSmosMeta(
-            file, product_generation=product_generation, footprint=footprint
+            file, product_generation=product_generation, footprint=footprint, roi=roi
         )
     elif basename.startswith("WSAT_"):
         from .windsat_meta import GetWindSatMeta
 
         return GetWindSatMeta(
-            file, product_generation=product_generation, footprint=footprint
+            file, product_generation=product_generation, footprint=footprint, roi=roi
         )
     elif basename.split("_")[1] == "SMAP":
         from .smap_meta import GetSmapMeta
 
         return GetSmapMeta(
-            file, product_generation=product_generation, footprint=footprint
+            file, product_generation=product_generation, footprint=footprint, roi=roi
         )
     elif basename.split("_")[3] == "HY":
         from .hy2_meta import GetHy2Meta
@@ -132,9 +216,13 @@ def get_all_comparison_files(
     input_ds=None,
     level=None,
     accuracy="day",
+    footprint=None,
+    minimal_area=None,
 ):
     """
-    Return all existing product for a specific sensor (ex : SMOS, RS2, RCM, S1, HY2, ERA5)
+    Return all existing product for a specific sensor (ex : SMOS, RS2, RCM, S1, HY2, ERA5). If a product catalog is
+    set in the configuration (`catalog` key, see `coloc_sat.catalog`), the research is answered by the catalog
+    instead of scanning the file system.
 
     Parameters
     ----------
@@ -155,6 +243,12 @@ def get_all_comparison_files(
         (default value).
     accuracy: str
         Defines if searched files are found on a day, hour, minute or second accuracy level.
+    footprint: shapely.geometry.base.BaseGeometry | None
+        Footprint of the reference product. When the research is answered by the catalog, products whose footprint
+        doesn't intersect `footprint` are discarded. Ignored otherwise.
+    minimal_area: float | None
+        Minimal intersection area (square kilometers). When the research is answered by the catalog and `footprint`
+        is given, products whose footprint intersects `footprint` on a smaller area are discarded. Ignored otherwise.
 
     Returns
     -------
@@ -239,6 +333,46 @@ def get_all_comparison_files(
                     final_files.append(file)
             return final_files
 
+    catalog_path = load_config().get("catalog", None)
+    if (
+        (catalog_path is not None)
+        and (input_ds is None)
+        and (ds_name != "ERA5")
+        and (start_date is not None)
+        and (stop_date is not None)
+    ):
+        from .catalog import ProductCatalog
+
+        with ProductCatalog(catalog_path) as catalog:
+            records = catalog.query_records(
+                ds_name,
+                start_date,
+                stop_date,
+                level=level,
+                bbox=footprint.bounds if footprint is not None else None,
+            )
+        if (
+            (footprint is not None)
+            and (-180 <= footprint.bounds[0])
+            and (footprint.bounds[2] <= 180)
+        ):
+            from .intersection_tools import join_footprints
+
+            _, hits, _, _ = join_footprints(
+                [footprint], [rec["footprint"] for rec in records], minimal_area
+            )
+            hits = set(hits)
+            # products without footprint (global daily grids, ...) are always kept
+            records = [
+                rec
+                for position, rec in enumerate(records)
+                if (rec["footprint"] is None) or (position in hits)
+            ]
+        files = [rec["path"] for rec in records]
+        if ds_name == "SMOS":
+            files = get_last_generation_files(files)
+        return files
+
     map_levels = {1: "L1", 2: "L2"}
     if accuracy == "day":
         match_date_patt = "%Y%m%d"
@@ -256,69 +390,49 @@ def get_all_comparison_files(
     elif (ds_name == "S1") or (ds_name == "RS2") or (ds_name == "RCM"):
         product_levels = list(root_paths.keys())
     files = []
-    schemes = date_schemes(start_date, stop_date, accuracy=accuracy)
+    directory_cache = get_directory_cache()
+    directory_cache.ttl = load_config().get("discovery_cache_ttl", DEFAULT_TTL)
+    schemes = None
+
+    def research_template(root_path):
+        nonlocal schemes
+        if (input_ds is None) and (start_date is not None) and (stop_date is not None):
+            # the directories of each day are walked once, with cached listings, and the times of the files are
+            # compared to the researched time range of the day (no enumeration of the date schemes)
+            return find_template_paths_between(
+                root_path, start_date, stop_date, accuracy, cache=directory_cache
+            )
+        if schemes is None:
+            schemes = date_schemes(start_date, stop_date, accuracy=accuracy)
+        template_files = []
+        for scheme in schemes:
+            date = datetime.strptime(scheme, match_date_patt)
+            parsed_path = insert_date_and_day_of_year(
+                str_expression=root_path,
+                datetime_obj=date,
+                day_of_year=schemes[scheme]["dayOfYear"],
+            )
+            template_files += research_files(parsed_path)
+        return template_files
+
     if ds_name == "SMOS":
         # get all netcdf files which contain the days in schemes
         for root_path in root_paths:
-            for scheme in schemes:
-                date = datetime.strptime(scheme, match_date_patt)
-                parsed_path = insert_date_and_day_of_year(
-                    str_expression=root_path,
-                    datetime_obj=date,
-                    day_of_year=schemes[scheme]["dayOfYear"],
-                )
-                files += research_files(parsed_path)
+            files += research_template(root_path)
         files = get_last_generation_files(files)
     elif ds_name == "HY2":
         # get all netcdf files which contain the days in schemes
         for root_path in root_paths:
-            for scheme in schemes:
-                date = datetime.strptime(scheme, match_date_patt)
-                parsed_path = insert_date_and_day_of_year(
-                    str_expression=root_path,
-                    datetime_obj=date,
-                    day_of_year=schemes[scheme]["dayOfYear"],
-                )
-                files += research_files(parsed_path)
+            files += research_template(root_path)
         if (start_date is not None) and (stop_date is not None):
             # remove files for which hour doesn't correspond to the selected times
-            for f in files.copy():
-                start_hy, stop_hy = extract_start_stop_dates_from_hy(f)
-                if (stop_hy < start_date) or (start_hy > stop_date):
-                    files.remove(f)
-    elif ds_name == "S1":
-        for lvl in product_levels:
-            for root_path in root_paths[lvl]:
-                for scheme in schemes:
-                    date = datetime.strptime(scheme, match_date_patt)
-                    parsed_path = insert_date_and_day_of_year(
-                        str_expression=root_path,
-                        datetime_obj=date,
-                        day_of_year=schemes[scheme]["dayOfYear"],
-                    )
-                    files += research_files(parsed_path)
-    elif ds_name == "RS2":
-        for lvl in product_levels:
-            for root_path in root_paths[lvl]:
-                for scheme in schemes:
-                    date = datetime.strptime(scheme, match_date_patt)
-                    parsed_path = insert_date_and_day_of_year(
-                        str_expression=root_path,
-                        datetime_obj=date,
-                        day_of_year=schemes[scheme]["dayOfYear"],
-                    )
-                    files += research_files(parsed_path)
-    elif ds_name == "RCM":
+            files = filter_files_by_time(
+                files, extract_start_stop_dates_from_hy, start_date, stop_date
+            )
+    elif ds_name in ["S1", "RS2", "RCM"]:
         for lvl in product_levels:
             for root_path in root_paths[lvl]:
-                for scheme in schemes:
-                    date = datetime.strptime(scheme, match_date_patt)
-                    parsed_path = insert_date_and_day_of_year(
-                        str_expression=root_path,
-                        datetime_obj=date,
-                        day_of_year=schemes[scheme]["dayOfYear"],
-                    )
-                    files += research_files(parsed_path)
+                files += research_template(root_path)
     elif ds_name == "ERA5":
         for root_path in root_paths:
             if (start_date is not None) and (stop_date is not None):
@@ -332,32 +446,15 @@ def get_all_comparison_files(
                     .replace("%M", "*")
                     .replace("%S", "*")
                 )
-    elif ds_name == "WS":
-        for root_path in root_paths:
-            for scheme in schemes:
-                date = datetime.strptime(scheme, match_date_patt)
-                parsed_path = insert_date_and_day_of_year(
-                    str_expression=root_path,
-                    datetime_obj=date,
-                    day_of_year=schemes[scheme]["dayOfYear"],
-                )
-                files += research_files(parsed_path)
-    elif ds_name == "SMAP":
+    elif ds_name in ["WS", "SMAP"]:
         for root_path in root_paths:
-            for scheme in schemes:
-                date = datetime.strptime(scheme, match_date_patt)
-                parsed_path = insert_date_and_day_of_year(
-                    str_expression=root_path,
-                    datetime_obj=date,
-                    day_of_year=schemes[scheme]["dayOfYear"],
-                )
-                files += research_files(parsed_path)
+            files += research_template(root_path)
     if (start_date is not None) and (stop_date is not None):
         if ds_name in ["S1", "RS2", "RCM"]:
-            for f in files.copy():
-                start, stop = extract_start_stop_dates_from_sar(f)
-                if (stop < start_date) or (start > stop_date):
-                    files.remove(f)
+            files = filter_files_by_time(
+                files, extract_start_stop_dates_from_sar, start_date, stop_date
+            )
+    logger.debug(f"Directory cache: {directory_cache.info()}")
     return files
 
 
@@ -492,7 +589,7 @@ def date_schemes(start_date, stop_date, accuracy="day"):
 
 
 def extract_start_stop_dates_from_hy(product_path):
-    ds = GetHy2Meta._open_nc(product_path)
+    ds = GetHy2Meta._open_nc(product_path, variables=["time"])
     unique_time = np.unique(ds.time)
     return min(unique_time), max(unique_time)
 
@@ -574,6 +671,63 @@ def extract_start_stop_dates_from_sar(product_path):
     return start, stop
 
 
+def filter_files_by_time(files, extract_dates, start_date, stop_date):
+    """
+    Keep the files whose time range overlaps [`start_date`, `stop_date`]. Dates of all the files are extracted
+    first, then compared in a single vectorized pass.
+
+    Parameters
+    ----------
+    files: list[str]
+        Product paths
+    extract_dates: Callable
+        Function giving the start and stop dates of a product from its path (ex: `extract_start_stop_dates_from_sar`)
+    start_date: numpy.datetime64
+        Start of the time range
+    stop_date: numpy.datetime64
+        Stop of the time range
+
+    Returns
+    -------
+    list[str]
+        Kept files, in the same order
+    """
+    if not files:
+        return files
+    dates = np.array([extract_dates(f) for f in files], dtype="datetime64[ns]")
+    keep = (dates[:, 1] >= np.datetime64(start_date, "ns")) & (
+        dates[:, 0] <= np.datetime64(stop_date, "ns")
+    )
+    return [f for f, kept in zip(files, keep) if kept]
+
+
+def extract_start_stop_dates_from_filename(product_path):
+    """
+    Get the start and stop dates of a product from its filename only, when the filename gives them (SAR and ERA5
+    products).
+
+    Parameters
+    ----------
+    product_path: str
+        path of the product
+
+    Returns
+    -------
+    (np.datetime64, np.datetime64) | None
+        Tuple that contains the start and the stop dates. None if the filename doesn't give them.
+    """
+    sar_satellites = ["RS2", "S1A", "S1B", "RCM1", "RCM2", "RCM3"]
+    basename = os.path.basename(product_path).upper()
+    if basename.split("_")[0].split("-")[0] in sar_satellites:
+        return extract_start_stop_dates_from_sar(product_path)
+    elif basename.startswith("ERA_5"):
+        # hourly model, from 00:00:00 to 23:00:00
+        str_date = basename.split("_")[-1].split(".")[0]
+        return parse_date(str_date + "000000"), parse_date(str_date + "230000")
+    else:
+        return None
+
+
 def call_sar_meta(dataset_id):
     """
     Call the appropriate metadata for a SAR Level 1 product depending on the dataset id.
@@ -737,17 +891,35 @@ def convert_mingmt(meta_acquisition):
         `meta_acquisition.time_name`
     """
     ds = meta_acquisition.dataset
-    input_time = ds[meta_acquisition.minute_name]
-    if (np.dtype(input_time) == np.dtype("float64")) or (
-        np.dtype(input_time) == np.dtype(int)
-    ):
-        input_time = input_time.astype("timedelta64[m]")
-    ds[meta_acquisition.time_name] = (
-        np.array(meta_acquisition.day_date, dtype="datetime64[ns]") + input_time
+    ds[meta_acquisition.time_name] = minutes_to_datetime(
+        meta_acquisition.day_date, ds[meta_acquisition.minute_name]
     )
     return ds.drop_vars([meta_acquisition.minute_name])
 
 
+def minutes_to_datetime(day_date, minutes):
+    """
+    Convert times given in minutes since midnight GMT to the numpy.datetime64 format.
+
+    Parameters
+    ----------
+    day_date: datetime.datetime
+        Day of the acquisition
+    minutes: xarray.DataArray | numpy.ndarray
+        Minutes since midnight GMT (numbers or timedelta)
+
+    Returns
+    -------
+    xarray.DataArray | numpy.ndarray
+        Times
+    """
+    if (np.dtype(minutes.dtype) == np.dtype("float64")) or (
+        np.dtype(minutes.dtype) == np.dtype(int)
+    ):
+        minutes = minutes.astype("timedelta64[m]")
+    return np.array(day_date, dtype="datetime64[ns]") + minutes
+
+
 def extract_name_from_meta_class(obj):
     """
     Extract type of satellite (or name of a model).
@@ -877,55 +1049,113 @@ def point_in_polygon(x, y, polygon):
     return inside
 
 
-@njit(parallel=True)
-def filter_data_polygon(lon, lat, data_vars, polygon):
-    mask = np.zeros(lon.shape, dtype=np.bool_)
-    for i in prange(lon.shape[0]):
-        for j in range(lon.shape[1]):
-            mask[i, j] = point_in_polygon(lon[i, j], lat[i, j], polygon)
+def _polygon_parts(polygon):
+    """
+    Split a polygon given as shapely geometry or exterior coordinates into its polygons.
+    """
+    if not isinstance(polygon, BaseGeometry):
+        polygon = Polygon(np.asarray(polygon))
+    return list(getattr(polygon, "geoms", [polygon]))
 
-    for var in data_vars:
-        data_vars[var] = np.where(mask, data_vars[var], np.nan)
 
-    filtered_indices = np.argwhere(mask)
-    if filtered_indices.size == 0:
-        print("Filtering using polygon left no data.")
-        return data_vars, None, None
+def _longitudes_like_polygon(lon, bounds):
+    """
+    Express longitudes in the convention of a polygon: [0, 360] if it goes beyond 180 (antimeridian crossing),
+    [-360, 0] if it goes below -180, [-180, 180] else.
+    """
+    minx, _, maxx, _ = bounds
+    if maxx > 180:
+        return np.where(lon < 0, lon + 360, lon)
+    if minx < -180:
+        return np.where(lon > 0, lon - 360, lon)
+    if np.nanmax(lon) > 180:
+        return np.where(lon > 180, lon - 360, lon)
+    return lon
+
+
+def polygon_mask(lon, lat, polygon):
+    """
+    Mask of the pixels located in a polygon. Only the pixels of the index window covering the bounding box of each
+    part of the polygon are tested, with shapely vectorized predicates. Points on the boundary are inside.
+
+    Parameters
+    ----------
+    lon: numpy.ndarray
+        2D longitudes
+    lat: numpy.ndarray
+        2D latitudes
+    polygon: shapely.geometry.Polygon | shapely.geometry.MultiPolygon | numpy.ndarray
+        Polygon (a multipolygon can have parts on both sides of the antimeridian, or be expressed in [0, 360]), or
+        coordinates of its exterior
 
-    # Get the minimum and maximum row and column indices
-    min_row = filtered_indices[0, 0]
-    min_col = filtered_indices[0, 1]
-    max_row = filtered_indices[0, 0]
-    max_col = filtered_indices[0, 1]
+    Returns
+    -------
+    numpy.ndarray
+        Boolean mask with the shape of `lon`
+    """
+    mask = np.zeros(lon.shape, dtype=np.bool_)
+    for part in _polygon_parts(polygon):
+        if part.is_empty:
+            continue
+        minx, miny, maxx, maxy = part.bounds
+        part_lon = _longitudes_like_polygon(lon, part.bounds)
+        in_box = (part_lon >= minx) & (part_lon <= maxx) & (lat >= miny) & (lat <= maxy)
+        rows = np.flatnonzero(in_box.any(axis=1))
+        cols = np.flatnonzero(in_box.any(axis=0))
+        if rows.size == 0:
+            continue
+        window = (slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1))
+        candidates = in_box[window]
+        shapely.prepare(part)
+        inside = np.zeros(candidates.shape, dtype=np.bool_)
+        inside[candidates] = shapely.intersects_xy(
+            part, part_lon[window][candidates], lat[window][candidates]
+        )
+        mask[window] |= inside
+    return mask
 
-    for idx in filtered_indices:
-        if idx[0] < min_row:
-            min_row = idx[0]
-        if idx[1] < min_col:
-            min_col = idx[1]
-        if idx[0] > max_row:
-            max_row = idx[0]
-        if idx[1] > max_col:
-            max_col = idx[1]
 
-    # Extract the subarrays from the original lon/lat arrays
-    lon_2d_reduced = lon[min_row : max_row + 1, min_col : max_col + 1]
-    lat_2d_reduced = lat[min_row : max_row + 1, min_col : max_col + 1]
+def filter_data_polygon(lon, lat, data_vars, polygon):
+    """
+    Reduce 2D lon / lat arrays and variables to the index window of the pixels located in a polygon. In this window,
+    variables are NaN outside the polygon.
 
-    # Extract the subarrays for each variable in data_vars
-    data_vars_reduced = {}
-    for var in data_vars:
-        data_vars_reduced[var] = data_vars[var][
-            min_row : max_row + 1, min_col : max_col + 1
-        ]
+    Parameters
+    ----------
+    lon: numpy.ndarray
+        2D longitudes
+    lat: numpy.ndarray
+        2D latitudes
+    data_vars: Dict[str, numpy.ndarray]
+        2D variables with the shape of `lon`
+    polygon: shapely.geometry.Polygon | shapely.geometry.MultiPolygon | numpy.ndarray
+        Polygon, or coordinates of its exterior (see `polygon_mask`)
 
-    return data_vars_reduced, lon_2d_reduced, lat_2d_reduced
+    Returns
+    -------
+    Dict[str, numpy.ndarray], numpy.ndarray | None, numpy.ndarray | None
+        Reduced variables, longitudes and latitudes. Longitudes and latitudes are None if no pixel is located in
+        the polygon.
+    """
+    mask = polygon_mask(lon, lat, polygon)
+    rows = np.flatnonzero(mask.any(axis=1))
+    if rows.size == 0:
+        logger.info("Filtering using polygon left no data.")
+        return data_vars, None, None
+    cols = np.flatnonzero(mask.any(axis=0))
+    window = (slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1))
+    window_mask = mask[window]
+    # variables are cropped before being masked
+    data_vars_reduced = {
+        var: np.where(window_mask, data_vars[var][window], np.nan) for var in data_vars
+    }
+    return data_vars_reduced, lon[window], lat[window]
 
 
 @njit
 def haversine(lat1, lon1, lat2, lon2):
     # Radius of the Earth in kilometers
-    R = 6371.0
+    R = EARTH_RADIUS_KM
 
     # Convert latitude and longitude from degrees to radians
     lat1_rad = np.radians(lat1)
@@ -949,6 +1179,178 @@ def haversine(lat1, lon1, lat2, lon2):
     return distance
 
 
+@njit
+def lonlat_to_unit_xyz(lon, lat):
+    """
+    Convert a longitude / latitude position (in degrees) into cartesian coordinates on the unit sphere.
+    """
+    lon_rad = np.radians(lon)
+    lat_rad = np.radians(lat)
+    cos_lat = np.cos(lat_rad)
+    return cos_lat * np.cos(lon_rad), cos_lat * np.sin(lon_rad), np.sin(lat_rad)
+
+
+@njit
+def build_spatial_index(lon, lat, radius_km):
+    """
+    Bucket points of a swath into a regular 3D grid over the unit sphere. The cell size is the chord length
+    matching `radius_km`, so that every point closer than `radius_km` from a position is located in the cell of this
+    position or in one of its 26 neighbours. Working on the unit sphere avoids special cases at the poles and across
+    the antimeridian.
+
+    Parameters
+    ----------
+    lon: numpy.ndarray
+        Longitudes of the swath (1D array)
+    lat: numpy.ndarray
+        Latitudes of the swath (1D array)
+    radius_km: float
+        Search radius (in kilometers) for which the index will be queried
+
+    Returns
+    -------
+    numpy.ndarray, numpy.ndarray, float, int
+        Sorted cell keys, order of the points that sorts the cell keys, cell size, number of cells along an axis.
+        Points with NaN coordinates get a key of -1, so they are never found when querying the index.
+    """
+    chord = 2 * np.sin(min(radius_km / (2 * EARTH_RADIUS_KM), np.pi / 2))
+    # slightly enlarge the cells so that points exactly at `radius_km` can't be missed by rounding errors
+    cell_size = chord * (1 + 1e-9)
+    n_cells = int(np.floor(2.0 / cell_size)) + 1
+    if n_cells > 2_000_000:
+        raise ValueError("radius_km is too small to build a spatial index")
+    keys = np.empty(lon.size, dtype=np.int64)
+    for k in range(lon.size):
+        if np.isnan(lon[k]) or np.isnan(lat[k]):
+            keys[k] = -1
+        else:
+            x, y, z = lonlat_to_unit_xyz(lon[k], lat[k])
+            ix = int((x + 1.0) / cell_size)
+            iy = int((y + 1.0) / cell_size)
+            iz = int((z + 1.0) / cell_size)
+            keys[k] = (ix * n_cells + iy) * n_cells + iz
+    order = np.argsort(keys, kind="mergesort")
+    return keys[order], order, cell_size, n_cells
+
+
+@njit
+def _scan_spatial_index(
+    lon_q, lat_q, lon, lat, keys, order, cell_size, n_cells, radius_km, out, out_start
+):
+    """
+    Look for the points of an index (see `build_spatial_index`) that are within `radius_km` of a position. If `out`
+    isn't empty, flat indices of these points are written in it, from `out_start`.
+
+    Returns
+    -------
+    int
+        Number of points found
+    """
+    if np.isnan(lon_q) or np.isnan(lat_q):
+        return 0
+    x, y, z = lonlat_to_unit_xyz(lon_q, lat_q)
+    ix = int((x + 1.0) / cell_size)
+    iy = int((y + 1.0) / cell_size)
+    iz = int((z + 1.0) / cell_size)
+    count = 0
+    for cx in range(ix - 1, ix + 2):
+        if cx < 0 or cx >= n_cells:
+            continue
+        for cy in range(iy - 1, iy + 2):
+            if cy < 0 or cy >= n_cells:
+                continue
+            for cz in range(iz - 1, iz + 2):
+                if cz < 0 or cz >= n_cells:
+                    continue
+                key = (cx * n_cells + cy) * n_cells + cz
+                for k in range(
+                    np.searchsorted(keys, key, side="left"),
+                    np.searchsorted(keys, key, side="right"),
+                ):
+                    m = order[k]
+                    if haversine(lat_q, lon_q, lat[m], lon[m]) <= radius_km:
+                        if out.size > 0:
+                            out[out_start + count] = m
+                        count += 1
+    return count
+
+
+@njit(parallel=True)
+def find_neighbours_within_radius(lon_1, lat_1, lon_2, lat_2, radius_km):
+    """
+    For each pixel of a first swath, find the pixels of a second swath that are located within `radius_km`.
+    Pixels of the second swath are indexed once (see `build_spatial_index`), so the cost is nearly linear in the
+    number of pixels instead of the product of both sizes.
+
+    Parameters
+    ----------
+    lon_1: numpy.ndarray
+        Longitudes of the first swath (target pixels)
+    lat_1: numpy.ndarray
+        Latitudes of the first swath (target pixels)
+    lon_2: numpy.ndarray
+        Longitudes of the second swath (searched pixels)
+    lat_2: numpy.ndarray
+        Latitudes of the second swath (searched pixels)
+    radius_km: float
+        Maximum distance (in kilometers) between 2 associated pixels
+
+    Returns
+    -------
+    numpy.ndarray, numpy.ndarray
+        Neighbourhoods in a compressed sparse row layout: neighbours of the flat target pixel `q` are the flat
+        indices `indices[offsets[q]:offsets[q + 1]]` of the second swath, sorted in ascending order.
+    """
+    flat_lon_1 = lon_1.flatten()
+    flat_lat_1 = lat_1.flatten()
+    flat_lon_2 = lon_2.flatten()
+    flat_lat_2 = lat_2.flatten()
+    keys, order, cell_size, n_cells = build_spatial_index(
+        flat_lon_2, flat_lat_2, radius_km
+    )
+    no_output = np.empty(0, dtype=np.int64)
+
+    counts = np.zeros(flat_lon_1.size, dtype=np.int64)
+    for q in prange(flat_lon_1.size):
+        counts[q] = _scan_spatial_index(
+            flat_lon_1[q],
+            flat_lat_1[q],
+            flat_lon_2,
+            flat_lat_2,
+            keys,
+            order,
+            cell_size,
+            n_cells,
+            radius_km,
+            no_output,
+            0,
+        )
+    offsets = np.zeros(flat_lon_1.size + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(counts)
+
+    indices = np.empty(offsets[-1], dtype=np.int64)
+    for q in prange(flat_lon_1.size):
+        if counts[q] > 0:
+            _scan_spatial_index(
+                flat_lon_1[q],
+                flat_lat_1[q],
+                flat_lon_2,
+                flat_lat_2,
+                keys,
+                order,
+                cell_size,
+                n_cells,
+                radius_km,
+                indices,
+                offsets[q],
+            )
+            # keep the row-major order of the second swath, as a full scan would do
+            indices[offsets[q] : offsets[q + 1]] = np.sort(
+                indices[offsets[q] : offsets[q + 1]]
+            )
+    return offsets, indices
+
+
 @njit(parallel=True)
 def compute_colocated_data(
     lon_1,
@@ -963,32 +1365,36 @@ def compute_colocated_data(
     main_var_name_1,
     radius_km,
 ):
-
-    for i in prange(lon_1.shape[0]):
-        for j in prange(lon_1.shape[1]):
-            filtered_indices = []
-            for m in prange(lon_2.shape[0]):
-                for n in prange(lon_2.shape[1]):
-                    dist = haversine(lat_1[i, j], lon_1[i, j], lat_2[m, n], lon_2[m, n])
-                    if dist <= radius_km:
-                        filtered_indices.append((m, n))
-
-            if len(filtered_indices) < min_px:
-                continue
-
-            ref_nan = False
-            for coloc_1_var in data_vars_1:
-                if coloc_1_var == main_var_name_1:
-                    ref_nan = np.isnan(data_vars_1[coloc_1_var][i, j])
-                colocated_data_1[coloc_1_var][i, j] = data_vars_1[coloc_1_var][i, j]
-
-            for coloc_2_var in data_vars_2:
-                if not ref_nan:
-                    filtered_data = np.array(
-                        [data_vars_2[coloc_2_var][m, n] for m, n in filtered_indices]
-                    )
-                    mean_filtered_data = np.nanmean(filtered_data)
-                    colocated_data_2[coloc_2_var][i, j] = mean_filtered_data
+    offsets, indices = find_neighbours_within_radius(
+        lon_1, lat_1, lon_2, lat_2, radius_km
+    )
+    n_cols_1 = lon_1.shape[1]
+    n_cols_2 = lon_2.shape[1]
+
+    for q in prange(lon_1.size):
+        i = q // n_cols_1
+        j = q % n_cols_1
+        start = offsets[q]
+        stop = offsets[q + 1]
+
+        if stop - start < min_px:
+            continue
+
+        ref_nan = False
+        for coloc_1_var in data_vars_1:
+            if coloc_1_var == main_var_name_1:
+                ref_nan = np.isnan(data_vars_1[coloc_1_var][i, j])
+            colocated_data_1[coloc_1_var][i, j] = data_vars_1[coloc_1_var][i, j]
+
+        for coloc_2_var in data_vars_2:
+            if not ref_nan:
+                filtered_data = np.empty(stop - start)
+                for k in range(start, stop):
+                    filtered_data[k - start] = data_vars_2[coloc_2_var][
+                        indices[k] // n_cols_2, indices[k] % n_cols_2
+                    ]
+                mean_filtered_data = np.nanmean(filtered_data)
+                colocated_data_2[coloc_2_var][i, j] = mean_filtered_data
 
     return colocated_data_1, colocated_data_2
 
@@ -2,21 +2,68 @@ import os
 import numpy as np
 from datetime import datetime
 
-from .tools import correct_dataset, convert_mingmt, common_var_names
+from .tools import correct_dataset, convert_mingmt, common_var_names, minutes_to_datetime
+from .roi import read_region, restrict_to_time_window
 from .windsat_daily_v7 import WindSatDaily, to_xarray_dataset
 
 
 class GetWindSatMeta:
-    def __init__(self, product_path, product_generation=False):
+    def __init__(self, product_path, product_generation=False, footprint=None, roi=None):
         self.product_path = product_path
         self.product_name = os.path.basename(self.product_path)
         self.product_generation = product_generation
         self._time_name = 'time'
         self._longitude_name = 'longitude'
         self._latitude_name = 'latitude'
-        self._dataset = to_xarray_dataset(WindSatDaily(product_path, np.nan)).load()
-        self.dataset = correct_dataset(self.dataset, self.longitude_name)
-        self.dataset = convert_mingmt(self)
+        if footprint is not None:
+            self._footprint = footprint
+        self._dataset = None
+        self._start_date = None
+        self._stop_date = None
+        # region of interest (see `coloc_sat.roi`): only the grid cells of this region are kept
+        self.roi = roi
+        # without product generation, the dataset is only opened when it is needed
+        if self.product_generation:
+            self._dataset = self._open_dataset()
+
+    def _open_dataset(self):
+        """
+        Open the acquisition dataset. The binary format has to be decoded as a whole, so only the variables needed to
+        verify an intersection are kept when no co-location product is generated. With a region of interest, only its
+        grid cells are kept (start and stop dates are read before, from the whole day).
+
+        Returns
+        -------
+        xarray.Dataset
+            Acquisition dataset
+        """
+        ds = to_xarray_dataset(WindSatDaily(self.product_path, np.nan))
+        if not self.product_generation:
+            ds = ds[
+                [self.minute_name]
+                + [var for var in self.necessary_vars_for_intersection if var != self.time_name]
+            ]
+        if self.roi is not None:
+            if self._start_date is None:
+                unique_times = np.unique(minutes_to_datetime(self.day_date, ds[self.minute_name].values))
+                self._start_date = min(unique_times)
+                self._stop_date = max(unique_times)
+            # longitudes of the region of interest are in [-180, 180]
+            self._dataset = read_region(ds, self.longitude_name, self.latitude_name, self.roi).load()
+        else:
+            # `self.dataset` is set step by step because `convert_mingmt` reads it
+            self._dataset = correct_dataset(ds.load(), self.longitude_name)
+        self._dataset = convert_mingmt(self)
+        if self.roi is not None:
+            self._dataset = restrict_to_time_window(
+                self._dataset, self.time_name, self.longitude_name, self.latitude_name, self.roi
+            )
+        return self._dataset
+
+    @property
+    def footprint(self):
+        if hasattr(self, "_footprint"):
+            return self._footprint
 
     @property
     def longitude_name(self):
@@ -64,6 +111,8 @@ class GetWindSatMeta:
         xarray.Dataset
             Acquisition dataset
         """
+        if self._dataset is None:
+            self._dataset = self._open_dataset()
         return self._dataset
 
     @dataset.setter
@@ -126,7 +175,9 @@ class GetWindSatMeta:
         numpy.datetime64
             Start time
         """
-        return min(np.unique(self.dataset[self.time_name]))
+        if self._start_date is None:
+            self._read_time_bounds()
+        return self._start_date
 
     @property
     def stop_date(self):
@@ -138,7 +189,21 @@ class GetWindSatMeta:
         numpy.datetime64
             Stop time
         """
-        return max(np.unique(self.dataset[self.time_name]))
+        if self._stop_date is None:
+            self._read_time_bounds()
+        return self._stop_date
+
+    def _read_time_bounds(self):
+        """
+        Fill start and stop dates from the time variable of the dataset.
+        """
+        dataset = self.dataset
+        if self._start_date is not None:
+            # already read from the whole day when the dataset only covers a region of interest
+            return
+        unique_times = np.unique(dataset[self.time_name].values)
+        self._start_date = min(unique_times)
+        self._stop_date = max(unique_times)
 
     @property
     def orbit_segment_name(self):
@@ -233,6 +298,18 @@ class GetWindSatMeta:
         """
         return [self.time_name, 'land', 'nodata', 'ice', 'cloud']
 
+    @property
+    def necessary_vars_for_intersection(self):
+        """
+        Get variables needed to verify an intersection (the only ones kept when no co-location product is generated)
+
+        Returns
+        -------
+        list[str]
+            Variables needed to verify an intersection
+        """
+        return [self.longitude_name, self.latitude_name, self.time_name, self.orbit_segment_name, self.wind_name]
+
     @property
     def necessary_attrs_in_coloc_product(self):
         """
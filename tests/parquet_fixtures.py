@@ -0,0 +1,119 @@
+"""Small GeoParquet files of co-locations, and fake products to co-locate them without data.
+
+Run as a module to co-locate a shard of a parquet file with the fake products:
+`python -m tests.parquet_fixtures <parquet> <destination_folder> <shard_index> <shard_count>`.
+"""
+import os
+import random
+import sys
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+CONFIG = os.path.join(os.path.dirname(os.path.dirname(__file__)), "coloc_sat", "config_hy2.yml")
+START = pd.Timestamp("2023-01-01")
+
+
+def coloc_rows(n_rows=300, n_ref=80, n_match=30, seed=0):
+    """
+    Rows of a parquet file of co-locations: distinct pairs of reference and matched products sharing granules, whose
+    footprints intersect more or less.
+    """
+    rng = random.Random(seed)
+    rows = []
+    # distinct pairs of granules
+    for pair in rng.sample(range(n_ref * n_match), n_rows):
+        ref, match = divmod(pair, n_match)
+        x, y = rng.uniform(-10, 10), rng.uniform(-10, 10)
+        rows.append(
+            dict(
+                ref_geometry=shapely.box(x, y, x + 2, y + 2),
+                ref_start=START + pd.Timedelta(minutes=5 * ref),
+                ref_end=START + pd.Timedelta(minutes=5 * ref + 1),
+                ref_dataset_id=rng.choice(["s1a", "s1b"]),
+                ref_granule=f"ref_{ref}",
+                # from a full intersection to no intersection
+                match_geometry=shapely.box(x + rng.uniform(0, 2.5), y, x + 4, y + 2),
+                match_start=START + pd.Timedelta(minutes=13 * match),
+                match_end=START + pd.Timedelta(minutes=13 * match + 3),
+                match_dataset_id="hy2b",
+                match_granule=f"match_{match}",
+                match_slice=np.arange(3),
+            )
+        )
+    return rows
+
+
+def write_coloc_parquet(path, tz=None, row_group_size=50, **kwargs):
+    """
+    Write a GeoParquet file of co-locations (see `coloc_rows`), with naive or tz-aware times.
+
+    Returns
+    -------
+    geopandas.GeoDataFrame
+        Written rows
+    """
+    gdf = gpd.GeoDataFrame(coloc_rows(**kwargs), geometry="ref_geometry", crs="EPSG:4326")
+    gdf["match_geometry"] = gpd.GeoSeries(gdf["match_geometry"], crs="EPSG:4326")
+    if tz is not None:
+        for name in ["ref_start", "ref_end", "match_start", "match_end"]:
+            gdf[name] = gdf[name].dt.tz_localize(tz)
+    gdf.to_parquet(path, row_group_size=row_group_size)
+    return gdf
+
+
+def fake_comparison_files(start_date, stop_date, ds_name, **kwargs):
+    return [f"/{ds_name}/{start_date:%Y%m%dT%H%M%S}.nc"]
+
+
+class FakeGenerateColoc:
+    """
+    Co-location of products that records its arguments instead of opening the products.
+    """
+
+    calls = []
+
+    def __init__(self, **kwargs):
+        self.calls.append(kwargs)
+
+    def save_results(self):
+        return 0
+
+
+def use_fake_products(setter=setattr):
+    """
+    Make `coloc_sat.parquet_coloc` co-locate with `FakeGenerateColoc` the products found by `fake_comparison_files`.
+    `setter` is `setattr`, or `monkeypatch.setattr` in a test.
+    """
+    from coloc_sat import parquet_coloc
+
+    setter(parquet_coloc, "get_all_comparison_files", fake_comparison_files)
+    setter(parquet_coloc, "GenerateColoc", FakeGenerateColoc)
+    setter(parquet_coloc, "check_file_match_pattern_date", lambda *args: True)
+
+
+def run_shard(parquet, destination_folder, shard_index, shard_count):
+    from coloc_sat import parquet_coloc
+    from coloc_sat.tools import set_config
+
+    set_config(CONFIG)
+    use_fake_products()
+    parquet_coloc.coloc_from_parquet(
+        parquet,
+        destination_folder,
+        False,
+        30,
+        "100km2",
+        "nearest",
+        batch_size=100,
+        group_size=10,
+        shard_index=int(shard_index),
+        shard_count=int(shard_count),
+        results_folder=os.path.join(destination_folder, "results"),
+    )
+
+
+if __name__ == "__main__":
+    run_shard(*sys.argv[1:])
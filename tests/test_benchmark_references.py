@@ -0,0 +1,144 @@
+"""Equivalence of the optimized functions with the former implementations kept in the benchmarks (`benchmarks/`)."""
+import contextlib
+
+import numpy as np
+import pytest
+import shapely
+import xarray as xr
+from shapely.geometry import Polygon
+
+from benchmarks.bench_filter_data_polygon import full_scan_filter_data_polygon, synthetic_orbit
+from benchmarks.bench_subset_where import synthetic_smap_day, with_subset_where, with_where
+from benchmarks.bench_swath_association import (
+    RADIUS_KM,
+    full_scan_colocated_data,
+    run,
+    synthetic_swath,
+    typed_dict,
+)
+from coloc_sat.resampling import SwathResampler
+from coloc_sat.roi import get_region_of_interest, read_region
+from coloc_sat.tools import compute_colocated_data, filter_data_polygon, point_in_polygon, polygon_mask
+
+
+@pytest.fixture(scope="module")
+def swaths():
+    rng = np.random.default_rng(0)
+    # the source swath has a 10 times finer resolution and covers the same area
+    return synthetic_swath((12, 12), 0.25, rng), synthetic_swath((120, 120), 0.025, rng)
+
+
+@pytest.fixture(scope="module")
+def full_scan(swaths):
+    _, (full_1, full_2) = run(full_scan_colocated_data, *swaths)
+    return full_1, full_2
+
+
+def test_indexed_association_matches_full_scan(swaths, full_scan):
+    _, (indexed_1, indexed_2) = run(compute_colocated_data, *swaths)
+    full_1, full_2 = full_scan
+    assert np.isfinite(indexed_2["wind_speed"]).any()
+    for name in full_1:
+        np.testing.assert_array_equal(indexed_1[name], full_1[name])
+    for name in full_2:
+        np.testing.assert_array_equal(indexed_2[name], full_2[name])
+
+
+def test_sparse_resampling_matches_colocated_data(swaths, full_scan, tmp_path):
+    (lon_1, lat_1, data_1), (lon_2, lat_2, data_2) = swaths
+    resampler = SwathResampler.from_lon_lat(lon_1, lat_1, lon_2, lat_2, RADIUS_KM)
+    # the operator is saved and reloaded to resample again the same geometries
+    resampler.save(str(tmp_path / "resampler.npz"))
+    resampler = SwathResampler.load(str(tmp_path / "resampler.npz"))
+    # same masking as `ProductIntersection.coloc_resample_swath`
+    valid = resampler.n_neighbours >= 1
+    names = list(data_2)
+    resampled = resampler.apply(np.stack([data_2[name] for name in names]))
+    full_1, full_2 = full_scan
+    for name in data_1:
+        np.testing.assert_array_equal(np.where(valid, data_1[name], np.nan), full_1[name])
+    valid &= ~np.isnan(data_1["wind_speed"])
+    for k, name in enumerate(names):
+        # sums are made in another order than `numpy.nanmean`
+        np.testing.assert_allclose(np.where(valid, resampled[k], np.nan), full_2[name], rtol=1e-12)
+    rows = np.flatnonzero(valid)
+    np.testing.assert_array_equal(
+        resampler.apply_points(np.stack([data_2[name] for name in names]), rows),
+        resampled.reshape(len(names), -1)[:, rows],
+    )
+
+
+@pytest.mark.parametrize("n_rows, n_cols", [(10, 4), (1624, 76)])
+def test_filter_data_polygon_matches_full_scan(n_rows, n_cols):
+    lon, lat, data = synthetic_orbit(n_rows, n_cols, np.random.default_rng(0))
+    polygon = Polygon([(-139, 54), (-135, 59), (-131, 56), (-135, 51), (-139, 54)])
+    coords = np.array(polygon.exterior.coords)
+    reduced, lon_reduced, lat_reduced = filter_data_polygon(lon, lat, dict(data), polygon)
+    full, lon_full, lat_full = full_scan_filter_data_polygon(lon, lat, typed_dict(data), coords)
+    if lon_full is None:
+        assert lon_reduced is None
+        return
+    np.testing.assert_array_equal(lon_reduced, lon_full)
+    np.testing.assert_array_equal(lat_reduced, lat_full)
+    for name in data:
+        np.testing.assert_array_equal(reduced[name], full[name])
+    # the coordinates of the polygon are accepted too
+    expected = np.array([[point_in_polygon(x, y, coords) for x, y in zip(*row)] for row in zip(lon, lat)])
+    np.testing.assert_array_equal(polygon_mask(lon, lat, coords), expected)
+    assert expected.any()
+
+
+@pytest.fixture(scope="module")
+def smap_day(tmp_path_factory):
+    ds = synthetic_smap_day(np.random.default_rng(0))
+    path = str(tmp_path_factory.mktemp("smap") / "smap_day.nc")
+    ds.to_netcdf(path)
+    return ds, path
+
+
+@pytest.mark.parametrize(
+    "start, stop",
+    [
+        # 1 hour around 06:00 (morning node)
+        ("2023-01-01T05:30:00", "2023-01-01T06:30:00"),
+        # nothing acquired
+        ("2023-01-02T05:30:00", "2023-01-02T06:30:00"),
+    ],
+)
+@pytest.mark.parametrize("lazy", [False, True])
+def test_subset_where_matches_where(smap_day, start, stop, lazy):
+    ds, path = smap_day
+    start, stop = np.datetime64(start, "ns"), np.datetime64(stop, "ns")
+    with xr.open_dataset(path) if lazy else contextlib.nullcontext(ds) as dataset:
+        expected = with_where(dataset, start, stop).load()
+        subset = with_subset_where(dataset, start, stop).load()
+    for name in ["time", "wind_speed", "wind_direction", "quality_flag"]:
+        xr.testing.assert_equal(subset[name], expected[name])
+
+
+@pytest.mark.parametrize(
+    "footprint",
+    [
+        shapely.box(10, 20, 14, 25),
+        # across the antimeridian, expressed in [0, 360] or split in 2 polygons
+        shapely.box(178, -40, 183, -35),
+        shapely.MultiPolygon([shapely.box(178, -40, 180, -35), shapely.box(-180, -40, -177, -35)]),
+        # across the meridian 0
+        shapely.box(-3, 60, 2, 65),
+    ],
+)
+def test_region_read_matches_full_read(smap_day, footprint):
+    _, path = smap_day
+    roi = get_region_of_interest(footprint)
+    min_lon, min_lat, max_lon, max_lat = roi["bbox"]
+    with xr.open_dataset(path) as lazy:
+        region = read_region(lazy, "lon", "lat", roi).load()
+        full = lazy.load()
+    # selection of the cells of the box in the whole grid
+    full = full.assign_coords(lon=(full["lon"] + 180) % 360 - 180).sortby("lon")
+    lon = full["lon"].values
+    in_lon = (lon >= min_lon) & (lon <= max_lon) if min_lon <= max_lon else (lon >= min_lon) | (lon <= max_lon)
+    in_lat = (full["lat"].values >= min_lat) & (full["lat"].values <= max_lat)
+    expected = full.isel(lon=in_lon, lat=in_lat)
+    assert 0 < region.sizes["lon"] < full.sizes["lon"]
+    xr.testing.assert_identical(region, expected)
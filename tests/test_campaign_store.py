@@ -0,0 +1,105 @@
+"""Tests of the campaign store (`coloc_sat.campaign_store`) and of its index."""
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from coloc_sat.campaign_store import CampaignStore, pair_group_name
+
+START = np.datetime64("2023-01-01T00:00", "ns")
+
+
+def matchups(k, n_obs=5):
+    return xr.Dataset(
+        {"wind_speed_1": ("obs", np.arange(n_obs, dtype="float64") + k), "wind_speed_2": ("obs", np.full(n_obs, k))},
+        attrs={"counted_points": n_obs, "Bias": float(k)},
+    )
+
+
+def append_pairs(path, indexes):
+    with CampaignStore(path) as store:
+        for k in indexes:
+            store.append(
+                matchups(k),
+                f"/data/S1/s1_{k}.SAFE",
+                f"/data/HY2/hy2_{k}.nc",
+                START + np.timedelta64(k, "h"),
+                START + np.timedelta64(k, "h") + np.timedelta64(30, "m"),
+            )
+
+
+@pytest.fixture(params=["campaign.nc", "campaign.zarr"])
+def store_path(request, tmp_path):
+    if request.param.endswith(".zarr"):
+        pytest.importorskip("zarr")
+    return str(tmp_path / request.param)
+
+
+def test_concurrent_appends(store_path):
+    # 8 workers appending 24 pairs to the same store
+    with ProcessPoolExecutor(8, mp_context=multiprocessing.get_context("fork")) as pool:
+        list(pool.map(append_pairs, [store_path] * 8, [range(k, 24, 8) for k in range(8)]))
+    with CampaignStore(store_path) as store:
+        store.consolidate()
+        index = store.query()
+        assert len(index) == 24
+        assert list(index["counted_points"]) == [5] * 24
+        tree = store.open_pairs()
+        assert list(tree.children) == list(index["pair_group"])
+        for k in range(24):
+            group = pair_group_name(f"/data/S1/s1_{k}.SAFE", f"/data/HY2/hy2_{k}.nc")
+            assert group in store
+            xr.testing.assert_equal(tree[group].to_dataset().load(), matchups(k), check_dim_order=False)
+
+
+def test_time_range(store_path):
+    append_pairs(store_path, range(10))
+    with CampaignStore(store_path) as store:
+        # pairs overlapping [02:45, 05:10]
+        index = store.query("2023-01-01T02:45", "2023-01-01T05:10")
+        assert list(index["name1"]) == [f"s1_{k}.SAFE" for k in [3, 4, 5]]
+        assert list(index["start_date"]) == list(pd.to_datetime(START + np.arange(3, 6) * np.timedelta64(1, "h")))
+        assert len(store.open_pairs("2023-01-01T02:45", "2023-01-01T05:10").children) == 3
+        assert len(store.open_pairs("2022-01-01", "2022-01-02").children) == 0
+
+
+def test_open_matchups(store_path):
+    append_pairs(store_path, range(4))
+    with CampaignStore(store_path) as store:
+        table = store.open_matchups().load()
+        index = store.query()
+    assert table.sizes["obs"] == 20
+    assert list(np.unique(table["pair_group"])) == sorted(index["pair_group"])
+    for group, k in zip(index["pair_group"], range(4)):
+        assert (table["wind_speed_2"].values[table["pair_group"].values == group] == k).all()
+
+
+def test_replace_group(store_path):
+    append_pairs(store_path, range(3))
+    with CampaignStore(store_path) as store:
+        store.consolidate()
+        group = pair_group_name("/data/S1/s1_1.SAFE", "/data/HY2/hy2_1.nc")
+        # group written again after the consolidation, with another size, and a new group
+        store.append(matchups(10, n_obs=8), "/data/S1/s1_1.SAFE", "/data/HY2/hy2_1.nc", START, START)
+        append_pairs(store_path, [3])
+        tree = store.open_pairs()
+        assert len(tree.children) == 4
+        xr.testing.assert_equal(tree[group].to_dataset().load(), matchups(10, n_obs=8), check_dim_order=False)
+
+
+@pytest.mark.skipif(shutil.which("h5repack") is None, reason="h5repack isn't installed")
+def test_repack(tmp_path):
+    store_path = str(tmp_path / "campaign.nc")
+    append_pairs(store_path, range(3))
+    for _ in range(5):
+        append_pairs(store_path, range(3))
+    size = os.path.getsize(store_path)
+    with CampaignStore(store_path) as store:
+        store.consolidate(repack=True)
+        assert os.path.getsize(store_path) < size
+        assert len(store.open_pairs().children) == 3
@@ -0,0 +1,65 @@
+"""Tests of the collection join (`coloc_sat.collection_join`) against a brute force join."""
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import box
+
+from coloc_sat.collection_join import join_collections
+from coloc_sat.intersection_tools import get_polygon_area_in_km_squared
+
+START = np.datetime64("2023-01-01T00:00", "ns")
+
+
+def collection(ds_name, n_products, duration, size, seed, footprints=True):
+    rng = np.random.default_rng(seed)
+    starts = START + rng.integers(0, 86400, n_products).astype("timedelta64[s]")
+    corners = rng.uniform([-20, -20], [20, 20], (n_products, 2))
+    return pd.DataFrame(
+        {
+            "path": [f"/{ds_name}/{k}.nc" for k in range(n_products)],
+            "granule": [f"{k}.nc" for k in range(n_products)],
+            "ds_name": ds_name,
+            "level": None,
+            "start_date": starts,
+            "stop_date": starts + np.timedelta64(duration, "m"),
+            "footprint": [box(x, y, x + size, y + size) if footprints else None for x, y in corners],
+        }
+    )
+
+
+def brute_force_join(ref, match, delta_time, minimal_area):
+    tolerance = 2 * np.timedelta64(delta_time, "m")
+    pairs = set()
+    for a in ref.itertuples():
+        for b in match.itertuples():
+            if not (a.start_date <= b.stop_date + tolerance and b.start_date <= a.stop_date + tolerance):
+                continue
+            if (a.footprint is None) or (b.footprint is None):
+                pairs.add((a.path, b.path))
+            elif a.footprint.intersects(b.footprint) and (
+                get_polygon_area_in_km_squared(a.footprint.intersection(b.footprint)) >= minimal_area
+            ):
+                pairs.add((a.path, b.path))
+    return pairs
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1000])
+def test_join_matches_brute_force(chunk_size):
+    ref = collection("S1", 150, 1, 2, seed=0)
+    match = pd.concat(
+        [collection("HY2", 100, 100, 6, seed=1), collection("SMOS", 3, 1439, 0, seed=2, footprints=False)],
+        ignore_index=True,
+    )
+    pairs = join_collections(ref, match, 60, minimal_area=1000, chunk_size=chunk_size)
+    assert set(zip(pairs["ref_path"], pairs["match_path"])) == brute_force_join(ref, match, 60, 1000)
+    assert len(pairs) == len(set(zip(pairs["ref_path"], pairs["match_path"])))
+
+
+def test_unknown_footprint_intersection():
+    ref = collection("S1", 50, 1, 2, seed=0)
+    match = collection("HY2", 20, 100, 6, seed=1, footprints=False)
+    pairs = join_collections(ref, match, 60, minimal_area=1000)
+    assert len(pairs)
+    # pairs joined by time only have no intersection, rather than the footprint of the reference product
+    assert pairs["match_intersection"].isna().all()
+    assert pairs["intersection_area"].isna().all()
@@ -0,0 +1,113 @@
+"""Tests of `coloc_sat.discovery` against the glob research of the date schemes."""
+import glob
+import os
+from datetime import datetime
+
+import pytest
+
+from coloc_sat.discovery import (
+    DirectoryCache,
+    find_template_paths,
+    find_template_paths_between,
+)
+from coloc_sat.tools import date_schemes, insert_date_and_day_of_year
+
+# S1 L2 names have a start and a stop time, both matched by the template
+S1_L2_FILES = [
+    "2022/151/s1a-iw-owi-cc-20220531t235908-20220531t235933-043456-05305a.nc",
+    "2022/151/s1a-iw-owi-cc-20220531t235933-20220601t000010-043456-05305a.nc",
+    "2022/151/s1b-ew-owi-cc-20220531t120000-20220531t120030-032118-03e4c1.nc",
+    "2022/151/s1a-iw-owi-xx-20220531t101010.nc",
+    "2022/151/.s1a-iw-owi-cc-20220531t235908-20220531t235933-043456-05305a.nc",
+    "2022/151/s1a-iw-owi-cc-20220531t235908-20220531t235933-043456-05305a.SAFE",
+    "2022/152/s1a-iw-owi-cc-20220601t000010-20220601t000035-043457-05305b.nc",
+]
+S1_L2_TEMPLATE = "L2/*/*/%Y/%(dayOfYear)/s1*-owi-*-%Y%m%dt%H%M%S*.nc"
+
+
+@pytest.fixture
+def template(tmp_path):
+    for name in S1_L2_FILES:
+        path = tmp_path / "L2" / "IW" / "S1A_IW_OWI" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+    return os.path.join(str(tmp_path), S1_L2_TEMPLATE)
+
+
+def glob_schemes(template, schemes):
+    """
+    Former research: glob of the template for each date scheme.
+    """
+    paths = set()
+    for scheme, values in schemes.items():
+        expression = insert_date_and_day_of_year(
+            template, datetime.strptime(scheme, "%Y%m%d%H%M%S"), values["dayOfYear"]
+        )
+        paths.update(glob.glob(expression))
+    return sorted(paths)
+
+
+@pytest.mark.parametrize(
+    "scheme",
+    ["20220531235908", "20220531235933", "20220601000010", "20220531120030", "20220531101010", "20220531235909"],
+)
+def test_find_template_paths_matches_glob(template, scheme):
+    schemes = date_schemes(
+        datetime.strptime(scheme, "%Y%m%d%H%M%S"), datetime.strptime(scheme, "%Y%m%d%H%M%S"), "second"
+    )
+    expected = glob_schemes(template, schemes)
+    assert find_template_paths(template, [scheme], cache=DirectoryCache()) == expected
+
+
+def test_start_time_of_two_timestamps_name(template):
+    found = find_template_paths(template, ["20220531235908"], cache=DirectoryCache())
+    assert [os.path.basename(path) for path in found] == [
+        "s1a-iw-owi-cc-20220531t235908-20220531t235933-043456-05305a.nc"
+    ]
+
+
+@pytest.mark.parametrize(
+    "start, stop",
+    [
+        # boundary: the product starts in the range, it stops after
+        ("2022-05-31 23:59:00", "2022-05-31 23:59:10"),
+        ("2022-05-31 23:59:09", "2022-05-31 23:59:32"),
+        ("2022-05-31 23:59:30", "2022-06-01 00:00:15"),
+        ("2022-05-31 11:59:50", "2022-05-31 12:00:30"),
+        ("2022-05-31 10:10:10", "2022-05-31 10:10:10"),
+    ],
+)
+def test_find_template_paths_between_matches_glob(template, start, stop):
+    start, stop = datetime.fromisoformat(start), datetime.fromisoformat(stop)
+    expected = glob_schemes(template, date_schemes(start, stop, "second"))
+    found = find_template_paths_between(template, start, stop, "second", cache=DirectoryCache())
+    assert sorted(found) == expected
+
+
+@pytest.mark.parametrize(
+    "start, stop, accuracy",
+    [
+        ("2022-05-31 10:04:00", "2022-05-31 10:06:30", "second"),
+        ("2022-05-31 10:58:00", "2022-05-31 11:03:00", "minute"),
+        # the range holds every minute of an hour
+        ("2022-05-31 09:30:00", "2022-05-31 11:45:00", "minute"),
+        ("2022-05-31 23:59:00", "2022-06-01 00:01:00", "minute"),
+    ],
+)
+def test_find_template_paths_between_without_hours(tmp_path, start, stop, accuracy):
+    # minutes and seconds in the names, without the hours
+    template = os.path.join(str(tmp_path), "M/%Y/%(dayOfYear)/m_%Y%m%d_%M%S.nc")
+    for day, day_of_year in [("20220531", "151"), ("20220601", "152")]:
+        folder = tmp_path / "M" / "2022" / day_of_year
+        folder.mkdir(parents=True, exist_ok=True)
+        for minute in range(0, 60, 3):
+            for second in [0, 15, 59]:
+                (folder / f"m_{day}_{minute:02d}{second:02d}.nc").touch()
+    start, stop = datetime.fromisoformat(start), datetime.fromisoformat(stop)
+    # codes finer than the accuracy match any value
+    expected = find_template_paths(template, list(date_schemes(start, stop, accuracy)), cache=DirectoryCache())
+    found = find_template_paths_between(template, start, stop, accuracy, cache=DirectoryCache())
+    assert expected
+    assert sorted(found) == sorted(expected)
+    if accuracy == "second":
+        assert sorted(found) == glob_schemes(template, date_schemes(start, stop, accuracy))
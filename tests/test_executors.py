@@ -0,0 +1,137 @@
+"""Tests of the execution backends of the parquet co-locations (`coloc_sat.executors`)."""
+import os
+import time
+
+import pytest
+
+from coloc_sat import tools
+from coloc_sat.executors import batch_tasks, get_executor, get_jobqueue_options
+
+CONFIG = os.path.join(os.path.dirname(os.path.dirname(__file__)), "coloc_sat", "config.yml")
+
+
+def square(k, offset=0):
+    return k * k + offset
+
+
+def fail_once(k, folder):
+    """
+    Odd tasks fail at their first attempt.
+    """
+    marker = os.path.join(folder, f"failed_{k}")
+    if k % 2 and not os.path.exists(marker):
+        open(marker, "w").close()
+        raise RuntimeError(f"task {k} failed")
+    return k
+
+
+def always_fail(k):
+    raise RuntimeError(f"task {k} failed")
+
+
+def die_once(k, folder):
+    """
+    The worker process running task 2 dies at its first attempt, which breaks the process pool.
+    """
+    marker = os.path.join(folder, f"died_{k}")
+    if k == 2 and not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    time.sleep(0.01)
+    return k
+
+
+def slow(k):
+    time.sleep(0.02)
+    return k
+
+
+@pytest.mark.parametrize(
+    "kwargs, expected",
+    [
+        (dict(), [list("abcdef")]),
+        (dict(max_size=2), [["a", "b"], ["c", "d"], ["e", "f"]]),
+        # an item exceeding the limit on its own is a task on its own
+        (dict(sizes=[1, 2, 3, 1, 1, 5], max_size=3), [["a", "b"], ["c"], ["d", "e"], ["f"]]),
+        (dict(costs=[1, 1, 5, 1, 0.5, 0.5], max_cost=2), [["a", "b"], ["c"], ["d", "e", "f"]]),
+        (dict(sizes=[1] * 6, max_size=2, costs=[1, 1, 5, 1, 0.5, 0.5], max_cost=2), [["a", "b"], ["c"], ["d", "e"], ["f"]]),
+    ],
+)
+def test_batch_tasks(kwargs, expected):
+    assert batch_tasks(list("abcdef"), **kwargs) == expected
+
+
+def test_batch_tasks_needs_costs():
+    with pytest.raises(ValueError):
+        batch_tasks(list("abc"), max_cost=2)
+    assert batch_tasks([], max_size=2) == []
+
+
+@pytest.mark.parametrize("executor", ["serial", "processes"])
+def test_run_keeps_task_order(executor):
+    with get_executor(executor, max_workers=2) as backend:
+        assert backend.run(square, [(k,) for k in range(10)], offset=1) == [k * k + 1 for k in range(10)]
+
+
+@pytest.mark.parametrize("executor", ["serial", "processes"])
+def test_retries(executor, tmp_path):
+    with get_executor(executor, max_workers=2, retries=1) as backend:
+        assert backend.run(fail_once, [(k, str(tmp_path)) for k in range(8)]) == list(range(8))
+    with get_executor(executor, max_workers=2, retries=2) as backend:
+        with pytest.raises(RuntimeError):
+            backend.run(always_fail, [(k,) for k in range(3)])
+
+
+def test_broken_pool_is_restarted(tmp_path):
+    with get_executor("processes", max_workers=2, retries=1) as backend:
+        assert backend.run(die_once, [(k, str(tmp_path)) for k in range(8)]) == list(range(8))
+        assert backend.workers == 2
+
+
+@pytest.mark.parametrize("executor, max_in_flight", [("serial", None), ("processes", 3)])
+def test_in_flight_limit(executor, max_in_flight):
+    read = []
+
+    def tasks():
+        for k in range(20):
+            read.append(k)
+            yield (k,)
+
+    with get_executor(executor, max_workers=2, max_in_flight=max_in_flight) as backend:
+        done = 0
+        for k, result in backend.imap(slow, tasks()):
+            done += 1
+            # tasks are read from the generator only when there is room for them
+            assert len(read) - done <= backend.max_in_flight
+        assert done == 20
+
+
+def test_default_workers():
+    with get_executor("processes") as backend:
+        assert backend.workers == os.cpu_count()
+        assert backend.max_in_flight == 2 * os.cpu_count()
+
+
+def test_jobqueue_options(tmp_path, monkeypatch):
+    # the configuration of the process is restored after the test
+    monkeypatch.setattr(tools, "param_config", tools.param_config)
+    monkeypatch.setattr(tools, "common_var_names", getattr(tools, "common_var_names", None), raising=False)
+    monkeypatch.setenv("TMPDIR", str(tmp_path))
+    tools.set_config(CONFIG)
+    scheduler, jobs, options = get_jobqueue_options(max_workers=4, memory=3)
+    assert (scheduler, jobs) == ("pbs", 4)
+    assert options["queue"] == "sequentiel"
+    assert options["memory"] == "3GB"
+    assert options["resource_spec"] == "select=1:ncpus=1:mem=3GB"
+    assert options["local_directory"] == str(tmp_path)
+
+    config = tmp_path / "config.yml"
+    config.write_text("dask_jobqueue:\n  scheduler: slurm\n  jobs: 10\n  memory: 8GB\n")
+    tools.set_config(str(config))
+    scheduler, jobs, options = get_jobqueue_options(max_workers=4, memory=3)
+    assert (scheduler, jobs, options) == ("slurm", 10, {"memory": "8GB"})
+
+    config.write_text("common_var_names: {}\n")
+    tools.set_config(str(config))
+    with pytest.raises(ValueError):
+        get_jobqueue_options()
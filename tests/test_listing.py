@@ -0,0 +1,77 @@
+"""Tests of the listing files of co-located products (`coloc_sat.listing`)."""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from coloc_sat.listing import ListingStore, merge_listings
+
+PAIRS = [
+    ("/data/S1/s1a-iw-owi-cc-20220531t235908.nc", "/data/HY2/hy2b_20220531.nc"),
+    ("s3://bucket/S1/s1b-ew-owi-cc-20220601t000010.nc", "https://host:8080/SMOS/smos_20220601.nc"),
+    ("/data/RS2/rs2--owi-cm-20220601été.nc", "/data/SMAP/smap_2022_06_01.nc"),
+]
+
+
+def add_pairs(path, pairs):
+    store = ListingStore(path)
+    return [store.add(product1, product2) for product1, product2 in pairs]
+
+
+def test_duplicates_in_both_orders(tmp_path):
+    path = str(tmp_path / "listing_coloc_S1_HY2.txt")
+    store = ListingStore(path)
+    assert [store.add(*pair) for pair in PAIRS] == [True] * 3
+    assert [store.add(product2, product1) for product1, product2 in PAIRS] == [False] * 3
+    assert all(pair in store for pair in PAIRS)
+    # another process (or a restart) indexes the file again
+    assert [ListingStore(path).add(*pair) for pair in PAIRS] == [False] * 3
+    with open(path) as listing_file:
+        assert listing_file.read().splitlines() == [f"{product1}:{product2}" for product1, product2 in PAIRS]
+
+
+def test_concurrent_writers(tmp_path):
+    path = str(tmp_path / "listing_coloc_S1_HY2.txt")
+    pairs = [(f"/data/S1/s1_{k % 40}.nc", f"s3://bucket/HY2/hy2_{k % 40}.nc") for k in range(120)]
+    # each pair is added by several workers, in both orders
+    tasks = [
+        [pair if (k + worker) % 2 else pair[::-1] for k, pair in enumerate(pairs[worker::3] + pairs)]
+        for worker in range(6)
+    ]
+    with ProcessPoolExecutor(6, mp_context=multiprocessing.get_context("fork")) as pool:
+        added = sum(sum(result) for result in pool.map(add_pairs, [path] * 6, tasks))
+    assert added == 40
+    assert len(ListingStore(path).pairs()) == 40
+
+
+def test_partial_line(tmp_path):
+    path = tmp_path / "listing_coloc_S1_HY2.txt"
+    store = ListingStore(str(path))
+    line = f"{PAIRS[2][0]}:{PAIRS[2][1]}".encode()
+    # a line being written by another process, cut in a multibyte character
+    cut = line.index("é".encode()) + 1
+    path.write_bytes(line[:cut])
+    assert store.pairs() == []
+    assert PAIRS[2] not in store
+    with open(path, "ab") as listing_file:
+        listing_file.write(line[cut:] + b"\n")
+    assert store.pairs() == [line.decode()]
+    assert PAIRS[2] in store
+    assert not store.add(*PAIRS[2])
+
+
+def test_last_line_without_newline(tmp_path):
+    path = tmp_path / "listing_coloc_S1_HY2.txt"
+    path.write_text(f"{PAIRS[0][0]}:{PAIRS[0][1]}")
+    store = ListingStore(str(path))
+    assert not store.add(*PAIRS[0])
+    assert store.add(*PAIRS[1])
+    assert path.read_text().splitlines() == [f"{product1}:{product2}" for product1, product2 in PAIRS[:2]]
+
+
+def test_merge_listings(tmp_path):
+    paths = [str(tmp_path / f"listing_{k}.txt") for k in range(2)]
+    add_pairs(paths[0], PAIRS[:2])
+    add_pairs(paths[1], [PAIRS[1][::-1], PAIRS[2], PAIRS[0]])
+    output = str(tmp_path / "listing_coloc_S1_HY2.txt")
+    assert merge_listings(paths, output) == 3
+    with open(output) as listing_file:
+        assert listing_file.read().splitlines() == [f"{product1}:{product2}" for product1, product2 in PAIRS]
@@ -0,0 +1,102 @@
+"""Tests of the streaming reader of parquet co-locations (`coloc_sat.parquet_reader`)."""
+import geopandas as gpd
+import pandas as pd
+import pytest
+import shapely
+
+from coloc_sat.parquet_reader import (
+    batch_records,
+    decode_parquet_record,
+    iter_parquet_batches,
+    keep_closest_rows,
+)
+
+from .parquet_fixtures import START, write_coloc_parquet
+
+
+@pytest.fixture(scope="module", params=[None, "UTC", "Europe/Paris"])
+def parquet(request, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("parquet") / "coloc.parquet")
+    return path, write_coloc_parquet(path, tz=request.param)
+
+
+def naive_utc(times):
+    times = pd.to_datetime(times)
+    return times.dt.tz_convert("UTC").dt.tz_localize(None) if times.dt.tz is not None else times
+
+
+@pytest.mark.parametrize(
+    "start_date, stop_date",
+    [
+        (START + pd.Timedelta(hours=2), START + pd.Timedelta(hours=4)),
+        ("2023-01-01T02:00", "2023-01-01T04:00"),
+        # the same range, as tz-aware dates
+        (pd.Timestamp("2023-01-01T03:00", tz="Europe/Paris"), pd.Timestamp("2023-01-01T04:00Z")),
+    ],
+)
+def test_time_filter(parquet, start_date, stop_date):
+    path, gdf = parquet
+    rows = pd.concat(list(iter_parquet_batches(path, start_date=start_date, stop_date=stop_date, batch_size=40)))
+    ref_start, ref_end = naive_utc(gdf["ref_start"]), naive_utc(gdf["ref_end"])
+    expected = gdf[(ref_end >= START + pd.Timedelta(hours=2)) & (ref_start <= START + pd.Timedelta(hours=4))]
+    assert 0 < len(rows) < len(gdf)
+    assert sorted(zip(rows["ref_granule"], rows["match_granule"])) == sorted(
+        zip(expected["ref_granule"], expected["match_granule"])
+    )
+    # dates are nanoseconds since epoch in UTC, whatever the time zone of the file
+    assert (pd.to_datetime(rows["ref_start"]) >= START).all()
+
+
+def test_dataset_and_granule_filters(parquet):
+    path, gdf = parquet
+    rows = pd.concat(list(iter_parquet_batches(path, ref_dataset_ids=["s1a"], granules=["ref_3", "match_7"])))
+    granules = (gdf["ref_granule"] == "ref_3") | (gdf["match_granule"] == "match_7")
+    expected = gdf[(gdf["ref_dataset_id"] == "s1a") & granules]
+    assert sorted(rows["ref_granule"] + rows["match_granule"]) == sorted(
+        expected["ref_granule"] + expected["match_granule"]
+    )
+    assert list(iter_parquet_batches(path, match_dataset_ids=["unknown"])) == []
+
+
+@pytest.mark.parametrize("side", ["ref", "match"])
+def test_keep_closest_rows_across_batches(parquet, side):
+    path, _ = parquet
+    # batches smaller than the row groups, so that the rows of a granule are in several batches
+    kept = keep_closest_rows(iter_parquet_batches(path, batch_size=16), side)
+    prq = gpd.read_parquet(path)
+    prq["time_diff"] = abs(prq["ref_start"] - prq["match_start"])
+    expected = prq.sort_values("time_diff", kind="stable").drop_duplicates(subset=[f"{side}_granule"])
+    assert len(kept) == expected[f"{side}_granule"].nunique()
+    assert list(kept[f"{side}_granule"]) == list(expected[f"{side}_granule"])
+    assert list(kept["ref_granule"] + kept["match_granule"]) == list(
+        expected["ref_granule"] + expected["match_granule"]
+    )
+    with pytest.raises(ValueError):
+        keep_closest_rows([], "both")
+
+
+def test_decoded_records_are_geopandas_rows(parquet):
+    path, _ = parquet
+    records = [record for batch in iter_parquet_batches(path) for record in batch_records(batch)]
+    prq = gpd.read_parquet(path)
+    assert len(records) == len(prq)
+    for record, (_, row) in zip(records, prq.iterrows()):
+        # records are compact, and what `process_parquet_coloc` received before once decoded
+        assert isinstance(record["ref_geometry"], bytes) and isinstance(record["ref_start"], int)
+        decoded = decode_parquet_record(record)
+        for name in ["ref_geometry", "match_geometry"]:
+            assert isinstance(decoded[name], shapely.Polygon)
+            assert shapely.equals_exact(decoded[name], row[name])
+        for name in ["ref_start", "ref_end", "match_start", "match_end"]:
+            assert isinstance(decoded[name], pd.Timestamp) and decoded[name].tz is None
+            assert decoded[name] == naive_utc(pd.Series([row[name]]))[0]
+        for name in ["ref_granule", "match_granule", "ref_dataset_id", "match_dataset_id"]:
+            assert decoded[name] == row[name]
+    # decoded values are kept
+    assert decode_parquet_record(decoded) == decoded
+
+
+def test_batch_records(parquet):
+    path, _ = parquet
+    for batch in iter_parquet_batches(path, batch_size=64):
+        assert batch_records(batch) == batch.to_dict("records")
@@ -0,0 +1,108 @@
+"""Tests of the parquet co-locations run by independent shards (`coloc_sat.sharding`)."""
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from coloc_sat.scripts import merge_parquet_shards
+from coloc_sat.sharding import ShardSelector, merge_shard_results, shard_results_path
+
+from .parquet_fixtures import write_coloc_parquet
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_shards(parquet, destination_folder, shard_count, shard_indexes=None):
+    """
+    Run shards of a parquet co-location as concurrent subprocesses, like the jobs of an array job.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-m", "tests.parquet_fixtures", parquet, destination_folder, str(index), str(shard_count)],
+            cwd=ROOT,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        for index in (range(shard_count) if shard_indexes is None else shard_indexes)
+    ]
+    for process in processes:
+        _, stderr = process.communicate(timeout=300)
+        assert process.returncode == 0, stderr.decode()
+    return os.path.join(destination_folder, "results")
+
+
+def pairs(results):
+    return sorted(zip(results["ref_granule"], results["match_granule"]))
+
+
+@pytest.fixture(scope="module")
+def parquet(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("parquet") / "coloc.parquet")
+    write_coloc_parquet(path)
+    return path
+
+
+@pytest.fixture(scope="module")
+def unsharded(parquet, tmp_path_factory):
+    results_folder = run_shards(parquet, str(tmp_path_factory.mktemp("unsharded")), 1)
+    return pd.read_csv(shard_results_path(results_folder, 0, 1))
+
+
+def test_unsharded_run_records_every_row(unsharded):
+    # rows discarded by the area prefilter are recorded with their status
+    assert len(unsharded) == 300
+    assert set(unsharded["status"]) == {0, 20}
+
+
+def test_shards_union_is_unsharded_run(parquet, unsharded, tmp_path):
+    results_folder = run_shards(parquet, str(tmp_path), 3)
+    merged, missing = merge_shard_results(results_folder)
+    assert missing == []
+    assert sorted(merged["shard_index"].unique()) == [0, 1, 2]
+    assert not merged.duplicated(["ref_granule", "match_granule", "destination_folder"]).any()
+    assert pairs(merged) == pairs(unsharded)
+    assert os.path.exists(os.path.join(results_folder, "coloc_parquet_results.csv"))
+
+
+def test_merge_reports_missing_shards(parquet, tmp_path, monkeypatch):
+    results_folder = run_shards(parquet, str(tmp_path), 3, shard_indexes=[0, 2])
+    # shard 1 killed while writing its results
+    with open(shard_results_path(results_folder, 1, 3) + ".partial", "w") as partial:
+        partial.write("shard_index,ref_granule,match_granule,destination_folder,status\n")
+    merged, missing = merge_shard_results(results_folder)
+    assert missing == [1]
+    assert set(merged["shard_index"]) == {0, 2}
+
+    monkeypatch.setattr(sys, "argv", ["Coloc_merge_parquet_shards", "--results-folder", results_folder])
+    with pytest.raises(SystemExit) as exit_info:
+        merge_parquet_shards.main()
+    assert exit_info.value.code == 1
+
+
+def test_merge_without_complete_shard(tmp_path, monkeypatch):
+    with open(shard_results_path(str(tmp_path), 0, 2) + ".partial", "w") as partial:
+        partial.write("shard_index,ref_granule,match_granule,destination_folder,status\n")
+    merged, missing = merge_shard_results(str(tmp_path))
+    assert missing == [0, 1]
+    assert merged.empty
+
+    os.remove(shard_results_path(str(tmp_path), 0, 2) + ".partial")
+    with pytest.raises(FileNotFoundError):
+        merge_shard_results(str(tmp_path))
+    monkeypatch.setattr(sys, "argv", ["Coloc_merge_parquet_shards", "--results-folder", str(tmp_path)])
+    with pytest.raises(SystemExit) as exit_info:
+        merge_parquet_shards.main()
+    assert exit_info.value.code == 1
+
+
+def test_shard_selector_assigns_each_group_once():
+    costs = [5, 1, 1, 3, 2, 2, 8, 1]
+    selected = [ShardSelector(index, 3).select(costs) for index in range(3)]
+    assert (sum(selected) == 1).all()
+    keys = [f"ref_{k}:match_{k}" for k in range(50)]
+    selected = [ShardSelector(index, 3).select_keys(keys) for index in range(3)]
+    assert (sum(selected) == 1).all()